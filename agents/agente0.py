@@ -1,34 +1,34 @@
-import google.generativeai as genai
-
-def agente0_clarifica_pergunta(pergunta_original, api_key):
-    """Usa o Gemini para corrigir erros de digitação e clarificar a intenção."""
-    if not api_key:
-        return pergunta_original
-
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        prompt = f"""
-# INSTRUÇÕES:
-Você é um Clarificador de Consultas. Sua única função é corrigir erros de digitação e tornar a consulta do usuário o mais clara e objetiva possível, SEM alterar o significado original. Sua saída DEVE ser APENAS a consulta corrigida/clarificada.
-
-# EXEMPLOS DE CORREÇÃO:
-USUÁRIO: "Qual o tipu de cada colna?"
-SAÍDA: "Qual o tipo de cada coluna?"
-
-USUÁRIO: "ttata o arquiu?"
-SAÍDA: "Do que se trata o arquivo?"
-        
-# CONSULTA ORIGINAL DO USUÁRIO:
-{pergunta_original}
-
-# CONSULTA CLARIFICADA:
-"""
-        response = model.generate_content(prompt)
-        # Limita para garantir que seja apenas uma frase
-        return response.text.strip().split('\n')[0]
-    
-    except Exception:
-        # Em caso de erro, retorna a pergunta original para não bloquear o fluxo
+from agents.llm_client import get_llm_client
+
+def agente0_clarifica_pergunta(pergunta_original, api_key, on_token=None):
+    """
+    Usa o Gemini para corrigir erros de digitação e clarificar a intenção.
+    Com `on_token`, a resposta é recebida em streaming (`on_token(texto_acumulado)`).
+    """
+    if not api_key:
+        return pergunta_original
+
+    try:
+        prompt = f"""
+# INSTRUÇÕES:
+Você é um Clarificador de Consultas. Sua única função é corrigir erros de digitação e tornar a consulta do usuário o mais clara e objetiva possível, SEM alterar o significado original. Sua saída DEVE ser APENAS a consulta corrigida/clarificada.
+
+# EXEMPLOS DE CORREÇÃO:
+USUÁRIO: "Qual o tipu de cada colna?"
+SAÍDA: "Qual o tipo de cada coluna?"
+
+USUÁRIO: "ttata o arquiu?"
+SAÍDA: "Do que se trata o arquivo?"
+        
+# CONSULTA ORIGINAL DO USUÁRIO:
+{pergunta_original}
+
+# CONSULTA CLARIFICADA:
+"""
+        # Limita para garantir que seja apenas uma frase (o streaming para na primeira quebra de linha)
+        texto = get_llm_client().gera_texto(api_key, prompt, on_token, completo=lambda t: '\n' in t.strip(), etapa='clarificacao')
+        return texto.strip().split('\n')[0]
+    
+    except Exception:
+        # Em caso de erro, retorna a pergunta original para não bloquear o fluxo
         return pergunta_original
\ No newline at end of file
@@ -1,159 +1,219 @@
-import pandas as pd
-import google.generativeai as genai
-from helpers.normalize_text import normalize_text
-
-def agente2_gera_codigo_pandas_eda(pergunta, api_key, df, retrieved_context=None, historico_conclusoes=None, file_context=None):
-    """Gera código Pandas para EDA e a conclusão em linguagem natural."""
-    if df is None:
-        return "Erro: DataFrame não carregado. Faça o upload do arquivo primeiro.", None
-
-    if not api_key:
-        return "Erro: Chave da API do Gemini não fornecida.", None
-
-    try:
-        genai.configure(api_key=api_key)
-        # MODELO ATUALIZADO PARA gemini-2.5-flash
-        model = genai.GenerativeModel('gemini-2.5-flash')
-
-        schema = '\n'.join([f"- {c} (dtype: {df[c].dtype})" for c in df.columns])
-
-        pergunta_limpa = normalize_text(pergunta).upper()
-        
-        # 1. PERGUNTAS SOBRE TIPOS/ESQUEMA DE COLUNAS (Gera um DataFrame tabular VERTICAL)
-        if any(keyword in pergunta_limpa for keyword in ["QUE TIPO DE DADOS", "QUAIS OS TIPOS DE COLUNAS", "DTYPE COLUNAS", "TIPOS DE DADOS NAS COLUNAS", "TIPOS DAS COLUNAS"]):
-            
-            codigo_gerado = f"""
-# Cria um DataFrame vertical com duas colunas
-schema_df = pd.DataFrame(df.dtypes).reset_index()
-schema_df.columns = ['NOME_DA_COLUNA', 'TIPO_DE_DADO']
-
-# Atribui para visualização tabular no Streamlit
-resultado_df = schema_df
-print(resultado_df.to_string(index=False)) # Imprime sem o índice para limpeza
-"""
-            conclusoes = "A análise revela o tipo de dado de cada coluna no conjunto de dados, auxiliando na verificação de consistência e na preparação para modelagem."
-            return codigo_gerado, conclusoes
-            
-        # 2. PERGUNTAS SOBRE CONTEXTO GERAL (Gera apenas texto que será convertido em tabela 1x1)
-        if any(keyword in pergunta_limpa for keyword in ["QUE SE TRATA O ARQUIVO", "CONTEUDO DO ARQUIVO", "REPRESENTA O ARQUIVO", "O QUE E ESSE DATASET"]):
-            prompt_interpretacao = f"""
-# PERSONA E OBJETIVO PRINCIPAL
-Você é um Analista de Dados Sênior. Sua única função é INTERPRETAR e DESCREVER o conteúdo de um DataFrame. Sua saída DEVE ser APENAS uma descrição textual detalhada (qualitativa), sem código ou comentários.
-
-# CONTEXTO DO DATAFRAME `df`
-Esquema do DataFrame:
-{schema}
-CONTEXTO DO NOME DO ARQUIVO: '{file_context}'.
-
-# PERGUNTA DO USUÁRIO
-{pergunta}
-
-# DESCRIÇÃO FINAL DO CONTEÚDO
-"""
-            response = model.generate_content(prompt_interpretacao)
-            texto_limpo = response.text.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ').strip()
-            # O executor de código irá criar um resultado_df a partir deste print para garantir a tabela.
-            codigo_gerado = f"print('{texto_limpo}')"
-            
-            # Conclusão customizada para contextualização (sem contagem errada de linhas)
-            conclusoes_contexto = f"O arquivo '{file_context}' foi contextualizado. Ele contém {len(df)} registros."
-            
-            return codigo_gerado, conclusoes_contexto
-            
-        # 3. CORREÇÃO ESPECÍFICA PARA BOXPLOT e HISTOGRAMA (Evita múltiplas figuras e layout fixo)
-        if any(keyword in pergunta_limpa for keyword in ["OUTLIER", "BOXPLOT", "DISPERSAO", "HISTOGRAMA", "DISTRIBUICAO"]):
-             
-            plot_type = 'boxplot' if any(k in pergunta_limpa for k in ["OUTLIER", "BOXPLOT"]) else 'hist'
-            plot_func = 'df.boxplot(column=col, ax=axes[i], grid=False)' if plot_type == 'boxplot' else 'axes[i].hist(df[col].dropna(), bins=20, edgecolor="black")'
-            plot_title = 'Análise de Outliers - Boxplots para Colunas Numéricas' if plot_type == 'boxplot' else 'Distribuição de Dados - Histogramas para Colunas Numéricas'
-            
-            codigo_gerado = f"""
-import numpy as np
-
-# 1. Identifica colunas numéricas
-numerical_cols = df.select_dtypes(include=np.number).columns
-num_plots = len(numerical_cols)
-
-if num_plots == 0:
-    print("Não há colunas numéricas para plotar.")
-else:
-    # 2. Calcula o layout dinâmico (max 4 colunas)
-    n_cols = min(4, num_plots)
-    n_rows = int(np.ceil(num_plots / n_cols))
-
-    # 3. Cria a única figura principal com o layout dinâmico
-    fig, axes = plt.subplots(nrows=n_rows, ncols=n_cols, figsize=(4 * n_cols, 3 * n_rows))
-    axes = axes.flatten() # Achata para iteração fácil
-
-    # 4. Itera e plota
-    for i, col in enumerate(numerical_cols):
-        # Usa o eixo (axis) do subplot correto
-        {plot_func}
-        axes[i].set_title(col, fontsize=10)
-        axes[i].tick_params(axis='x', rotation=45)
-
-    # 5. Remove eixos vazios (se existirem)
-    for j in range(num_plots, n_rows * n_cols):
-        fig.delaxes(axes[j])
-
-    plt.suptitle("{plot_title}", y=1.02, fontsize=14)
-    plt.tight_layout()
-"""
-            conclusoes = f"Os gráficos de {plot_type} foram gerados para visualizar a dispersão dos dados e identificar potenciais problemas de distribuição ou outliers em cada coluna numérica do dataset."
-            
-            return codigo_gerado, conclusoes
-
-        # --- LÓGICA: GERAÇÃO DE CÓDIGO (RAG - ANÁLISE GERAL) ---
-        
-        rag_context_str = f"\n\nCONTEXTO ADICIONAL DOS DADOS (RAG):\n{retrieved_context}" if retrieved_context else ""
-        historico_conclusoes_str = f"\n\nHISTÓRICO DE ANÁLISE E CONCLUSÕES ANTERIORES:\n{historico_conclusoes}" if historico_conclusoes else ""
-        file_context_str = f"\n\nCONTEXTO DO NOME DO ARQUIVO: '{file_context}'."
-        
-        prompt = f"""
-# PERSONA E OBJETIVO PRINCIPAL
-Você é um assistente especialista em Análise Exploratória de Dados (E.D.A.) com Pandas.
-Sua única função é traduzir uma pergunta em linguagem natural para um código Python.
-Você DEVE gerar apenas o código Python.
-
-# CONTEXTO DO DATAFRAME `df`
-Esquema do DataFrame:
-{schema}
-{file_context_str}
-{rag_context_str}
-{historico_conclusoes_str}
-
-# REGRAS DE GERAÇÃO DE CÓDIGO (MUITO IMPORTANTE)
-1.  **Sempre use `df` como o nome do DataFrame.**
-2.  **NUNCA gere código para carregar (`pd.read_csv`, `pd.read_excel`, etc.) ou salvar o DataFrame `df`. Ele já está carregado e pronto para uso.**
-3.  **Se o resultado for uma tabela de dados (DataFrame), SEMPRE atribua-o a `resultado_df` e imprima `resultado_df` (ex: `print(resultado_df.to_string())`).**
-4.  **Para gráficos, use `matplotlib.pyplot` (importado como `plt`). Para gráficos com múltiplos subplots, use `plt.subplots()` com layout dinâmico (`numpy.ceil`).**
-5.  **A saída final deve ser APENAS o código Python, sem explicações ou comentários, e JAMAIS inclua qualquer pergunta.**
-6.  **EVITE usar zero à esquerda em números decimais inteiros (ex: use '8' em vez de '08') para evitar erro de sintaxe 'octal integers'.**
-
-# PERGUNTA DO USUÁRIO
-{pergunta}
-
-# CÓDIGO PYTHON (PANDAS/MATPLOTLIB)
-"""
-        response = model.generate_content(prompt)
-        codigo_gerado = response.text.replace("```python", "").replace("```", "").strip()
-        
-        # Agente 4: GERA AS CONCLUSÕES APÓS A ANÁLISE
-        conclusoes_prompt = f"""
-# PERSONA
-Você é um analista de dados sênior e seu único trabalho é sintetizar os resultados de uma análise e fornecer conclusões ou insights claros e objetivos para o usuário.
-
-# CONTEXTO
-A pergunta do usuário foi: "{pergunta}"
-O resultado da análise (Código Python) foi:
-{codigo_gerado}
-
-# TAREFA
-Com base na pergunta do usuário e nos resultados, forneça uma ou duas frases de conclusão sobre o que foi descoberto. Não mencione o código. Apenas a conclusão.
-"""
-        conclusoes_response = model.generate_content(conclusoes_prompt)
-        conclusoes = conclusoes_response.text
-
-        return codigo_gerado, conclusoes
-    except Exception as e:
+import re
+from agents.llm_client import bloco_de_codigo_fechado, estima_tokens, get_llm_client
+from agents.compactador_prompt import compacta_prompt
+from helpers.normalize_text import normalize_text
+
+# Perguntas de estatística respondidas diretamente pelo perfil acumulado na ingestão (sem LLM)
+PALAVRAS_PERFIL = [
+    ('describe', ["ESTATISTICAS DESCRITIVAS", "ESTATISTICA DESCRITIVA", "DESCRIBE", "RESUMO ESTATISTICO", "MEDIANA", "QUARTIS", "DESVIO PADRAO"]),
+    ('nulls', ["NULOS", "NULAS", "VALORES AUSENTES", "DADOS FALTANTES", "VALORES FALTANTES", "MISSING"]),
+    ('correlation', ["CORRELACAO", "CORRELACOES"]),
+    ('mean', ["MEDIA", "MEDIAS"]),
+]
+# Palavras que podem acompanhar uma pergunta respondida pelo perfil. Qualquer outra que sobre depois de retirar
+# as palavras de estatística e os nomes das colunas (condições como "PARA", "NAS", "ENTRE", valores, operadores,
+# "MOVEL", "ACUMULADA"...) indica filtro ou cálculo que exige o DataFrame: a pergunta vai para o LLM
+FRASES_NEUTRAS = ["EM CADA COLUNA", "EM TODAS AS COLUNAS", "DE CADA COLUNA", "DE TODAS AS COLUNAS", "NO DATASET",
+                  "DO DATASET", "NOS DADOS", "DOS DADOS", "NO ARQUIVO", "DO ARQUIVO", "NA TABELA", "DA TABELA", "POR FAVOR"]
+PALAVRAS_NEUTRAS = {"QUAL", "QUAIS", "E", "SAO", "A", "O", "AS", "OS", "DE", "DO", "DA", "DOS", "DAS", "UM", "UMA",
+                    "ME", "MOSTRE", "MOSTRAR", "EXIBA", "EXIBIR", "CALCULE", "CALCULAR", "LISTE", "LISTAR", "INFORME",
+                    "DIGA", "GERE", "GERAR", "OBTENHA", "HA", "EXISTE", "EXISTEM", "TEM", "QUANTOS", "QUANTAS",
+                    "COLUNA", "COLUNAS", "VARIAVEL", "VARIAVEIS", "TODAS", "TODOS", "CADA", "GERAL", "GERAIS",
+                    "PRINCIPAIS", "SOBRE", "DADOS", "DATASET", "ARQUIVO", "TABELA"}
+PONTUACAO_NEUTRA = set("?!.,:;()")
+
+def _contem(texto, palavras):
+    return any(re.search(rf"\b{re.escape(p)}\b", texto) for p in palavras)
+
+def _remove(texto, termos, flags=0):
+    # Termos mais longos primeiro ("DESVIO PADRAO" antes de partes dele)
+    for termo in sorted(termos, key=len, reverse=True):
+        texto = re.sub(rf"\b{re.escape(termo)}\b", " ", texto, flags=flags)
+    return texto
+
+def _resto_pergunta(pergunta_limpa, colunas):
+    """Palavras e símbolos da pergunta que não são estatística, nome de coluna nem palavra neutra."""
+    texto = _remove(pergunta_limpa, [p for _, palavras in PALAVRAS_PERFIL for p in palavras] + FRASES_NEUTRAS)
+    texto = _remove(texto, [str(c) for c in colunas], flags=re.IGNORECASE)
+    return [t for t in re.findall(r"\w+|[^\w\s]", texto) if t not in PALAVRAS_NEUTRAS and t not in PONTUACAO_NEUTRA]
+
+def _codigo_perfil(pergunta_limpa, perfil):
+    """
+    Gera código que responde a partir do perfil do dataset, ou None se a pergunta exigir o `df`. O atalho só
+    vale quando a pergunta se resume a estatísticas e nomes de colunas (sem filtros, valores ou condições).
+    """
+    if perfil is None or perfil.rows == 0 or _resto_pergunta(pergunta_limpa, perfil.columns):
+        return None
+
+    colunas = [c for c in perfil.columns if re.search(rf"\b{re.escape(str(c))}\b", pergunta_limpa, flags=re.IGNORECASE)] or None
+    for tipo, palavras in PALAVRAS_PERFIL:
+        if not _contem(pergunta_limpa, palavras):
+            continue
+        if tipo == 'describe':
+            expressao = f"perfil.describe({colunas!r})"
+        elif tipo == 'nulls':
+            expressao = "perfil.null_counts()"
+        elif tipo == 'correlation':
+            if colunas is not None and len(colunas) < 2:
+                return None
+            expressao = f"perfil.correlation({colunas!r}).round(3)"
+        else:
+            expressao = f"perfil.mean({colunas!r}).to_frame('MEDIA')"
+        return f"resultado_df = {expressao}\nprint(resultado_df.to_string())"
+    return None
+
+def _limpa_codigo(texto):
+    return texto.replace("```python", "").replace("```", "").strip()
+
+def agente2_gera_codigo_pandas_eda(pergunta, api_key, df, retrieved_context=None, historico_conclusoes=None, file_context=None, perfil=None,
+                                   on_token=None, on_codigo=None, tabela=None):
+    """
+    Gera código Pandas para EDA e a conclusão em linguagem natural.
+    Com `on_token`, as respostas do Gemini chegam em streaming (`on_token(etapa, texto_acumulado)`, etapa
+    'codigo' ou 'conclusoes'); `on_codigo(codigo)` é chamado assim que o bloco de código fica completo,
+    antes da geração das conclusões, para que a execução comece em paralelo.
+    Com `tabela` (modo fora da memória), o código gerado consulta `df` como relação DuckDB (SQL).
+    """
+    if df is None:
+        return "Erro: DataFrame não carregado. Faça o upload do arquivo primeiro.", None
+
+    if not api_key:
+        return "Erro: Chave da API do Gemini não fornecida.", None
+
+    try:
+        # 0. ESTATÍSTICAS DISPONÍVEIS NO PERFIL DA INGESTÃO (tempo constante, sem chamar o Gemini)
+        codigo_perfil = _codigo_perfil(normalize_text(pergunta).upper(), perfil)
+        if codigo_perfil:
+            conclusoes = f"Estatísticas obtidas do perfil acumulado durante a ingestão ({perfil.rows} linhas), sem nova varredura dos dados; quartis e medianas são aproximados."
+            return codigo_perfil, conclusoes
+
+        llm = get_llm_client()
+
+        # Esquema e contexto RAG compactados (relevância, faixas de colunas, precisão) dentro do teto de tokens
+        schema, retrieved_context, _ = compacta_prompt(
+            pergunta, df, retrieved_context,
+            tokens_reservados=estima_tokens(f"{pergunta}{historico_conclusoes or ''}{file_context or ''}"))
+
+        pergunta_limpa = normalize_text(pergunta).upper()
+        
+        # 1. PERGUNTAS SOBRE TIPOS/ESQUEMA DE COLUNAS (Gera um DataFrame tabular VERTICAL)
+        if any(keyword in pergunta_limpa for keyword in ["QUE TIPO DE DADOS", "QUAIS OS TIPOS DE COLUNAS", "DTYPE COLUNAS", "TIPOS DE DADOS NAS COLUNAS", "TIPOS DAS COLUNAS"]):
+            
+            codigo_gerado = f"""
+# Cria um DataFrame vertical com duas colunas (funciona com DataFrame Pandas e relação DuckDB)
+schema_df = pd.DataFrame({'NOME_DA_COLUNA': list(df.columns), 'TIPO_DE_DADO': [str(t) for t in df.dtypes]})
+
+# Atribui para visualização tabular no Streamlit
+resultado_df = schema_df
+print(resultado_df.to_string(index=False)) # Imprime sem o índice para limpeza
+"""
+            conclusoes = "A análise revela o tipo de dado de cada coluna no conjunto de dados, auxiliando na verificação de consistência e na preparação para modelagem."
+            return codigo_gerado, conclusoes
+            
+        # 2. PERGUNTAS SOBRE CONTEXTO GERAL (Gera apenas texto que será convertido em tabela 1x1)
+        if any(keyword in pergunta_limpa for keyword in ["QUE SE TRATA O ARQUIVO", "CONTEUDO DO ARQUIVO", "REPRESENTA O ARQUIVO", "O QUE E ESSE DATASET"]):
+            prompt_interpretacao = f"""
+# PERSONA E OBJETIVO PRINCIPAL
+Você é um Analista de Dados Sênior. Sua única função é INTERPRETAR e DESCREVER o conteúdo de um DataFrame. Sua saída DEVE ser APENAS uma descrição textual detalhada (qualitativa), sem código ou comentários.
+
+# CONTEXTO DO DATAFRAME `df`
+Esquema do DataFrame:
+{schema}
+CONTEXTO DO NOME DO ARQUIVO: '{file_context}'.
+
+# PERGUNTA DO USUÁRIO
+{pergunta}
+
+# DESCRIÇÃO FINAL DO CONTEÚDO
+"""
+            descricao = llm.gera_texto(api_key, prompt_interpretacao, on_token and (lambda t: on_token('conclusoes', t)), etapa='descricao')
+            texto_limpo = descricao.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ').strip()
+            # O executor de código irá criar um resultado_df a partir deste print para garantir a tabela.
+            codigo_gerado = f"print('{texto_limpo}')"
+            
+            # Conclusão customizada para contextualização (sem contagem errada de linhas)
+            conclusoes_contexto = f"O arquivo '{file_context}' foi contextualizado. Ele contém {tabela.rows if tabela is not None else len(df)} registros."
+            
+            return codigo_gerado, conclusoes_contexto
+            
+        # 3. BOXPLOT e HISTOGRAMA: desenhados pelo helper `graficos` do sandbox a partir de agregados
+        # (NumPy vetorizado ou o perfil da ingestão), em uma única figura com layout dinâmico
+        if any(keyword in pergunta_limpa for keyword in ["OUTLIER", "BOXPLOT", "DISPERSAO", "HISTOGRAMA", "DISTRIBUICAO"]):
+             
+            plot_type = 'boxplot' if any(k in pergunta_limpa for k in ["OUTLIER", "BOXPLOT"]) else 'hist'
+            plot_func = 'boxplots' if plot_type == 'boxplot' else 'histogramas'
+            plot_title = 'Análise de Outliers - Boxplots para Colunas Numéricas' if plot_type == 'boxplot' else 'Distribuição de Dados - Histogramas para Colunas Numéricas'
+            
+            codigo_gerado = f"""
+# Uma figura com um gráfico por coluna numérica (estatísticas calculadas sem desenhar cada linha)
+graficos.{plot_func}(titulo="{plot_title}")
+"""
+            conclusoes = f"Os gráficos de {plot_type} foram gerados para visualizar a dispersão dos dados e identificar potenciais problemas de distribuição ou outliers em cada coluna numérica do dataset."
+            
+            return codigo_gerado, conclusoes
+
+        # --- LÓGICA: GERAÇÃO DE CÓDIGO (RAG - ANÁLISE GERAL) ---
+        
+        rag_context_str = f"\n\nCONTEXTO ADICIONAL DOS DADOS (RAG):\n{retrieved_context}" if retrieved_context else ""
+        historico_conclusoes_str = f"\n\nHISTÓRICO DE ANÁLISE E CONCLUSÕES ANTERIORES:\n{historico_conclusoes}" if historico_conclusoes else ""
+        file_context_str = f"\n\nCONTEXTO DO NOME DO ARQUIVO: '{file_context}'."
+        
+        if tabela is not None:
+            # Modo fora da memória: `df` é uma relação DuckDB sobre arquivos Parquet (não cabe em um DataFrame)
+            ferramenta, titulo_df, esquema_df = "DuckDB (SQL) e Pandas", "DA TABELA", "Esquema da tabela"
+            regras_df = f"""1.  **`df` NÃO é um DataFrame Pandas: é uma relação DuckDB com {tabela.rows} linhas em disco, grande demais para a memória. Consulte-a com SQL via `sql("SELECT ... FROM df ...")` (ou com `df.filter(...)`, `df.aggregate(...)`, `df.project(...)`, `df.limit(n)`).**
+2.  **Filtre, agrupe e agregue DENTRO do SQL e só então converta o resultado (já pequeno) para Pandas com `.df()`. NUNCA use `df.df()`, `df.fetchall()` ou `SELECT * FROM df` sem `LIMIT`, nem carregue ou salve arquivos.**
+3.  **Se o resultado for uma tabela, SEMPRE atribua o DataFrame Pandas a `resultado_df` e imprima-o (ex: `resultado_df = sql("SELECT ...").df()` e `print(resultado_df.to_string())`). Nomes de colunas no SQL vão entre aspas duplas (ex: `"AMOUNT"`).**"""
+        else:
+            ferramenta, titulo_df, esquema_df = "Pandas", "DO DATAFRAME", "Esquema do DataFrame"
+            regras_df = """1.  **Sempre use `df` como o nome do DataFrame.**
+2.  **NUNCA gere código para carregar (`pd.read_csv`, `pd.read_excel`, etc.) ou salvar o DataFrame `df`. Ele já está carregado e pronto para uso.**
+3.  **Se o resultado for uma tabela de dados (DataFrame), SEMPRE atribua-o a `resultado_df` e imprima `resultado_df` (ex: `print(resultado_df.to_string())`).**"""
+        
+        prompt = f"""
+# PERSONA E OBJETIVO PRINCIPAL
+Você é um assistente especialista em Análise Exploratória de Dados (E.D.A.) com {ferramenta}.
+Sua única função é traduzir uma pergunta em linguagem natural para um código Python.
+Você DEVE gerar apenas o código Python.
+
+# CONTEXTO {titulo_df} `df`
+{esquema_df}:
+{schema}
+{file_context_str}
+{rag_context_str}
+{historico_conclusoes_str}
+
+# REGRAS DE GERAÇÃO DE CÓDIGO (MUITO IMPORTANTE)
+{regras_df}
+4.  **Para histogramas, boxplots e dispersão, use o objeto `graficos` já disponível: `graficos.histogramas(colunas)`, `graficos.boxplots(colunas)` ou `graficos.dispersao(x, y)` (funcionam com milhões de linhas). Para outros gráficos, use `fig, axes = graficos.figura(n_paineis)` e desenhe nos eixos retornados; não use `plt.show()`.**
+5.  **A saída final deve ser APENAS o código Python, sem explicações ou comentários, e JAMAIS inclua qualquer pergunta.**
+6.  **EVITE usar zero à esquerda em números decimais inteiros (ex: use '8' em vez de '08') para evitar erro de sintaxe 'octal integers'.**
+
+# PERGUNTA DO USUÁRIO
+{pergunta}
+
+# CÓDIGO PYTHON ({'DUCKDB/PANDAS' if tabela is not None else 'PANDAS'}/MATPLOTLIB)
+"""
+        codigo_gerado = _limpa_codigo(llm.gera_texto(api_key, prompt, on_token and (lambda t: on_token('codigo', _limpa_codigo(t))),
+                                                     completo=bloco_de_codigo_fechado, etapa='codigo'))
+        if on_codigo is not None:
+            on_codigo(codigo_gerado)
+        
+        # Agente 4: GERA AS CONCLUSÕES APÓS A ANÁLISE
+        conclusoes_prompt = f"""
+# PERSONA
+Você é um analista de dados sênior e seu único trabalho é sintetizar os resultados de uma análise e fornecer conclusões ou insights claros e objetivos para o usuário.
+
+# CONTEXTO
+A pergunta do usuário foi: "{pergunta}"
+O resultado da análise (Código Python) foi:
+{codigo_gerado}
+
+# TAREFA
+Com base na pergunta do usuário e nos resultados, forneça uma ou duas frases de conclusão sobre o que foi descoberto. Não mencione o código. Apenas a conclusão.
+"""
+        conclusoes = llm.gera_texto(api_key, conclusoes_prompt, on_token and (lambda t: on_token('conclusoes', t)), etapa='conclusoes')
+
+        return codigo_gerado, conclusoes
+    except Exception as e:
         return f"Erro ao chamar a API do Gemini: {e}", None
\ No newline at end of file
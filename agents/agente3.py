@@ -1,95 +1,151 @@
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
-from reportlab.platypus import Table, TableStyle
-from reportlab.lib import colors
-
-def agente3_formatar_apresentacao(resultado_texto, resultado_df, pergunta, img_bytes):
-    """Gera o relatório em PDF (ReportLab)."""
-    
-    pdf_bytes = None
-    final_text_output = resultado_texto
-
-    # Usa o DataFrame para texto se estiver disponível (para PDF)
-    if resultado_df is not None and not resultado_df.empty:
-        final_text_output = resultado_df.to_markdown(index=resultado_df.index.name is not None)
-    
-    try:
-        pdf_output_buffer = io.BytesIO()
-        c = canvas.Canvas(pdf_output_buffer, pagesize=A4)
-        width, height = A4
-        
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(inch, height - inch, "Relatório de Análise de Dados")
-        
-        c.setFont("Helvetica", 12)
-        textobject = c.beginText(inch, height - inch - 20)
-        textobject.textLines(f"Pergunta: {pergunta}")
-        c.drawText(textobject)
-        
-        y_pos = height - inch - 50
-
-        if resultado_df is not None and not resultado_df.empty:
-            
-            # Adiciona o índice como primeira coluna se o DataFrame tiver um nome de índice definido
-            if resultado_df.index.name is not None:
-                data = [
-                    [resultado_df.index.name] + resultado_df.columns.tolist()
-                ] + [
-                    [str(idx)] + row for idx, row in zip(resultado_df.index.tolist(), resultado_df.values.astype(str).tolist())
-                ]
-            else:
-                data = [resultado_df.columns.tolist()] + resultado_df.values.astype(str).tolist()
-
-            # Limita a largura da tabela
-            max_cols = 10 
-            data = [row[:max_cols] for row in data]
-            
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            table_width, table_height = table.wrapOn(c, width, height)
-            y_pos -= table_height + 20
-            
-            if y_pos < inch:
-                c.showPage()
-                y_pos = height - inch - 20
-            
-            table.drawOn(c, inch, y_pos)
-            y_pos -= 20
-        
-        if img_bytes:
-            image_reader = ImageReader(io.BytesIO(img_bytes))
-            img_width, img_height = image_reader.getSize()
-            
-            aspect_ratio = img_width / img_height
-            max_width = width - 2 * inch
-            
-            img_width = max_width
-            img_height = img_width / aspect_ratio
-            
-            y_pos -= img_height + 20
-            
-            if y_pos < inch:
-                c.showPage()
-                y_pos = height - inch - 20
-            
-            c.drawImage(image_reader, inch, y_pos, width=img_width, height=img_height)
-
-        c.save()
-        pdf_bytes = pdf_output_buffer.getvalue()
-
-    except Exception as e:
-        pdf_bytes = None
-
-    return final_text_output, img_bytes, pdf_bytes
\ No newline at end of file
+import io
+import os
+from xml.sax.saxutils import escape
+
+# Limites do relatório: o PDF tem tamanho e tempo de geração limitados, qualquer que seja o resultado
+PDF_MAX_LINHAS = int(os.environ.get('EDA_PDF_MAX_ROWS', 500))
+PDF_MAX_COLUNAS = 10
+PDF_MAX_CARACTERES_CELULA = 40
+PDF_FONTE_TABELA = 8
+# 'inicio' (primeiras linhas) ou 'amostra' (amostra uniforme, na ordem original) quando há mais linhas que o limite
+PDF_TRUNCAMENTO = os.environ.get('EDA_PDF_TRUNCATION', 'inicio')
+# Largura máxima (px) das imagens embutidas; imagens maiores são reduzidas antes de entrar no PDF
+PDF_MAX_LARGURA_IMAGEM = int(os.environ.get('EDA_PDF_MAX_IMAGE_PX', 1600))
+
+
+def _limita_linhas(resultado_df):
+    """Retorna (DataFrame com no máximo PDF_MAX_LINHAS linhas, aviso de truncamento ou None)."""
+    total = len(resultado_df)
+    if total <= PDF_MAX_LINHAS:
+        return resultado_df, None
+    if PDF_TRUNCAMENTO == 'amostra':
+        parcial = resultado_df.sample(PDF_MAX_LINHAS, random_state=0).sort_index()
+        return parcial, f"Tabela com {total} linhas: exibida uma amostra uniforme de {PDF_MAX_LINHAS} linhas."
+    return resultado_df.head(PDF_MAX_LINHAS), f"Tabela com {total} linhas: exibidas as primeiras {PDF_MAX_LINHAS}."
+
+
+def _celula(valor, max_caracteres):
+    texto = str(valor)
+    if len(texto) > max_caracteres:
+        return texto[:max_caracteres - 1] + "…"
+    return texto
+
+
+def _tabela(resultado_df, estilos, largura):
+    """Flowables da tabela: LongTable quebrada entre páginas com o cabeçalho repetido, mais os avisos de corte."""
+    from reportlab.platypus import LongTable, TableStyle, Paragraph
+    from reportlab.lib import colors
+
+    parcial, aviso = _limita_linhas(resultado_df)
+    # Adiciona o índice como primeira coluna se o DataFrame tiver um nome de índice definido
+    if parcial.index.name is not None:
+        parcial = parcial.reset_index()
+
+    avisos = [aviso] if aviso else []
+    if parcial.shape[1] > PDF_MAX_COLUNAS:
+        avisos.append(f"Exibidas as primeiras {PDF_MAX_COLUNAS} de {parcial.shape[1]} colunas.")
+        parcial = parcial.iloc[:, :PDF_MAX_COLUNAS]
+
+    # Colunas de largura igual; o texto de cada célula é cortado para caber (~0,55 em de largura por caractere)
+    largura_coluna = largura / parcial.shape[1]
+    max_caracteres = max(4, min(PDF_MAX_CARACTERES_CELULA, int((largura_coluna - 6) / (0.55 * PDF_FONTE_TABELA))))
+    data = [[_celula(c, max_caracteres) for c in parcial.columns]]
+    data += [[_celula(v, max_caracteres) for v in linha] for linha in parcial.itertuples(index=False, name=None)]
+
+    table = LongTable(data, colWidths=[largura_coluna] * parcial.shape[1], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), PDF_FONTE_TABELA),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+    ]))
+    return [Paragraph(escape(a), estilos['Italic']) for a in avisos] + [table]
+
+
+def _imagem(img_bytes, largura_max, altura_max):
+    """Imagem reduzida para no máximo PDF_MAX_LARGURA_IMAGEM px e ajustada ao quadro da página."""
+    from reportlab.platypus import Image
+    from PIL import Image as PILImage
+
+    imagem = PILImage.open(io.BytesIO(img_bytes))
+    if imagem.width > PDF_MAX_LARGURA_IMAGEM:
+        imagem.thumbnail((PDF_MAX_LARGURA_IMAGEM, PDF_MAX_LARGURA_IMAGEM * imagem.height // imagem.width))
+        buffer = io.BytesIO()
+        imagem.save(buffer, format='PNG', optimize=True)
+        img_bytes = buffer.getvalue()
+
+    escala = min(largura_max / imagem.width, altura_max / imagem.height)
+    return Image(io.BytesIO(img_bytes), width=imagem.width * escala, height=imagem.height * escala)
+
+
+def _secao(secao, titulo, estilos, largura, altura):
+    """Flowables de uma seção: título, pergunta, conclusão, tabela e gráfico."""
+    from reportlab.platypus import Paragraph, Spacer
+
+    resultado_df = secao.get('resultado_df')
+    flowables = [Paragraph(escape(titulo), estilos['Heading2']),
+                 Paragraph(escape(f"Pergunta: {secao.get('pergunta') or ''}"), estilos['Normal'])]
+    if secao.get('conclusoes'):
+        flowables.append(Paragraph(escape(f"Conclusão: {secao['conclusoes']}"), estilos['Italic']))
+    flowables.append(Spacer(1, 12))
+
+    if resultado_df is not None and not resultado_df.empty:
+        flowables += _tabela(resultado_df, estilos, largura)
+        flowables.append(Spacer(1, 12))
+
+    if secao.get('img_bytes'):
+        flowables.append(_imagem(secao['img_bytes'], largura, altura - 24))
+    return flowables
+
+
+def agente3_formatar_apresentacao(resultado_texto, resultado_df, pergunta, img_bytes, secoes=None):
+    """
+    Gera o relatório em PDF (ReportLab).
+    Com `secoes` (lista de dicts com 'pergunta', 'resultado_df', 'img_bytes' e 'conclusoes'), gera um único
+    relatório com uma seção por pergunta (modo checklist); os demais argumentos são então ignorados no PDF.
+    Tabelas grandes são paginadas e limitadas a PDF_MAX_LINHAS linhas, com aviso no relatório.
+    """
+    from reportlab.platypus import SimpleDocTemplate, PageBreak
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    pdf_bytes = None
+    final_text_output = resultado_texto
+
+    # Usa o DataFrame para texto se estiver disponível (limitado como a tabela do PDF)
+    if resultado_df is not None and not resultado_df.empty:
+        parcial, aviso = _limita_linhas(resultado_df)
+        final_text_output = parcial.to_markdown(index=parcial.index.name is not None)
+        if aviso:
+            final_text_output += f"\n\n{aviso}"
+
+    if secoes is None:
+        secoes = [{'pergunta': pergunta, 'resultado_df': resultado_df, 'img_bytes': img_bytes}]
+
+    try:
+        pdf_output_buffer = io.BytesIO()
+        doc = SimpleDocTemplate(pdf_output_buffer, pagesize=A4, leftMargin=inch, rightMargin=inch,
+                                topMargin=inch, bottomMargin=inch, title="Relatório de Análise de Dados")
+        estilos = getSampleStyleSheet()
+
+        story = []
+        for i, secao in enumerate(secoes):
+            if i > 0:
+                story.append(PageBreak())
+            titulo = "Relatório de Análise de Dados"
+            if len(secoes) > 1:
+                titulo += f" — Seção {i + 1} de {len(secoes)}"
+            story += _secao(secao, titulo, estilos, doc.width, doc.height)
+
+        doc.build(story)
+        pdf_bytes = pdf_output_buffer.getvalue()
+
+    except Exception as e:
+        pdf_bytes = None
+
+    return final_text_output, img_bytes, pdf_bytes
@@ -0,0 +1,139 @@
+import os
+import re
+from agents.llm_client import estima_tokens
+from helpers.normalize_text import normalize_text
+
+# Teto (tokens estimados) do prompt de geração de código, incluindo esquema, contexto RAG e histórico
+PROMPT_MAX_TOKENS = int(os.environ.get('EDA_PROMPT_MAX_TOKENS', 3000))
+# Tokens reservados para as instruções fixas do prompt (persona, regras)
+PROMPT_TOKENS_INSTRUCOES = 500
+# Fração do orçamento garantida ao contexto RAG quando o esquema não cabe inteiro
+PROMPT_FRACAO_CONTEXTO = 0.4
+# Casas decimais mantidas nos números do contexto recuperado
+PROMPT_CASAS_DECIMAIS = 3
+# Colunas numeradas consecutivas (V1, V2, ...) com o mesmo dtype viram uma faixa a partir deste tamanho
+PROMPT_MIN_GRUPO = 3
+# Linhas recuperadas com mais colunas que isto mostram só as colunas mais relevantes, rotuladas
+PROMPT_COLUNAS_POR_LINHA = 12
+
+_NUMERO = re.compile(r"-?\d+\.\d+(?:[eE][-+]?\d+)?")
+
+
+def _termos(texto):
+    return set(re.findall(r"\w+", normalize_text(str(texto)).upper()))
+
+
+def ordena_colunas(colunas, pergunta):
+    """
+    Ordena as colunas por relevância para a pergunta (nome citado > partes do nome citadas), de forma estável.
+    Retorna (colunas ordenadas, conjunto das colunas relevantes).
+    """
+    termos = _termos(pergunta)
+
+    def pontuacao(col):
+        nome = normalize_text(str(col)).upper()
+        if nome in termos or re.search(rf"\b{re.escape(nome)}\b", normalize_text(pergunta).upper()):
+            return 2
+        partes = {p for p in re.split(r"[\W_]+|(?<=[a-z])(?=[A-Z])", str(col)) if len(p) >= 3}
+        return 1 if any(normalize_text(p).upper() in termos for p in partes) else 0
+
+    pontos = {col: pontuacao(col) for col in colunas}
+    return sorted(colunas, key=lambda c: -pontos[c]), {c for c, p in pontos.items() if p > 0}
+
+
+def _linhas_esquema(colunas, dtypes, relevantes):
+    """Linhas do esquema: colunas relevantes primeiro, depois as demais com as numeradas agrupadas em faixas."""
+    linhas = [f"- {c} (dtype: {dtypes[c]})" for c in colunas if c in relevantes]
+
+    grupos = []  # {'prefixo', 'fim', 'dtype', 'colunas'}
+    for col in colunas:
+        m = re.fullmatch(r"(.*?)(\d+)", str(col))
+        g = grupos[-1] if grupos else None
+        if m and g and g['prefixo'] == m.group(1) and g['dtype'] == dtypes[col] and g['fim'] + 1 == int(m.group(2)):
+            g['fim'] = int(m.group(2))
+            g['colunas'].append(col)
+        else:
+            grupos.append({'prefixo': m.group(1) if m else None, 'fim': int(m.group(2)) if m else None,
+                           'dtype': dtypes[col], 'colunas': [col]})
+
+    for g in grupos:
+        if len(g['colunas']) >= PROMPT_MIN_GRUPO:
+            linhas.append(f"- {g['colunas'][0]} a {g['colunas'][-1]} ({len(g['colunas'])} colunas numeradas em sequência, dtype: {g['dtype']})")
+        else:
+            linhas += [f"- {c} (dtype: {g['dtype']})" for c in g['colunas'] if c not in relevantes]
+    return linhas
+
+
+def trunca_precisao(texto, casas=PROMPT_CASAS_DECIMAIS):
+    """Reduz os números decimais do texto a `casas` casas decimais (notação científica: 3 algarismos)."""
+    def curto(m):
+        numero = m.group(0)
+        if 'e' in numero.lower():
+            return f"{float(numero):.3g}"
+        if len(numero.split('.')[1]) <= casas:
+            return numero
+        return f"{float(numero):.{casas}f}".rstrip('0').rstrip('.')
+    return _NUMERO.sub(curto, texto)
+
+
+def _compacta_linha(linha, colunas, ordem):
+    """Linha de dados (valores separados por espaço, na ordem das colunas) reduzida às colunas mais relevantes."""
+    valores = linha.split(' ')
+    if len(colunas) <= PROMPT_COLUNAS_POR_LINHA or len(valores) != len(colunas):
+        return linha
+    posicao = {c: i for i, c in enumerate(colunas)}
+    pares = [f"{c}={valores[posicao[c]]}" for c in ordem[:PROMPT_COLUNAS_POR_LINHA]]
+    return "LINHA: " + ", ".join(pares) + f", … (+{len(colunas) - PROMPT_COLUNAS_POR_LINHA} colunas)"
+
+
+def _ate_o_limite(linhas, limite):
+    """Primeiras linhas que cabem em `limite` tokens (a primeira é cortada se sozinha exceder); retorna (linhas, omitidas)."""
+    escolhidas, usados = [], 0
+    for linha in linhas:
+        custo = estima_tokens(linha + "\n")
+        if usados + custo > limite:
+            if not escolhidas and limite > 0:
+                escolhidas.append(linha[:max(0, limite * 4 - 2)] + "…")
+            break
+        escolhidas.append(linha)
+        usados += custo
+    return escolhidas, len(linhas) - len(escolhidas)
+
+
+def compacta_prompt(pergunta, df, contexto, tokens_reservados=0, teto=PROMPT_MAX_TOKENS):
+    """
+    Esquema e contexto RAG compactados para caber em `teto` tokens (descontados os `tokens_reservados` pelo
+    restante do prompt): colunas ordenadas por relevância para a pergunta, colunas numeradas agrupadas em
+    faixas, números do contexto com precisão reduzida e linhas largas restritas às colunas relevantes.
+    Retorna (esquema, contexto, métricas).
+    """
+    colunas = list(df.columns)
+    dtypes = dict(zip(colunas, df.dtypes))
+    ordem, relevantes = ordena_colunas(colunas, pergunta)
+    esquema_original = '\n'.join(f"- {c} (dtype: {dtypes[c]})" for c in colunas)
+    contexto = contexto or ""
+
+    linhas_contexto = [trunca_precisao(_compacta_linha(l, colunas, ordem)) for l in contexto.split('\n') if l.strip()]
+    linhas_esquema = _linhas_esquema(colunas, dtypes, relevantes)
+
+    orcamento = max(0, teto - PROMPT_TOKENS_INSTRUCOES - tokens_reservados)
+    tokens_contexto = sum(estima_tokens(l + "\n") for l in linhas_contexto)
+    limite_esquema = orcamento - min(tokens_contexto, int(orcamento * PROMPT_FRACAO_CONTEXTO))
+    esquema, linhas_esquema_omitidas = _ate_o_limite(linhas_esquema, limite_esquema)
+    if linhas_esquema_omitidas:
+        esquema.append(f"- ... e mais {linhas_esquema_omitidas} linhas do esquema omitidas (use df.columns / df.dtypes no código).")
+    esquema = '\n'.join(esquema)
+
+    linhas_contexto, linhas_omitidas = _ate_o_limite(linhas_contexto, orcamento - estima_tokens(esquema))
+    contexto_compacto = '\n'.join(linhas_contexto)
+
+    metricas = {
+        'colunas': len(colunas),
+        'tokens_esquema_original': estima_tokens(esquema_original),
+        'tokens_esquema': estima_tokens(esquema),
+        'tokens_contexto_original': estima_tokens(contexto),
+        'tokens_contexto': estima_tokens(contexto_compacto),
+        'linhas_esquema_omitidas': linhas_esquema_omitidas,
+        'linhas_contexto_omitidas': linhas_omitidas,
+    }
+    return esquema, contexto_compacto, metricas
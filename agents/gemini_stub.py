@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Atraso (s) entre os trechos emitidos pelo stub, simulando a geração token a token
+STUB_DELAY = float(os.environ.get('EDA_LLM_STUB_DELAY', '0.02'))
+STUB_TOKENS_POR_TRECHO = 3
+
+CODIGO_STUB = """```python
+resultado_df = df.describe().T
+print(resultado_df.to_string())
+```"""
+# Modo fora da memória: `df` é uma relação DuckDB
+CODIGO_STUB_DUCKDB = """```python
+resultado_df = df.describe().df()
+print(resultado_df.to_string())
+```"""
+CONCLUSAO_STUB = "As estatísticas descritivas mostram a escala e a dispersão de cada coluna numérica do conjunto de dados."
+
+
+class _Trecho:
+    def __init__(self, text):
+        self.text = text
+
+
+class ModeloStreamingLocal:
+    """
+    Stub local com a mesma interface usada de `genai.GenerativeModel` (`generate_content`, com ou sem
+    `stream=True`). Responde de forma determinística conforme o tipo de prompt, sem acesso à rede.
+    """
+
+    def __init__(self, delay=STUB_DELAY):
+        self.delay = delay
+
+    def _resposta(self, prompt):
+        if "# CONSULTA CLARIFICADA" in prompt:
+            original = prompt.split("# CONSULTA ORIGINAL DO USUÁRIO:")[-1].split("# CONSULTA CLARIFICADA")[0]
+            return original.strip()
+        if "# CÓDIGO PYTHON (DUCKDB" in prompt:
+            return CODIGO_STUB_DUCKDB
+        if "# CÓDIGO PYTHON" in prompt:
+            return CODIGO_STUB
+        return CONCLUSAO_STUB
+
+    def _trechos(self, texto):
+        tokens = re.findall(r"\S+\s*|\s+", texto)
+        for i in range(0, len(tokens), STUB_TOKENS_POR_TRECHO):
+            time.sleep(self.delay)
+            yield _Trecho("".join(tokens[i:i + STUB_TOKENS_POR_TRECHO]))
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        texto = self._resposta(prompt)
+        if stream:
+            return self._trechos(texto)
+        time.sleep(self.delay * max(1, len(texto.split()) // STUB_TOKENS_POR_TRECHO))
+        return _Trecho(texto)
+
+
+class _MockGeminiHandler(BaseHTTPRequestHandler):
+    """Responde a `models/*:generateContent` e `models/*:streamGenerateContent` como a API REST do Gemini."""
+
+    protocol_version = "HTTP/1.0"  # o streaming termina ao fechar a conexão
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        servidor = self.server
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with servidor.lock:
+            servidor.requisicoes += 1
+            falhar = servidor.requisicoes <= servidor.falhas_iniciais
+        if falhar:
+            self._json(429, {"error": {"code": 429, "message": "Quota excedida (mock)", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        prompt = "".join(p.get("text", "") for c in corpo.get("contents", []) for p in c.get("parts", []))
+        modelo = ModeloStreamingLocal(delay=servidor.delay)
+        texto = modelo._resposta(prompt)
+        uso = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(texto) // 4,
+               "totalTokenCount": (len(prompt) + len(texto)) // 4}
+
+        def resposta(parte, final=False):
+            candidato = {"content": {"parts": [{"text": parte}], "role": "model"}, "index": 0}
+            if final:
+                candidato["finishReason"] = "STOP"
+            return {"candidates": [candidato], "usageMetadata": uso}
+
+        if ":streamGenerateContent" not in self.path:
+            time.sleep(servidor.delay)
+            self._json(200, resposta(texto, final=True))
+            return
+
+        # Streaming REST: um array JSON enviado elemento a elemento
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"[")
+        for i, trecho in enumerate(modelo._trechos(texto)):
+            self.wfile.write((("," if i else "") + json.dumps(resposta(trecho.text))).encode())
+            self.wfile.flush()
+        self.wfile.write(("," + json.dumps(resposta("", final=True)) + "]").encode())
+
+
+def inicia_servidor_mock(porta=0, delay=STUB_DELAY, falhas_iniciais=0):
+    """
+    Inicia o servidor mock da API Gemini em uma thread e retorna o servidor (endpoint em
+    `http://127.0.0.1:{servidor.server_port}`). As `falhas_iniciais` primeiras requisições recebem 429.
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _MockGeminiHandler)
+    servidor.daemon_threads = True
+    servidor.delay = delay
+    servidor.falhas_iniciais = falhas_iniciais
+    servidor.requisicoes = 0
+    servidor.lock = threading.Lock()
+    threading.Thread(target=servidor.serve_forever, name="mock-gemini", daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor mock da API Gemini (use com EDA_LLM_ENDPOINT).")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=STUB_DELAY)
+    parser.add_argument("--falhas-iniciais", type=int, default=0)
+    args = parser.parse_args()
+    servidor = inicia_servidor_mock(args.porta, args.delay, args.falhas_iniciais)
+    print(f"Mock Gemini em http://127.0.0.1:{servidor.server_port}")
+    threading.Event().wait()
@@ -0,0 +1,204 @@
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+import streamlit as st
+
+MODELO_GEMINI = 'gemini-2.5-flash'
+# Com EDA_LLM_STUB=1 os agentes usam o modelo local de agents/gemini_stub.py (sem rede)
+USAR_STUB = os.environ.get('EDA_LLM_STUB', '0') == '1'
+# Endpoint alternativo da API (ex: o servidor mock de agents/gemini_stub.py: http://127.0.0.1:8765)
+LLM_ENDPOINT = os.environ.get('EDA_LLM_ENDPOINT')
+
+# Limites compartilhados por todas as sessões do processo
+LLM_MAX_CONCORRENCIA = int(os.environ.get('EDA_LLM_MAX_CONCURRENCY', 8))
+LLM_REQUISICOES_POR_MINUTO = float(os.environ.get('EDA_LLM_RPM', 60))
+LLM_RAJADA = int(os.environ.get('EDA_LLM_BURST', 10))
+LLM_TIMEOUT = float(os.environ.get('EDA_LLM_TIMEOUT', 60))
+LLM_TENTATIVAS = 4
+LLM_BACKOFF_INICIAL = 1.0
+LLM_BACKOFF_MAXIMO = 20.0
+# Chamadas mantidas para as métricas (latência, tokens)
+LLM_HISTORICO_METRICAS = 500
+
+
+class TokenBucket:
+    """Limitador de taxa: `taxa` requisições por segundo, com rajadas de até `capacidade`."""
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível; retorna o tempo (s) de espera."""
+        espera_total = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+                self.atualizado = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return espera_total
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
+            espera_total += espera
+
+
+def _erros_retentaveis():
+    from google.api_core import exceptions
+    return (exceptions.TooManyRequests, exceptions.ResourceExhausted, exceptions.ServiceUnavailable,
+            exceptions.InternalServerError, exceptions.DeadlineExceeded, ConnectionError)
+
+
+def _texto_do_chunk(chunk):
+    # Chunks sem partes (ex: o último, só com o motivo de término) não têm `.text`
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def estima_tokens(texto):
+    """Estimativa local do número de tokens (~4 caracteres por token), sem chamar a API."""
+    return len(texto) // 4
+
+
+def _uso_de_tokens(resposta, prompt, texto):
+    """(tokens de entrada, tokens de saída) informados pela API, ou estimados."""
+    uso = getattr(resposta, 'usage_metadata', None)
+    if uso is not None and getattr(uso, 'prompt_token_count', 0):
+        return uso.prompt_token_count, uso.candidates_token_count
+    return estima_tokens(prompt), estima_tokens(texto)
+
+
+class LLMClient:
+    """
+    Cliente Gemini compartilhado: um modelo (e conexão) por API key, limitador de taxa (token bucket),
+    concorrência limitada, retentativas com backoff exponencial e métricas de latência e tokens por chamada.
+    """
+
+    def __init__(self, max_concorrencia=LLM_MAX_CONCORRENCIA, requisicoes_por_minuto=LLM_REQUISICOES_POR_MINUTO,
+                 rajada=LLM_RAJADA, tentativas=LLM_TENTATIVAS, endpoint=LLM_ENDPOINT):
+        self.tentativas = tentativas
+        self.endpoint = endpoint
+        self._modelos = {}
+        self._lock = threading.Lock()
+        self._semaforo = threading.BoundedSemaphore(max_concorrencia)
+        self._bucket = TokenBucket(requisicoes_por_minuto / 60.0, rajada)
+        self._chamadas = deque(maxlen=LLM_HISTORICO_METRICAS)
+
+    def modelo(self, api_key):
+        """Modelo reutilizado para a `api_key` (criado na primeira chamada)."""
+        with self._lock:
+            model = self._modelos.get(api_key)
+            if model is None:
+                model = self._cria_modelo(api_key)
+                self._modelos[api_key] = model
+            return model
+
+    def _cria_modelo(self, api_key):
+        if USAR_STUB:
+            from agents.gemini_stub import ModeloStreamingLocal
+            return ModeloStreamingLocal()
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        model = genai.GenerativeModel(MODELO_GEMINI)
+        # Cliente próprio por API key (sem genai.configure, que é global ao processo e misturaria as chaves
+        # das sessões). `_client` é interno à biblioteca: a versão está fixada no requirements.txt e
+        # tests/test_llm_client.py verifica, contra o servidor mock, que as requisições passam por ele
+        client_options = {'api_key': api_key}
+        if self.endpoint:
+            client_options['api_endpoint'] = self.endpoint
+        model._client = glm.GenerativeServiceClient(client_options=client_options,
+                                                    transport='rest' if self.endpoint else None)
+        return model
+
+    def gera_texto(self, api_key, prompt, on_token=None, completo=None, etapa=""):
+        """
+        Gera a resposta para `prompt`. Com `on_token`, usa streaming e chama `on_token(texto_acumulado)` a
+        cada trecho recebido; `completo(texto_acumulado)` permite encerrar o streaming antes do fim.
+        Erros transitórios (quota, indisponibilidade) são repetidos com backoff exponencial, desde que
+        nenhum trecho já tenha sido entregue.
+        """
+        model = self.modelo(api_key)
+        registro = {'etapa': etapa, 'inicio': time.time(), 'tentativas': 0, 'espera_taxa': 0.0,
+                    'ttft': None, 'latencia': None, 'tokens_entrada': 0, 'tokens_saida': 0, 'erro': None}
+        retentaveis = () if USAR_STUB else _erros_retentaveis()
+        emitido = {'texto': ""}
+        try:
+            for tentativa in range(self.tentativas):
+                registro['tentativas'] = tentativa + 1
+                registro['espera_taxa'] += self._bucket.acquire()
+                try:
+                    with self._semaforo:
+                        return self._chamada(model, prompt, on_token, completo, registro, emitido)
+                except retentaveis:
+                    if emitido['texto'] or tentativa == self.tentativas - 1:
+                        raise
+                    atraso = min(LLM_BACKOFF_MAXIMO, LLM_BACKOFF_INICIAL * 2 ** tentativa)
+                    time.sleep(atraso * random.uniform(0.5, 1.0))
+        except Exception as e:
+            registro['erro'] = type(e).__name__
+            raise
+        finally:
+            registro['latencia'] = time.time() - registro['inicio']
+            self._chamadas.append(registro)
+
+    def _chamada(self, model, prompt, on_token, completo, registro, emitido):
+        inicio = time.perf_counter()
+        # As retentativas são feitas aqui; as da biblioteca ficam desativadas
+        request_options = {'timeout': LLM_TIMEOUT, 'retry': None}
+        if on_token is None:
+            resposta = model.generate_content(prompt, request_options=request_options)
+            texto = resposta.text
+            registro['ttft'] = time.perf_counter() - inicio
+            registro['tokens_entrada'], registro['tokens_saida'] = _uso_de_tokens(resposta, prompt, texto)
+            return texto
+
+        texto, ultimo = "", None
+        for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+            ultimo = chunk
+            trecho = _texto_do_chunk(chunk)
+            if not trecho:
+                continue
+            if registro['ttft'] is None:
+                registro['ttft'] = time.perf_counter() - inicio
+            texto += trecho
+            emitido['texto'] = texto
+            on_token(texto)
+            if completo is not None and completo(texto):
+                break
+        registro['tokens_entrada'], registro['tokens_saida'] = _uso_de_tokens(ultimo, prompt, texto)
+        return texto
+
+    def metricas(self):
+        """Resumo das últimas chamadas (para exibição na interface)."""
+        chamadas = list(self._chamadas)
+        latencias = sorted(c['latencia'] for c in chamadas if c['erro'] is None)
+        return {
+            'chamadas': len(chamadas),
+            'erros': sum(1 for c in chamadas if c['erro']),
+            'retentativas': sum(c['tentativas'] - 1 for c in chamadas),
+            'latencia_media': sum(latencias) / len(latencias) if latencias else 0.0,
+            'latencia_p95': latencias[math.ceil(0.95 * len(latencias)) - 1] if latencias else 0.0,
+            'tokens_entrada': sum(c['tokens_entrada'] for c in chamadas),
+            'tokens_saida': sum(c['tokens_saida'] for c in chamadas),
+        }
+
+
+@st.cache_resource
+def get_llm_client():
+    """Instância única do cliente LLM por processo (compartilhada entre sessões)."""
+    return LLMClient()
+
+
+def bloco_de_codigo_fechado(texto):
+    """Indica se o texto já contém um bloco ```python ... ``` completo."""
+    inicio = texto.find("```")
+    return inicio >= 0 and texto.find("```", inicio + 3) >= 0
@@ -0,0 +1,99 @@
+"""
+Benchmark de partida a frio do app (imports tardios + aquecimento em segundo plano).
+
+Cada medição roda em um processo Python novo, com e sem o aquecimento (EDA_RAG_WARMUP):
+  - primeira renderização: tempo até o `main.py` terminar a primeira execução (AppTest);
+  - primeira resposta: após a primeira renderização e `--think-time` segundos (o usuário digitando),
+    tempo do caminho de resposta local: busca RAG (modelo de embedding + FAISS), execução do
+    código gerado com gráfico e geração do PDF. As chamadas ao Gemini (rede) não entram na medição.
+
+Uso:
+    python benchmarks/benchmark_cold_start.py
+    python benchmarks/benchmark_cold_start.py --think-time 10 --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CODIGO_RESPOSTA = """
+fig, ax = plt.subplots()
+df['Amount'].plot.hist(ax=ax, bins=20)
+resultado_df = df.describe().T
+"""
+
+
+def child(args):
+    """Executa uma medição no processo atual e imprime o resultado em JSON."""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120).run()
+    result = {'render': time.perf_counter() - start, 'erro': [e.value for e in at.exception]}
+
+    time.sleep(args.think_time)
+    answer_start = time.perf_counter()
+    import zipfile
+    import numpy as np
+    import pandas as pd
+    from agents.agente3 import agente3_formatar_apresentacao
+    from rag_components.create_faiss_index_for_chunk import create_vector_index
+    from rag_components.load_embedding_model import load_embedding_model
+    from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+
+    with zipfile.ZipFile(args.zip) as z:
+        name = next(n for n in z.namelist() if n.endswith('.csv'))
+        with z.open(name) as f:
+            df = pd.read_csv(f, nrows=200)
+    docs = df.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+    model = load_embedding_model()
+    embeddings = np.array(model.encode(docs, show_progress_bar=False)).astype('float32')
+    index = create_vector_index(embeddings)
+    index.add(embeddings)
+    index.search(np.array(model.encode(["distribuição do valor das transações"])).astype('float32'), 3)
+    texto, resultado_df, img_bytes, _ = executa_codigo_seguro(CODIGO_RESPOSTA, df)
+    agente3_formatar_apresentacao(texto, resultado_df, "Qual a distribuição de Amount?", img_bytes)
+    result['answer'] = time.perf_counter() - answer_start
+    print(json.dumps(result))
+
+
+def measure(warmup, args):
+    env = dict(os.environ, EDA_RAG_WARMUP='1' if warmup else '0')
+    cmd = [sys.executable, os.path.abspath(__file__), "--child",
+           "--think-time", str(args.think_time), "--zip", args.zip]
+    output = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zip", default=os.path.join(ROOT, "data", "test.zip"))
+    parser.add_argument("--think-time", type=float, default=5.0, help="Segundos entre a primeira renderização e a pergunta")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{'aquecimento':<12} {'1ª renderização (s)':>20} {'1ª resposta (s)':>16}")
+    for warmup in (False, True):
+        renders, answers = [], []
+        for _ in range(args.runs):
+            result = measure(warmup, args)
+            if result['erro']:
+                print(f"Erro na execução do app: {result['erro']}")
+            renders.append(result['render'])
+            answers.append(result['answer'])
+        print(f"{'sim' if warmup else 'não':<12} {statistics.median(renders):>20.3f} {statistics.median(answers):>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
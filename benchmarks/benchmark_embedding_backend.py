@@ -0,0 +1,102 @@
+"""
+Benchmark dos backends do modelo de embedding (PyTorch float32 x ONNX Runtime int8).
+
+Codifica as linhas de data/test.zip com cada backend e reporta a vazão (linhas/s), a similaridade de
+cosseno média/mínima entre os vetores de cada backend e os do PyTorch, e a concordância da recuperação:
+recall@k das buscas do backend em relação às buscas feitas sobre o índice do PyTorch.
+
+Uso:
+    python benchmarks/benchmark_embedding_backend.py
+    python benchmarks/benchmark_embedding_backend.py --linhas 5000 --qconfig avx512_vnni
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+
+import faiss
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PERGUNTAS = [
+    "transações com valor alto",
+    "Amount acima de 1000 e Class 1",
+    "fraude em cartão de crédito",
+    "linhas com valores negativos de V1",
+]
+
+
+def load_docs(args):
+    """Documentos de linha como os do índice RAG (valores separados por espaço)."""
+    with zipfile.ZipFile(args.zip) as z:
+        name = next(n for n in z.namelist() if n.endswith('.csv'))
+        df = pd.read_csv(io.BytesIO(z.read(name)), on_bad_lines='skip')
+    if args.linhas:
+        df = df.head(args.linhas)
+    return df.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zip", default=os.path.join(os.path.dirname(__file__), "..", "data", "test.zip"))
+    parser.add_argument("--linhas", type=int, default=0, help="Limita as linhas codificadas (0 = todas)")
+    parser.add_argument("--queries", type=int, default=100, help="Linhas usadas como consulta, além das perguntas fixas")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--qconfig", default=None, help="Configuração de quantização do ONNX (padrão: EDA_EMBEDDING_ONNX_QCONFIG)")
+    args = parser.parse_args()
+    if args.qconfig:
+        os.environ['EDA_EMBEDDING_ONNX_QCONFIG'] = args.qconfig
+
+    from rag_components.load_embedding_model import EMBEDDING_BACKENDS, build_embedding_model
+
+    docs = load_docs(args)
+    rng = np.random.default_rng(0)
+    consultas = PERGUNTAS + [docs[i] for i in rng.choice(len(docs), size=min(args.queries, len(docs)), replace=False)]
+    k = min(args.k, len(docs))
+
+    base = None
+    rows = []
+    for backend, label in EMBEDDING_BACKENDS.items():
+        inicio = time.perf_counter()
+        model = build_embedding_model(backend)
+        carga_s = time.perf_counter() - inicio
+        model.encode(docs[:args.batch_size], show_progress_bar=False)  # aquecimento
+
+        inicio = time.perf_counter()
+        vectors = np.array(model.encode(docs, batch_size=args.batch_size, show_progress_bar=False)).astype('float32')
+        segundos = time.perf_counter() - inicio
+        queries = np.array(model.encode(consultas, show_progress_bar=False)).astype('float32')
+
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        _, found = index.search(queries, k)
+        if base is None:
+            base = {'vectors': vectors, 'found': found}
+
+        normas = np.linalg.norm(vectors, axis=1) * np.linalg.norm(base['vectors'], axis=1)
+        cosseno = (vectors * base['vectors']).sum(axis=1) / np.maximum(normas, 1e-12)
+        rows.append({
+            'backend': backend,
+            'descricao': label,
+            'carga_s': round(carga_s, 2),
+            'linhas_por_s': round(len(docs) / segundos, 1),
+            'cosseno_medio': round(float(cosseno.mean()), 4),
+            'cosseno_min': round(float(cosseno.min()), 4),
+            f'recall@{k}': round(recall(found, base['found']), 4),
+        })
+
+    print(f"{len(docs)} linhas, {len(consultas)} consultas; referência: {next(iter(EMBEDDING_BACKENDS))}")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark da análise de desempenho do código gerado (sandboxing/otimizador_codigo.py).
+
+Executa um corpus de códigos no estilo dos gerados pelo agente 2 (laços com iterrows/itertuples,
+apply linha a linha, lambdas elemento a elemento, gráficos de pontos e códigos já vetorizados) sobre
+um dataset sintético, como foram gerados e depois de otimizados. Reporta o custo estimado, o tempo
+de cada versão, as reescritas aplicadas, se os resultados coincidem e a ação que seria tomada com
+o mesmo código sobre um dataset maior (--linhas-decisao), onde o orçamento de tempo entra em jogo.
+Termina com erro se alguma versão otimizada divergir da original; a igualdade dos resultados e o relato
+dos padrões não reescritos também são verificados por tests/test_otimizador_codigo.py.
+
+Uso:
+    python benchmarks/benchmark_otimizador_codigo.py
+    python benchmarks/benchmark_otimizador_codigo.py --rows 300000 --linhas-decisao 50000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro  # noqa: E402
+from sandboxing.otimizador_codigo import CODIGO_ORCAMENTO_S, executa_codigo_otimizado, otimiza_codigo  # noqa: E402
+
+CORPUS = {
+    'apply_classifica': """
+df['Faixa'] = df.apply(lambda row: 'alto' if row['Amount'] > 100 else 'baixo', axis=1)
+resultado_df = df['Faixa'].value_counts().to_frame()
+print(resultado_df.to_string())
+""",
+    'apply_condicao_composta': """
+df['Suspeita'] = df.apply(lambda r: r['Amount'] > 200 and (r['V1'] < -1 or r['V2'] > 1), axis=1)
+resultado_df = df.groupby('Class')['Suspeita'].mean().to_frame()
+print(resultado_df.to_string())
+""",
+    'apply_aritmetica': """
+razao = df.apply(lambda linha: abs(linha['V1'] - linha['V2']) / (linha['Amount'] + 1), axis=1)
+resultado_df = razao.describe().to_frame('razao')
+print(resultado_df.to_string())
+""",
+    'apply_intervalo': """
+resultado_df = df[df.apply(lambda r: 0 < r['V1'] < 1, axis=1)].groupby('Categoria')['Amount'].sum().to_frame()
+print(resultado_df.to_string())
+""",
+    'series_apply': """
+valores = df['Amount'].apply(lambda x: x * 1.1 if x > 10 else 0)
+resultado_df = valores.describe().to_frame()
+print(resultado_df.to_string())
+""",
+    'series_map_texto': """
+categorias = df['Categoria'].map(lambda c: c.upper())
+resultado_df = categorias.value_counts().to_frame()
+print(resultado_df.to_string())
+""",
+    'iterrows_soma_condicional': """
+total_fraude = 0
+qtd_fraude = 0
+for index, row in df.iterrows():
+    if row['Class'] == 1:
+        total_fraude += row['Amount']
+        qtd_fraude += 1
+resultado_df = pd.DataFrame({'total': [total_fraude], 'quantidade': [qtd_fraude]})
+print(resultado_df.to_string())
+""",
+    'iterrows_contagem': """
+linhas = 0
+for _, r in df.iterrows():
+    linhas += 1
+print(f"Total de linhas: {linhas}")
+""",
+    'itertuples_lista': """
+valores_altos = []
+for t in df.itertuples():
+    if t.Amount > 500:
+        valores_altos.append(t.Amount)
+resultado_df = pd.DataFrame({'media': [np.mean(valores_altos)], 'qtd': [len(valores_altos)]})
+print(resultado_df.to_string())
+""",
+    'loc_em_laco': """
+positivos = 0
+for i in range(len(df)):
+    if df.loc[i, 'V1'] > 0:
+        positivos += 1
+print(f"Linhas com V1 positivo: {positivos}")
+""",
+    'funcao_nomeada': """
+def classifica(linha):
+    if linha['Amount'] > 100:
+        return 'alto'
+    return 'baixo'
+resultado_df = df.apply(classifica, axis=1).value_counts().to_frame()
+print(resultado_df.to_string())
+""",
+    'dispersao_plt': """
+fig, axes = graficos.figura(1)
+axes[0].scatter(df['V1'], df['Amount'], s=2)
+axes[0].set_title('V1 x Amount')
+""",
+    'vetorizado': """
+resultado_df = df.groupby('Categoria').agg(media=('Amount', 'mean'), fraudes=('Class', 'sum'))
+print(resultado_df.to_string())
+""",
+    'laco_colunas': """
+medias = {}
+for col in ['V1', 'V2', 'Amount']:
+    medias[col] = df[col].mean()
+resultado_df = pd.DataFrame(medias, index=['media'])
+print(resultado_df.to_string())
+""",
+}
+
+
+def dataset_sintetico(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Time': np.arange(rows, dtype='float64'),
+        'V1': rng.normal(size=rows),
+        'V2': rng.normal(size=rows),
+        'Amount': rng.exponential(80, size=rows).round(2),
+        'Categoria': rng.choice(['varejo', 'servicos', 'online', 'viagem'], size=rows),
+        'Class': (rng.random(rows) < 0.01).astype('int64'),
+    })
+
+
+def iguais(original, otimizado):
+    """Os dois resultados coincidem? (tabelas com tolerância numérica: somas vetorizadas mudam a ordem das parcelas)"""
+    if original[2] or otimizado[2]:
+        return False
+    if original[1] is None or otimizado[1] is None:
+        return original[0] == otimizado[0]
+    try:
+        pd.testing.assert_frame_equal(original[1], otimizado[1], check_dtype=False, check_names=False, rtol=1e-7)
+        return True
+    except AssertionError:
+        return False
+
+
+def cronometra(funcao, *args, **kwargs):
+    start = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--linhas-decisao", type=int, default=10_000_000,
+                        help="Linhas para as quais a ação (executar/amostrar/rejeitar) é estimada, sem executar")
+    args = parser.parse_args()
+
+    df = dataset_sintetico(args.rows)
+    colunas = list(df.columns)
+    rows = []
+    for nome, codigo in CORPUS.items():
+        codigo = codigo.strip()
+        original, tempo_original = cronometra(executa_codigo_seguro, codigo, df)
+        otimizado, tempo_otimizado = cronometra(executa_codigo_otimizado, codigo, df)
+        relatorio = otimizado[4]
+        decisao = otimiza_codigo(codigo, args.linhas_decisao, colunas)[1]
+        grafico = original[3] is not None
+        rows.append({
+            'codigo': nome,
+            'estimado_s': round(relatorio['custo_original_s'], 2),
+            'original_s': round(tempo_original, 3),
+            'otimizado_s': round(tempo_otimizado, 3),
+            'speedup': round(tempo_original / max(tempo_otimizado, 1e-9), 1),
+            'reescritas': len(relatorio['reescritas']),
+            'iguais': ("gráfico" if otimizado[3] is not None else "erro") if grafico else iguais(original, otimizado),
+            f'acao_{args.linhas_decisao}': decisao['acao'] + (f" ({decisao['linhas_amostra']})" if decisao['linhas_amostra'] else ""),
+        })
+
+    print(f"{args.rows} linhas x {len(colunas)} colunas; orçamento de {CODIGO_ORCAMENTO_S:.0f} s")
+    print(pd.DataFrame(rows).to_string(index=False))
+    divergentes = [row['codigo'] for row in rows if row['iguais'] in (False, "erro")]
+    if divergentes:
+        sys.exit(f"Resultados divergentes entre o código original e o otimizado: {', '.join(divergentes)}")
+
+
+if __name__ == "__main__":
+    main()
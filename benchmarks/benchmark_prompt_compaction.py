@@ -0,0 +1,112 @@
+"""
+Benchmark da compactação do prompt de geração de código (agents/compactador_prompt.py).
+
+Para cada dataset (data/test.zip e um sintético largo) e pergunta, gera o prompt de código do agente2
+com e sem a compactação e reporta os tokens estimados do prompt, o tempo da compactação e a latência
+da chamada ao Gemini. Sem `--api-key`, usa o modelo local (EDA_LLM_STUB), e a latência reportada não
+reflete a API real.
+
+Uso:
+    python benchmarks/benchmark_prompt_compaction.py
+    python benchmarks/benchmark_prompt_compaction.py --colunas 1000 --api-key SUA_CHAVE
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PERGUNTAS = [
+    "Qual a média de Amount por Class?",
+    "Quais colunas têm maior variância?",
+    "Há relação entre temperatura_media e umidade_relativa?",
+]
+TOP_K = 3
+
+
+def datasets(args):
+    with zipfile.ZipFile(args.zip) as z:
+        name = next(n for n in z.namelist() if n.endswith('.csv'))
+        real = pd.read_csv(io.BytesIO(z.read(name)), on_bad_lines='skip')
+
+    rng = np.random.default_rng(0)
+    n_sensores = max(0, args.colunas - 6)
+    largo = pd.DataFrame(rng.normal(size=(200, n_sensores)), columns=[f"sensor_{i}" for i in range(1, n_sensores + 1)])
+    largo['temperatura_media'] = rng.normal(25, 5, 200)
+    largo['umidade_relativa'] = rng.uniform(20, 90, 200)
+    largo['cidade'] = rng.choice(["Recife", "Natal", "Salvador"], 200)
+    largo['Amount'] = rng.exponential(100, 200)
+    largo['Class'] = rng.integers(0, 2, 200)
+    largo['id_registro'] = np.arange(200)
+    return {'test.zip': real, f'sintetico_{largo.shape[1]}_colunas': largo}
+
+
+def contexto_recuperado(df):
+    """Documentos de linha como os do índice RAG (valores separados por espaço), para as primeiras linhas."""
+    return "\n".join(df.head(TOP_K).astype(str).apply(lambda x: ' '.join(x), axis=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zip", default=os.path.join(os.path.dirname(__file__), "..", "data", "test.zip"))
+    parser.add_argument("--colunas", type=int, default=500, help="Colunas do dataset sintético largo")
+    parser.add_argument("--api-key", default=None, help="Chave do Gemini para medir a latência real")
+    args = parser.parse_args()
+    if not args.api_key:
+        os.environ['EDA_LLM_STUB'] = '1'
+        os.environ.setdefault('EDA_LLM_RPM', '100000')  # sem espera do limitador de taxa no modelo local
+
+    import agents.agente2 as agente2
+    from agents.compactador_prompt import compacta_prompt
+    from agents.llm_client import LLMClient, estima_tokens
+
+    # Intercepta a chamada de geração de código para medir o prompt e a latência
+    medicao = {}
+    gera_texto_original = LLMClient.gera_texto
+
+    def gera_texto(self, api_key, prompt, *a, etapa="", **k):
+        inicio = time.perf_counter()
+        texto = gera_texto_original(self, api_key, prompt, *a, etapa=etapa, **k)
+        if etapa == 'codigo':
+            medicao.update(tokens=estima_tokens(prompt), latencia=time.perf_counter() - inicio)
+        return texto
+    LLMClient.gera_texto = gera_texto
+
+    def sem_compactacao(pergunta, df, contexto, **kwargs):
+        esquema = '\n'.join(f"- {c} (dtype: {df[c].dtype})" for c in df.columns)
+        return esquema, contexto, {}
+
+    tempos_compactacao = {}
+
+    def com_compactacao(pergunta, df, contexto, **kwargs):
+        inicio = time.perf_counter()
+        resultado = compacta_prompt(pergunta, df, contexto, **kwargs)
+        tempos_compactacao['ms'] = (time.perf_counter() - inicio) * 1000
+        return resultado
+
+    rows = []
+    for nome, df in datasets(args).items():
+        contexto = contexto_recuperado(df)
+        for pergunta in PERGUNTAS:
+            linha = {'dataset': nome, 'pergunta': pergunta[:40]}
+            for modo, funcao in (('antes', sem_compactacao), ('depois', com_compactacao)):
+                agente2.compacta_prompt = funcao
+                medicao.clear()
+                agente2.agente2_gera_codigo_pandas_eda(pergunta, args.api_key or "stub", df, contexto)
+                linha[f'tokens_{modo}'] = medicao.get('tokens')
+                linha[f'latencia_{modo}_s'] = round(medicao.get('latencia', float('nan')), 3)
+            linha['compactacao_ms'] = round(tempos_compactacao['ms'], 2)
+            rows.append(linha)
+
+    print(f"Modelo: {'Gemini (API)' if args.api_key else 'stub local (latência não representativa)'}")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark do índice por linha em shards (ShardedIndex) em relação a um único índice FAISS.
+
+Reporta latência média de busca (sem filtro e com filtro por ids), concordância dos top-k com o
+índice único e bytes gravados nos checkpoints de uma ingestão em chunks: o índice único é regravado
+inteiro a cada checkpoint; no índice em shards, só o shard aberto é regravado.
+
+Uso:
+    python benchmarks/benchmark_sharded_index.py
+    python benchmarks/benchmark_sharded_index.py --rows 1000000 --shard-rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_components.create_faiss_index_for_chunk import create_vector_index  # noqa: E402
+from rag_components.sharded_index import INDEX_SEARCH_THREADS, ShardedIndex  # noqa: E402
+
+DIMENSION = 384
+CHUNK_SIZE = 1000
+
+
+def synthetic_embeddings(rows):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, DIMENSION)).astype('float32')
+    return (centers[rng.integers(len(centers), size=rows)] + 0.3 * rng.normal(size=(rows, DIMENSION))).astype('float32')
+
+
+def ingest(index, vectors, checkpoint_every, directory):
+    """Adiciona os vetores em chunks, gravando um checkpoint a cada `checkpoint_every` chunks. Retorna os bytes gravados."""
+    written = 0
+    path = os.path.join(directory, "index.bin")
+    for n, start in enumerate(range(0, len(vectors), CHUNK_SIZE), start=1):
+        index.add(vectors[start:start + CHUNK_SIZE])
+        if n % checkpoint_every:
+            continue
+        if isinstance(index, ShardedIndex):
+            before = {name: os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)}
+            index.persist(directory)
+            written += sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+                           if before.get(name) != os.path.getmtime(os.path.join(directory, name)))
+        else:
+            faiss.write_index(index, path)
+            written += os.path.getsize(path)
+    return written
+
+
+def timed_search(index, queries, k, allowed_ids=None):
+    found = []
+    start = time.perf_counter()
+    for query in queries:
+        query = query[None, :]
+        if allowed_ids is None:
+            _, ids = index.search(query, k)
+        elif isinstance(index, ShardedIndex):
+            _, ids = index.search(query, k, allowed_ids=allowed_ids)
+        else:
+            _, ids = index.search(query, k, params=faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_ids)))
+        found.append(ids[0])
+    return (time.perf_counter() - start) * 1000 / len(queries), found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--shard-rows", type=int, default=50_000)
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Chunks entre checkpoints")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=args.queries, replace=False)] + 0.05 * rng.normal(size=(args.queries, DIMENSION)).astype('float32')
+    allowed_ids = np.sort(rng.choice(len(vectors), size=len(vectors) // 2, replace=False)).astype('int64')
+
+    rows = []
+    truth = {}
+    for nome, index in (("único", create_vector_index(vectors[:CHUNK_SIZE])),
+                        ("shards", ShardedIndex(create_vector_index(vectors[:CHUNK_SIZE]), args.shard_rows))):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            written = ingest(index, vectors, args.checkpoint_every, tmp)
+            ingest_s = time.perf_counter() - start
+        latency, found = timed_search(index, queries, args.k)
+        latency_filtered, found_filtered = timed_search(index, queries, args.k, allowed_ids)
+        truth.setdefault('busca', found)
+        truth.setdefault('filtro', found_filtered)
+        rows.append({
+            'indice': nome,
+            'shards': len(index.shards) if isinstance(index, ShardedIndex) else 1,
+            'ingestao_s': round(ingest_s, 2),
+            'checkpoints_MB_gravados': round(written / 1e6, 1),
+            'latencia_ms': round(latency, 3),
+            'latencia_filtro_ms': round(latency_filtered, 3),
+            'topk_iguais': np.mean([np.array_equal(a, b) for a, b in zip(found, truth['busca'])]),
+            'topk_iguais_filtro': np.mean([np.array_equal(a, b) for a, b in zip(found_filtered, truth['filtro'])]),
+        })
+
+    print(f"{len(vectors)} vetores de dimensão {DIMENSION}, {args.queries} consultas, "
+          f"{INDEX_SEARCH_THREADS} threads de busca, checkpoint a cada {args.checkpoint_every} chunks de {CHUNK_SIZE}")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
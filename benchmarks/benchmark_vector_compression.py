@@ -0,0 +1,106 @@
+"""
+Benchmark da compressão de vetores do índice RAG (flat, fp16, sq8, pq).
+
+Reporta, para cada configuração: memória do índice, tamanho do checkpoint (_faiss_index.bin),
+latência média de busca e recall@k em relação ao índice sem compressão, com e sem
+reordenação em precisão total dos candidatos.
+
+Uso:
+    python benchmarks/benchmark_vector_compression.py                 # embeddings das linhas de data/test.zip
+    python benchmarks/benchmark_vector_compression.py --synthetic 200000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import faiss
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rag_components.create_faiss_index_for_chunk import VECTOR_COMPRESSION, create_vector_index  # noqa: E402
+
+DIMENSION = 384
+RERANK_FACTOR = 5
+
+
+def load_embeddings(args):
+    """Embeddings reais (modelo do app sobre data/test.zip) ou sintéticos agrupados em clusters."""
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(256, DIMENSION)).astype('float32')
+        vectors = centers[rng.integers(len(centers), size=args.synthetic)] + 0.3 * rng.normal(size=(args.synthetic, DIMENSION)).astype('float32')
+        return vectors.astype('float32')
+
+    from sentence_transformers import SentenceTransformer
+    with zipfile.ZipFile(args.zip) as z:
+        name = next(n for n in z.namelist() if n.endswith('.csv'))
+        df = pd.read_csv(io.BytesIO(z.read(name)), on_bad_lines='skip')
+    docs = df.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+    model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+    return np.array(model.encode(docs, show_progress_bar=False)).astype('float32')
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zip", default=os.path.join(os.path.dirname(__file__), "..", "data", "test.zip"))
+    parser.add_argument("--synthetic", type=int, default=0, help="Número de vetores sintéticos (0 = usar o modelo)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = load_embeddings(args)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype('float32')
+    k = min(args.k, len(vectors))
+
+    truth = None
+    rows = []
+    for compressao, (label, _) in VECTOR_COMPRESSION.items():
+        index = create_vector_index(vectors, compressao)
+        index.add(vectors)
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        if truth is None:
+            truth = found
+
+        # Reordenação: candidatos extras comparados com os vetores em precisão total
+        _, candidates = index.search(queries, k * RERANK_FACTOR)
+        reranked = []
+        for query, ids in zip(queries, candidates):
+            ids = ids[ids >= 0]
+            distances = ((vectors[ids] - query) ** 2).sum(axis=1)
+            reranked.append(ids[np.argsort(distances)[:k]])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.bin")
+            faiss.write_index(index, path)
+            checkpoint_bytes = os.path.getsize(path)
+
+        rows.append({
+            'compressao': compressao,
+            'descricao': label,
+            'memoria_MB': faiss.serialize_index(index).nbytes / 1e6,
+            'checkpoint_MB': checkpoint_bytes / 1e6,
+            'latencia_ms': round(latency_ms, 3),
+            f'recall@{k}': round(recall(found, truth), 4),
+            f'recall@{k}_rerank': round(recall(reranked, truth), 4),
+        })
+
+    print(f"{len(vectors)} vetores de dimensão {vectors.shape[1]}, {len(queries)} consultas")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
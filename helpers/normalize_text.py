@@ -1,5 +1,5 @@
-import unicodedata
-
-def normalize_text(text):
-    """Normaliza texto (remove acentos e cedilhas)."""
+import unicodedata
+
+def normalize_text(text):
+    """Normaliza texto (remove acentos e cedilhas)."""
     return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
\ No newline at end of file
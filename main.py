@@ -1,462 +1,963 @@
-﻿import streamlit as st
-import pandas as pd
-import zipfile
-import os
-import io
-import hashlib
-
-# --- Helpers, Modules and Sandboxing ---
-from helpers.normalize_text import normalize_text
-from modules.init_session_state import init_session_state
-from sandboxing.executa_codigo_seguro import executa_codigo_seguro
-
-# ------- Agents -------
-from agents.agente_limpeza_dados import agente_limpeza_dados
-from agents.agente0 import agente0_clarifica_pergunta
-from agents.agente1 import (
-    agente1_identifica_arquivos,
-    agente1_interpreta_contexto_arquivo,
-    agente1_processa_arquivo_chunk
-)
-from agents.agente2 import agente2_gera_codigo_pandas_eda
-from agents.agente3 import agente3_formatar_apresentacao
-
-# --- RAG Components ---
-from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk
-from rag_components.retrieve_context import retrieve_context
-from rag_components.save_progress import save_progress
-from rag_components.load_progress import load_progress
-
-# Importação da SentenceTransformer será feita via st.cache_resource
-
-# --- Configurações Iniciais e Variáveis ---
-# Streamlit Page Configuration
-st.set_page_config(
-    page_title="Análise Exploratória de Dados (EDA) com Gemini e RAG",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Constantes
-CHUNK_SIZE = 1000
-
-# --- Inicialização de Session State ---
-init_session_state()
-
-# --- Streamlit UI ---
-st.title("Análise Exploratória de Dados (EDA) com Gemini e RAG")
-st.markdown("---")
-
-# --- Configuração da Sidebar ---
-with st.sidebar:
-    st.header("Configurações")
-    with st.form("api_key_form"):
-        api_key_input = st.text_input("Cole sua API Key do Gemini aqui", value=st.session_state['gemini_api_key'], type="password", key="gemini_api_key_input_form")
-        submitted = st.form_submit_button("Salvar API Key")
-        if submitted:
-            st.session_state['gemini_api_key'] = api_key_input
-            st.success("API Key salva com sucesso!")
-
-    st.markdown("---")
-    st.info("1. Faça o upload do arquivo **ZIP**.")
-    st.info("2. Clique em **'Listar Arquivos'** para identificação.")
-    st.info("3. Escolha o arquivo e clique em **'Analisar'**.")
-    st.info("4. Faça sua pergunta de EDA.")
-
-# --- Seção 1: Upload e Seleção de Dados ---
-st.header("1. Upload e Seleção de Dados")
-zipfile_input = st.file_uploader("Selecione o arquivo ZIP com o(s) arquivo(s) de dados (CSV, XLSX, TXT)", type=["zip"])
-
-if st.button("Listar Arquivos no ZIP"):
-    if zipfile_input is not None:
-        st.session_state['zip_bytes'] = zipfile_input.getvalue()
-        st.session_state['zip_hash'] = hashlib.md5(st.session_state['zip_bytes']).hexdigest()
-        
-        # Reseta estados importantes
-        st.session_state['selected_file_name'] = None 
-        st.session_state['df'] = None 
-        st.session_state['conclusoes_historico'] = "" 
-        st.session_state['processed_percentage'] = 0
-        st.session_state['available_files'] = []
-        st.session_state['file_options_map'] = {}
-        st.session_state['faiss_index'] = None
-        st.session_state['documents'] = []
-
-
-        with st.spinner("Analisando arquivos e gerando contexto com Gemini..."):
-            file_info_list = agente1_identifica_arquivos(st.session_state['zip_bytes'])
-            
-            if not file_info_list:
-                st.error("O ZIP não contém arquivos CSV, XLSX ou TXT válidos.")
-            else:
-                st.session_state['available_files'] = file_info_list
-                
-                file_context_map = agente1_interpreta_contexto_arquivo(st.session_state.get('gemini_api_key'), file_info_list)
-                
-                options = {}
-                for info in file_info_list:
-                    context = file_context_map.get(info['name'], "Contexto não gerado.")
-                    options[info['name']] = f"**{info['name']}** - {context}"
-                
-                st.session_state['file_options_map'] = options
-                st.success(f"Encontrados {len(file_info_list)} arquivos de dados. Escolha qual analisar.")
-
-if st.session_state['available_files']:
-    
-    st.markdown("---")
-    st.subheader("Selecione o Arquivo para Análise:")
-    
-    options_list = list(st.session_state['file_options_map'].keys())
-    
-    if not options_list:
-        st.error("Nenhum arquivo elegível encontrado após a identificação.")
-    else:
-        display_options = [st.session_state['file_options_map'][key] for key in options_list]
-        
-        default_index = 0
-        try:
-            if st.session_state['selected_file_name'] in options_list:
-                default_index = options_list.index(st.session_state['selected_file_name'])
-        except:
-             default_index = 0
-
-        selected_display = st.radio(
-            "Arquivos Encontrados (Nome - Contexto Inferido):",
-            options=display_options,
-            index=default_index,
-            key="file_selection_radio"
-        )
-        
-        selected_file_name = options_list[display_options.index(selected_display)]
-        st.session_state['selected_file_name'] = selected_file_name
-        
-        selected_file_info = next((info for info in st.session_state['available_files'] if info["name"] == selected_file_name), None)
-        
-        if st.button(f"Analisar Arquivo: {selected_file_name}") and selected_file_info:
-            
-            expected_num_cols = selected_file_info['num_cols']
-            
-            # --- INÍCIO DO PROCESSO DE CARGA/CHUNKED (RAG) ---
-            
-            st.info(f"Tentando carregar progresso anterior para **{selected_file_name}**...")
-            
-            # Tenta carregar o progresso anterior
-            df_loaded, index_loaded, docs_loaded, lines_loaded_processed = load_progress(st.session_state['zip_hash'], selected_file_name)
-            
-            st.session_state['df'] = df_loaded
-            st.session_state['faiss_index'] = index_loaded
-            st.session_state['documents'] = docs_loaded
-            st.session_state['current_chunk_start'] = lines_loaded_processed # Onde deve continuar o chunking
-            
-            # Tenta obter o total de linhas real do arquivo
-            total_lines_file = 0
-            try:
-                ext = selected_file_info['extension']
-                if ext == '.csv' or ext == '.txt':
-                    with zipfile.ZipFile(io.BytesIO(st.session_state['zip_bytes']), "r") as z:
-                        with z.open(selected_file_name, 'r') as file_in_zip:
-                            # Subtrai 1 para o cabeçalho
-                            total_lines_file = sum(1 for line in io.TextIOWrapper(file_in_zip, encoding='utf-8', errors='ignore')) - 1 
-                else:
-                    # Para XLSX, apenas usamos uma estimativa inicial alta
-                    total_lines_file = CHUNK_SIZE * 50 
-                    
-            except Exception as e:
-                total_lines_file = CHUNK_SIZE * 10 
-            
-            # Define o total de linhas real do arquivo (ou o que foi processado se for maior que a estimativa)
-            st.session_state['total_lines'] = max(total_lines_file, lines_loaded_processed)
-            
-            st.session_state['file_name_context'] = normalize_text(os.path.splitext(selected_file_name)[0].upper().replace('_', ' ').replace('-', ' '))
-
-            # Verifica se o carregamento foi completo ou se precisa continuar
-            if lines_loaded_processed > 0 and lines_loaded_processed >= total_lines_file:
-                st.session_state['df'] = agente_limpeza_dados(st.session_state['df'])
-                st.session_state['processed_percentage'] = 100
-                st.success(f"Processamento de **{selected_file_name}** concluído (total de linhas: {len(st.session_state['df'])}).")
-                progress_bar = st.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
-                st.rerun() 
-            
-            # Se o carregamento parcial ocorreu, precisamos continuar
-            elif lines_loaded_processed > 0 and lines_loaded_processed < total_lines_file:
-                st.info(f"Progresso parcial encontrado ({lines_loaded_processed} linhas). Continuaremos o processamento para as {total_lines_file - lines_loaded_processed} linhas restantes.")
-                st.session_state['df_columns'] = st.session_state['df'].columns # Garante que as colunas sejam mantidas
-                st.session_state['df'] = agente_limpeza_dados(st.session_state['df']) # Limpa a parte já carregada
-            
-            # --- INÍCIO DO NOVO PROCESSAMENTO (Se o carregamento falhou ou é a primeira vez) ---
-            else:
-                st.info(f"Iniciando novo processamento para **{selected_file_name}** ({st.session_state['total_lines']} linhas estimadas)...")
-                st.session_state['df'] = None
-                st.session_state['faiss_index'] = None
-                st.session_state['documents'] = []
-                st.session_state['conclusoes_historico'] = ""
-                st.session_state['df_columns'] = None
-                st.session_state['processed_percentage'] = 0
-                st.session_state['cleaned_status'] = {}
-                st.session_state['current_chunk_start'] = 0
-                lines_loaded_processed = 0
-
-
-            # Loop de processamento de chunks
-            progress_bar = st.progress(lines_loaded_processed / st.session_state['total_lines'], 
-                                       text=f"Criando embeddings e índice RAG... {lines_loaded_processed}/{st.session_state['total_lines']} linhas...")
-            
-            start_row = lines_loaded_processed
-            
-            while start_row < st.session_state['total_lines'] or start_row == 0:
-                
-                chunk_processed, msg = agente1_processa_arquivo_chunk(
-                    st.session_state['zip_bytes'], 
-                    selected_file_name, 
-                    start_row, 
-                    CHUNK_SIZE, 
-                    st.session_state['df_columns'],
-                    expected_num_cols
-                )
-                
-                if chunk_processed is not None:
-                    
-                    # 1. Aplica limpeza e concatena
-                    chunk_processed = agente_limpeza_dados(chunk_processed)
-                    
-                    if st.session_state['df'] is None:
-                        st.session_state['df'] = chunk_processed
-                        st.session_state['df_columns'] = chunk_processed.columns
-                        # Re-calcula o número total de colunas esperado
-                        expected_num_cols = len(st.session_state['df_columns'])
-                    else:
-                        # Garante que as colunas do chunk coincidam com o DF principal
-                        if len(chunk_processed.columns) == len(st.session_state['df_columns']):
-                            chunk_processed.columns = st.session_state['df_columns']
-                        st.session_state['df'] = pd.concat([st.session_state['df'], chunk_processed], ignore_index=True)
-                    
-                    # 2. Cria índice RAG para o chunk
-                    create_faiss_index_for_chunk(chunk_processed)
-                    
-                    # 3. Atualiza progresso
-                    start_row += len(chunk_processed)
-                    st.session_state['current_chunk_start'] = start_row
-                    
-                    # Recalibra o total de linhas se necessário
-                    if len(chunk_processed) < CHUNK_SIZE and start_row < st.session_state['total_lines']:
-                         st.session_state['total_lines'] = start_row
-                         
-                    progress_value = min(start_row / st.session_state['total_lines'], 1.0) if st.session_state['total_lines'] > 0 else 1.0
-                    st.session_state['processed_percentage'] = progress_value * 100
-                    
-                    progress_bar.progress(progress_value, 
-                                          text=f"Criando embeddings e índice RAG... {start_row}/{st.session_state['total_lines']} linhas - {st.session_state['processed_percentage']:.1f}%")
-                    
-                    save_progress(st.session_state['zip_hash'], st.session_state['df'], st.session_state['faiss_index'], st.session_state['documents'], st.session_state['total_lines'])
-                    
-                    # Condição de parada (processou o último chunk)
-                    if len(chunk_processed) < CHUNK_SIZE:
-                        st.session_state['total_lines'] = start_row # Fixa o total de linhas
-                        break
-                        
-                else:
-                    if "todos os lotes concluído" in msg:
-                        st.session_state['total_lines'] = start_row # Fixa o total de linhas
-                        break
-                    st.error(msg)
-                    break
-            
-            if st.session_state['df'] is not None and len(st.session_state['df']) > 0:
-                st.session_state['total_lines'] = len(st.session_state['df'])
-                st.success(f"Processamento de **{selected_file_name}** concluído! Total de linhas carregadas: {len(st.session_state['df'])}")
-                progress_bar.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
-                st.session_state['processed_percentage'] = 100
-                st.rerun() 
-            else:
-                progress_bar.empty()
-                st.error("Falha ao carregar o arquivo. Verifique se o formato está correto.")
-
-st.markdown("---")
-
-# --- Seção 2: Consulta à IA ---
-st.header("2. Consultar a IA")
-
-if st.session_state['df'] is None or st.session_state['processed_percentage'] < 5.0:
-    st.info("Aguardando o processamento do arquivo para habilitar a consulta.")
-else:
-    if st.session_state['file_name_context'] and st.session_state['selected_file_name']:
-        st.info(f"Analisando: **{st.session_state['selected_file_name']}**. Contexto: **{st.session_state['file_name_context']}**.")
-
-    pergunta = st.text_area(
-        "Pergunte em português sobre os dados:",
-        value=st.session_state.get('user_query_input_widget', ""),
-        placeholder="Ex: Qual o tipo de cada coluna? Me dê as estatísticas descritivas. Há correlação entre V1 e V2? Gere um boxplot para outliers.",
-        height=100,
-        key="user_query_input_widget"
-    )
-    
-    # Botões de Ação
-    col1_icons, col2_icons, col3_icons, col4_icons, col5_icons = st.columns([1, 1, 1, 1, 4])
-    
-    if col1_icons.button("Consultar (🔎)"):
-        st.session_state['consultar_ia'] = True
-
-    # Botões de display para ativar após a consulta (só aparecem após a primeira consulta)
-    if st.session_state.get('codigo_gerado'):
-        with col2_icons:
-            if st.button("Gráfico (📊)"):
-                st.session_state['habilitar_grafico'] = True
-        with col3_icons:
-            if st.button("Código (✍️)"):
-                st.session_state['exibir_codigo'] = True
-        with col4_icons:
-            if st.button("PDF (📄)"):
-                st.session_state['gerar_pdf'] = True
-
-    st.markdown("---")
-    
-    # --- Lógica de Execução da Consulta (BLOBO ATUALIZADO) ---
-    if 'consultar_ia' in st.session_state and st.session_state['consultar_ia']:
-        st.session_state['consultar_ia'] = False
-        
-        if not st.session_state.get('gemini_api_key'):
-            st.error("Por favor, insira e salve sua API Key do Gemini na barra lateral.")
-        elif st.session_state['faiss_index'] is None or st.session_state['faiss_index'].ntotal == 0:
-            st.warning("O índice RAG não foi criado. Por favor, processe o arquivo (clique em 'Analisar Arquivo' e aguarde o progresso).")
-        else:
-            pergunta_original = pergunta # Captura a pergunta original do widget
-            
-            # --- NOVA ETAPA DE CLARIFICAÇÃO ---
-            with st.spinner("Clarificando sua pergunta e corrigindo possíveis erros de digitação..."):
-                pergunta_clarificada = agente0_clarifica_pergunta(pergunta_original, st.session_state['gemini_api_key'])
-            
-            pergunta_para_ia = pergunta_clarificada # A partir daqui, usa a versão limpa
-            
-            # Exibe a correção se ela ocorreu
-            if pergunta_para_ia != pergunta_original:
-                 st.warning(f"Sua consulta foi clarificada para: **{pergunta_para_ia}**")
-            # --- FIM DA NOVA ETAPA ---
-            
-            st.info(f"Análise realizada sobre **{st.session_state['processed_percentage']:.1f}%** dos dados já processados (total de **{len(st.session_state['df'])}** linhas).")
-            
-            with st.spinner("Gerando código e analisando dados..."):
-                df_to_use = st.session_state['df']
-                faiss_index = st.session_state['faiss_index']
-                documents = st.session_state['documents']
-                api_key = st.session_state['gemini_api_key']
-
-                # 1. Recupera o Contexto (RAG) - USANDO A PERGUNTA CLARIFICADA
-                retrieved_context = retrieve_context(pergunta_para_ia, faiss_index, documents)
-                
-                # 2. Gera Código e Conclusão - USANDO A PERGUNTA CLARIFICADA
-                codigo_gerado, conclusoes = agente2_gera_codigo_pandas_eda(
-                    pergunta_para_ia, 
-                    api_key, 
-                    df_to_use, 
-                    retrieved_context, 
-                    st.session_state['conclusoes_historico'],
-                    st.session_state['file_name_context'] 
-                )
-                
-                if conclusoes:
-                    # Adiciona a nova conclusão ao histórico
-                    st.session_state['conclusoes_historico'] += f"\n- {conclusoes}"
-                
-                st.session_state['codigo_gerado'] = codigo_gerado
-                
-                # 3. Executa o Código
-                if codigo_gerado.startswith("Erro:"):
-                    st.error(codigo_gerado)
-                else:
-                    resultado_texto, resultado_df, erro_execucao, img_bytes = executa_codigo_seguro(codigo_gerado, df_to_use)
-                    
-                    st.session_state['resultado_texto'] = resultado_texto
-                    st.session_state['resultado_df'] = resultado_df
-                    st.session_state['erro_execucao'] = erro_execucao
-                    st.session_state['img_bytes'] = img_bytes
-                    
-                    if erro_execucao:
-                        st.error(erro_execucao)
-                    else:
-                        st.subheader("Resultado da Análise:")
-                        
-                        # Exibe Tabela (Corrigido para evitar truncamento em colunas longas)
-                        if resultado_df is not None and not resultado_df.empty:
-                            
-                            # Hack para colunas longas (Texto completo)
-                            if 'INFORMAÇÃO' in resultado_df.columns:
-                                st.markdown("##### Informação Detalhada (Texto Completo):")
-                                
-                                # Cria a tabela Markdown (Título e Corpo)
-                                table_markdown = "| | INFORMAÇÃO |\n"
-                                table_markdown += "| :--- | :--- |\n"
-                                
-                                # Adiciona as linhas do DataFrame
-                                for index, row in resultado_df.iterrows():
-                                    # Usa o índice como a primeira coluna e o texto como a segunda
-                                    index_display = index if resultado_df.index.name is None else row.name
-                                    table_markdown += f"| **{index_display}** | {row['INFORMAÇÃO']} |\n"
-                                
-                                st.markdown(table_markdown)
-                                
-                            else:
-                                # Usa o st.dataframe normal para colunas numéricas/curtas
-                                column_config = {col: st.column_config.Column(
-                                    width="large",
-                                    help="Descrição"
-                                ) for col in resultado_df.columns}
-
-                                if resultado_df.index.name:
-                                    column_config[resultado_df.index.name] = st.column_config.TextColumn(
-                                        width="small",
-                                        help="Tipo/Índice"
-                                    )
-                                st.dataframe(resultado_df, use_container_width=True, column_config=column_config)
-                        
-                        # Exibe Gráfico (se houver)
-                        if img_bytes and 'habilitar_grafico' not in st.session_state:
-                            st.subheader("Gráfico Gerado:")
-                            st.image(img_bytes, caption="Gráfico da Análise", use_container_width=True)
-    
-    # --- Lógica de Exibição dos Botões Secundários ---
-    if 'exibir_codigo' in st.session_state and st.session_state['exibir_codigo']:
-        st.session_state['exibir_codigo'] = False
-        if st.session_state.get('codigo_gerado'):
-            st.subheader("Cógido Python Gerado:")
-            st.code(st.session_state['codigo_gerado'], language='python')
-        else:
-            st.warning("Nenhum código gerado. Faça uma consulta primeiro.")
-
-    if 'habilitar_grafico' in st.session_state and st.session_state['habilitar_grafico']:
-        st.session_state['habilitar_grafico'] = False
-        if st.session_state.get('img_bytes'):
-            st.subheader("Gráfico Gerado:")
-            st.image(st.session_state['img_bytes'], caption="Gráfico da Análise", use_container_width=True)
-        else:
-            st.warning("Nenhum gráfico gerado na última consulta.")
-
-    if 'gerar_pdf' in st.session_state and st.session_state['gerar_pdf']:
-        st.session_state['gerar_pdf'] = False
-        if st.session_state.get('codigo_gerado'):
-            with st.spinner("Gerando PDF..."):
-                _, _, pdf_bytes = agente3_formatar_apresentacao(st.session_state['resultado_texto'], st.session_state.get('resultado_df'), pergunta, st.session_state.get('img_bytes'))
-                
-                if pdf_bytes:
-                    st.subheader("Download do Relatório:")
-                    st.download_button(
-                        label="Baixar Relatório em PDF",
-                        data=pdf_bytes,
-                        file_name="relatorio_eda.pdf",
-                        mime="application/pdf"
-                    )
-                else:
-                    st.warning("Não foi possível gerar o PDF. Verifique se as bibliotecas (ReportLab) estão instaladas.")
-        else:
-            st.warning("Por favor, execute uma consulta e analise os dados primeiro para gerar o PDF.")
-
-st.markdown("---")
-
-# --- Seção 3: Conclusões do Agente ---
-st.header("3. Conclusões do Agente")
-if st.session_state['conclusoes_historico']:
-    st.markdown(st.session_state['conclusoes_historico'])
-else:
-    st.info("As conclusões da análise aparecerão aqui após a primeira consulta.")
-
-st.markdown("---")
+﻿import streamlit as st
+import zipfile
+import os
+import io
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Helpers, Modules and Sandboxing ---
+from helpers.normalize_text import normalize_text
+from modules.init_session_state import init_session_state
+from modules.shared_dataset_registry import get_shared_dataset_registry, shared_state_from_session
+from modules.session_memory_governor import get_session_memory_governor, ADMIN_VIEW
+from modules.memoria_conversa import MemoriaConversa
+from modules.executa_checklist import executa_checklist, CHECKLIST_PADRAO, CHECKLIST_WORKERS_LLM
+from sandboxing.otimizador_codigo import executa_codigo_otimizado, avisos_relatorio
+from sandboxing.execucao_aproximada import executa_codigo_aproximado, usa_dados
+
+# ------- Agents -------
+from agents.agente_limpeza_dados import agente_limpeza_dados
+from agents.agente0 import agente0_clarifica_pergunta
+from agents.agente1 import (
+    agente1_identifica_arquivos,
+    agente1_interpreta_contexto_arquivo,
+    agente1_processa_arquivo_chunk,
+    agente1_le_arquivo_em_chunks
+)
+from agents.agente2 import agente2_gera_codigo_pandas_eda
+from agents.agente3 import agente3_formatar_apresentacao
+from agents.llm_client import get_llm_client
+
+# --- RAG Components ---
+from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk, VECTOR_COMPRESSION
+from rag_components.retrieve_context import retrieve_context
+from rag_components.bitmap_index import parse_filter_expression
+from rag_components.checkpoint_cache import get_checkpoint_cache, member_content_hash
+from rag_components.create_faiss_index_for_profiles import create_faiss_index_for_profiles
+from rag_components.save_progress import save_progress, checkpoint_key, CHECKPOINT_EXTRA_KEYS
+from rag_components.summary_documents import INDEXING_MODES
+from rag_components.load_progress import load_progress
+from rag_components.warmup import start_background_warmup
+from rag_components.question_cache import get_question_cache, schema_hash, QUESTION_CACHE_ENABLED
+from rag_components.load_embedding_model import EMBEDDING_BACKEND, EMBEDDING_BACKENDS
+from rag_components.columnar_store import ColumnarStore, OUT_OF_CORE_AUTO_BYTES
+from rag_components.stratified_sample import StratifiedSample
+
+# Importação da SentenceTransformer será feita via st.cache_resource
+
+# --- Configurações Iniciais e Variáveis ---
+# Streamlit Page Configuration
+st.set_page_config(
+    page_title="Análise Exploratória de Dados (EDA) com Gemini e RAG",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Constantes
+CHUNK_SIZE = 1000
+
+# --- Inicialização de Session State ---
+init_session_state()
+shared_registry = get_shared_dataset_registry()
+shared_registry.touch(st.session_state['session_id'])
+# Mede a sessão no orçamento de memória do processo; se ela tinha sido descarregada por ociosidade, restaura os dados
+memory_governor = get_session_memory_governor()
+if memory_governor.touch(st.session_state['session_id']):
+    st.toast("Sessão restaurada do disco (estava ociosa e foi descarregada da memória).")
+# Carrega o modelo de embedding e as bibliotecas pesadas em segundo plano (uma vez por processo)
+warmup_status = start_background_warmup()
+
+
+def _mantem_sessao():
+    """Registra a interação em um fragmento; se a sessão tinha sido descarregada, re-executa a página inteira."""
+    if memory_governor.touch(st.session_state['session_id']):
+        st.rerun()
+
+def _total_linhas():
+    """Linhas do dataset carregado (no modo fora da memória, as das partes Parquet; o df é só a amostra)."""
+    tabela = st.session_state['tabela_colunar']
+    return tabela.rows if tabela is not None else len(st.session_state['df'])
+
+def _fixa_checkpoint_colunar():
+    """No modo fora da memória, fixa no cache a entrada com as partes Parquet e os shards em uso pela sessão (fora do descarte LRU)."""
+    cache = get_checkpoint_cache()
+    if st.session_state['tabela_colunar'] is None or not st.session_state['member_hash']:
+        cache.release(st.session_state['session_id'])
+        return
+    cache.pin(checkpoint_key(st.session_state['member_hash'], st.session_state['modo_indexacao'],
+                             st.session_state['compressao_vetores'], fora_da_memoria=True), st.session_state['session_id'])
+
+_fixa_checkpoint_colunar()
+
+# --- Streamlit UI ---
+st.title("Análise Exploratória de Dados (EDA) com Gemini e RAG")
+st.markdown("---")
+for aviso in st.session_state['avisos_restauracao']:
+    st.warning(aviso)
+st.session_state['avisos_restauracao'] = []
+
+# --- Configuração da Sidebar ---
+with st.sidebar:
+    st.header("Configurações")
+    with st.form("api_key_form"):
+        api_key_input = st.text_input("Cole sua API Key do Gemini aqui", value=st.session_state['gemini_api_key'], type="password", key="gemini_api_key_input_form")
+        submitted = st.form_submit_button("Salvar API Key")
+        if submitted:
+            st.session_state['gemini_api_key'] = api_key_input
+            st.success("API Key salva com sucesso!")
+
+    st.markdown("---")
+    st.info("1. Faça o upload do arquivo **ZIP**.")
+    st.info("2. Clique em **'Listar Arquivos'** para identificação.")
+    st.info("3. Escolha o arquivo e clique em **'Analisar'**.")
+    st.info("4. Faça sua pergunta de EDA.")
+
+    # Estado do cache de checkpoints
+    st.markdown("---")
+    cache_stats = get_checkpoint_cache().stats()
+    st.caption(
+        f"Cache de checkpoints: {cache_stats['entradas']} entradas, "
+        f"{cache_stats['bytes'] / 1024 ** 2:.1f} MB de {cache_stats['cota_bytes'] / 1024 ** 3:.1f} GB, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses."
+    )
+    if QUESTION_CACHE_ENABLED:
+        perguntas_stats = get_question_cache().stats()
+        st.caption(f"Cache de perguntas: {perguntas_stats['esquemas']} esquemas, "
+                   f"{perguntas_stats['hits']} hits / {perguntas_stats['misses']} misses.")
+    # Métricas do cliente LLM compartilhado (todas as sessões)
+    llm_stats = get_llm_client().metricas()
+    if llm_stats['chamadas']:
+        st.caption(
+            f"Gemini: {llm_stats['chamadas']} chamadas ({llm_stats['erros']} erros, {llm_stats['retentativas']} retentativas), "
+            f"latência média {llm_stats['latencia_media']:.2f} s (p95 {llm_stats['latencia_p95']:.2f} s), "
+            f"{llm_stats['tokens_entrada']} tokens de entrada / {llm_stats['tokens_saida']} de saída."
+        )
+    st.caption(f"Embeddings: {EMBEDDING_BACKENDS[EMBEDDING_BACKEND]}.")
+    memoria_stats = memory_governor.stats()
+    st.caption(
+        f"Memória das sessões: {memoria_stats['bytes'] / 1024 ** 2:.1f} MB de {memoria_stats['orcamento_bytes'] / 1024 ** 3:.1f} GB, "
+        f"{memoria_stats['sessoes']} sessões ({memoria_stats['descarregadas']} descarregadas para o disco; "
+        f"{memoria_stats['descarregamentos']} descarregamentos / {memoria_stats['restauracoes']} restaurações)."
+    )
+    if ADMIN_VIEW:
+        with st.expander("Sessões (administração)"):
+            st.dataframe(memory_governor.sessions(), use_container_width=True, hide_index=True)
+    if not warmup_status['concluido']:
+        st.caption("Carregando o modelo de embedding em segundo plano...")
+
+# --- Seção 1: Upload e Seleção de Dados ---
+st.header("1. Upload e Seleção de Dados")
+zipfile_input = st.file_uploader("Selecione o arquivo ZIP com o(s) arquivo(s) de dados (CSV, XLSX, TXT)", type=["zip"])
+
+if st.button("Listar Arquivos no ZIP"):
+    if zipfile_input is not None:
+        st.session_state['zip_bytes'] = zipfile_input.getvalue()
+        st.session_state['zip_hash'] = hashlib.md5(st.session_state['zip_bytes']).hexdigest()
+        
+        # Reseta estados importantes (e libera a referência ao dataset compartilhado)
+        shared_registry.release(st.session_state['session_id'])
+        get_checkpoint_cache().release(st.session_state['session_id'])
+        st.session_state['selected_file_name'] = None 
+        st.session_state['df'] = None 
+        st.session_state['memoria_conversa'] = MemoriaConversa()
+        st.session_state['processed_percentage'] = 0
+        st.session_state['available_files'] = []
+        st.session_state['file_options_map'] = {}
+        st.session_state['faiss_index'] = None
+        st.session_state['documents'] = []
+        for key in CHECKPOINT_EXTRA_KEYS:
+            st.session_state[key] = None
+
+        with st.spinner("Analisando arquivos e gerando contexto com Gemini..."):
+            file_info_list = agente1_identifica_arquivos(st.session_state['zip_bytes'])
+            
+            if not file_info_list:
+                st.error("O ZIP não contém arquivos CSV, XLSX ou TXT válidos.")
+            else:
+                st.session_state['available_files'] = file_info_list
+                
+                file_context_map = agente1_interpreta_contexto_arquivo(st.session_state.get('gemini_api_key'), file_info_list)
+                
+                options = {}
+                for info in file_info_list:
+                    context = file_context_map.get(info['name'], "Contexto não gerado.")
+                    options[info['name']] = f"**{info['name']}** - {context}"
+                
+                st.session_state['file_options_map'] = options
+                st.success(f"Encontrados {len(file_info_list)} arquivos de dados. Escolha qual analisar.")
+
+if st.session_state['available_files']:
+    
+    st.markdown("---")
+    st.subheader("Selecione o Arquivo para Análise:")
+    
+    options_list = list(st.session_state['file_options_map'].keys())
+    
+    if not options_list:
+        st.error("Nenhum arquivo elegível encontrado após a identificação.")
+    else:
+        display_options = [st.session_state['file_options_map'][key] for key in options_list]
+        
+        default_index = 0
+        try:
+            if st.session_state['selected_file_name'] in options_list:
+                default_index = options_list.index(st.session_state['selected_file_name'])
+        except:
+             default_index = 0
+
+        selected_display = st.radio(
+            "Arquivos Encontrados (Nome - Contexto Inferido):",
+            options=display_options,
+            index=default_index,
+            key="file_selection_radio"
+        )
+        
+        selected_file_name = options_list[display_options.index(selected_display)]
+        st.session_state['selected_file_name'] = selected_file_name
+        
+        selected_file_info = next((info for info in st.session_state['available_files'] if info["name"] == selected_file_name), None)
+        
+        # Modo de indexação RAG, escolhido por arquivo
+        modo_indexacao = st.radio(
+            "Modo de indexação RAG:",
+            options=list(INDEXING_MODES),
+            format_func=INDEXING_MODES.get,
+            horizontal=True,
+            key=f"modo_indexacao_{selected_file_name}"
+        )
+        
+        # Compressão dos vetores do índice por linha (reduz memória e tamanho do checkpoint)
+        compressao_vetores = st.selectbox(
+            "Compressão dos vetores do índice RAG:",
+            options=list(VECTOR_COMPRESSION),
+            format_func=lambda key: VECTOR_COMPRESSION[key][0],
+            key=f"compressao_vetores_{selected_file_name}"
+        )
+        
+        # Modo fora da memória: dados em Parquet no disco, consultados pelo código gerado via DuckDB
+        with zipfile.ZipFile(io.BytesIO(st.session_state['zip_bytes']), "r") as z:
+            tamanho_arquivo = z.getinfo(selected_file_name).file_size
+        fora_da_memoria = st.checkbox(
+            "Modo fora da memória (DuckDB sobre Parquet em disco)",
+            value=tamanho_arquivo > OUT_OF_CORE_AUTO_BYTES,
+            key=f"fora_da_memoria_{selected_file_name}",
+            help="Para arquivos maiores que a memória: os dados ficam em disco e as consultas leem só as colunas e blocos necessários. "
+                 f"Ativado por padrão acima de {OUT_OF_CORE_AUTO_BYTES / 1024 ** 3:.1f} GB."
+        )
+        
+        if st.button(f"Analisar Arquivo: {selected_file_name}") and selected_file_info:
+            # Imports tardios: pandas e o perfil só são necessários durante a ingestão
+            import pandas as pd
+            from rag_components.dataset_profile import DatasetProfile
+            
+            expected_num_cols = selected_file_info['num_cols']
+            session_id = st.session_state['session_id']
+            dataset_key = (st.session_state['zip_hash'], selected_file_name, modo_indexacao, compressao_vetores, fora_da_memoria)
+            
+            # --- DATASET COMPARTILHADO ENTRE SESSÕES ---
+            # Sessões que pedem o mesmo arquivo aguardam uma única carga, sem duplicar a ingestão
+            shared_registry.release(session_id)
+            build_lock = shared_registry.get_build_lock(dataset_key)
+            if not build_lock.acquire(blocking=False):
+                with st.spinner("Outra sessão está carregando este arquivo. Aguardando a carga compartilhada..."):
+                    build_lock.acquire()
+            
+            try:
+                shared_state = shared_registry.acquire(dataset_key, session_id)
+                if shared_state is not None:
+                    st.session_state.update(shared_state)
+                    _fixa_checkpoint_colunar()
+                    st.session_state['current_chunk_start'] = st.session_state['total_lines']
+                    st.session_state['processed_percentage'] = 100
+                    st.session_state['file_name_context'] = normalize_text(os.path.splitext(selected_file_name)[0].upper().replace('_', ' ').replace('-', ' '))
+                    st.success(f"**{selected_file_name}** já estava carregado em memória por outra sessão (total de linhas: {_total_linhas()}).")
+                    st.rerun()
+            
+                # --- INÍCIO DO PROCESSO DE CARGA/CHUNKED (RAG) ---
+            
+                st.info(f"Tentando carregar progresso anterior para **{selected_file_name}**...")
+            
+                # Tenta carregar o progresso anterior (cache endereçado pelo conteúdo do arquivo, não pelo ZIP)
+                st.session_state['member_hash'] = member_content_hash(st.session_state['zip_bytes'], selected_file_name)
+                df_loaded, index_loaded, docs_loaded, lines_loaded_processed, extras_loaded = load_progress(st.session_state['member_hash'], modo_indexacao, compressao_vetores, fora_da_memoria)
+                if df_loaded is not None:
+                    st.success(f"Checkpoint encontrado no cache (hit): {lines_loaded_processed} linhas já processadas.")
+            
+                st.session_state['modo_indexacao'] = modo_indexacao
+                st.session_state['compressao_vetores'] = compressao_vetores
+                st.session_state['df'] = df_loaded
+                st.session_state['faiss_index'] = index_loaded
+                st.session_state['documents'] = docs_loaded
+                for key in CHECKPOINT_EXTRA_KEYS:
+                    st.session_state[key] = extras_loaded.get(key)
+                _fixa_checkpoint_colunar()
+                st.session_state['current_chunk_start'] = lines_loaded_processed # Onde deve continuar o chunking
+            
+                # Tenta obter o total de linhas real do arquivo
+                total_lines_file = 0
+                try:
+                    ext = selected_file_info['extension']
+                    if ext == '.csv' or ext == '.txt':
+                        with zipfile.ZipFile(io.BytesIO(st.session_state['zip_bytes']), "r") as z:
+                            with z.open(selected_file_name, 'r') as file_in_zip:
+                                # Subtrai 1 para o cabeçalho
+                                total_lines_file = sum(1 for line in io.TextIOWrapper(file_in_zip, encoding='utf-8', errors='ignore')) - 1 
+                    else:
+                        # Para XLSX, apenas usamos uma estimativa inicial alta
+                        total_lines_file = CHUNK_SIZE * 50 
+                    
+                except Exception as e:
+                    total_lines_file = CHUNK_SIZE * 10 
+            
+                # Define o total de linhas real do arquivo (ou o que foi processado se for maior que a estimativa)
+                st.session_state['total_lines'] = max(total_lines_file, lines_loaded_processed)
+            
+                st.session_state['file_name_context'] = normalize_text(os.path.splitext(selected_file_name)[0].upper().replace('_', ' ').replace('-', ' '))
+
+                # Verifica se o carregamento foi completo ou se precisa continuar
+                if lines_loaded_processed > 0 and lines_loaded_processed >= total_lines_file:
+                    st.session_state['df'] = agente_limpeza_dados(st.session_state['df'])
+                    if st.session_state['perfil_dataset'] is None:
+                        st.session_state['perfil_dataset'] = DatasetProfile.from_dataframe(st.session_state['df'])
+                    if st.session_state['amostra_estratificada'] is None and not fora_da_memoria:
+                        st.session_state['amostra_estratificada'] = StratifiedSample()
+                        st.session_state['amostra_estratificada'].update(st.session_state['df'])
+                    if modo_indexacao != 'linhas':
+                        create_faiss_index_for_profiles(st.session_state['df'], st.session_state['cleaned_status'], _total_linhas(),
+                                                        perfil=st.session_state['perfil_dataset'])
+                    st.session_state['processed_percentage'] = 100
+                    shared_registry.publish(dataset_key, session_id, shared_state_from_session())
+                    st.success(f"Processamento de **{selected_file_name}** concluído (total de linhas: {_total_linhas()}).")
+                    progress_bar = st.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
+                    st.rerun() 
+            
+                # Se o carregamento parcial ocorreu, precisamos continuar
+                elif lines_loaded_processed > 0 and lines_loaded_processed < total_lines_file:
+                    st.info(f"Progresso parcial encontrado ({lines_loaded_processed} linhas). Continuaremos o processamento para as {total_lines_file - lines_loaded_processed} linhas restantes.")
+                    st.session_state['df_columns'] = st.session_state['df'].columns # Garante que as colunas sejam mantidas
+                    st.session_state['df'] = agente_limpeza_dados(st.session_state['df']) # Limpa a parte já carregada
+                    if st.session_state['perfil_dataset'] is None:
+                        st.session_state['perfil_dataset'] = DatasetProfile.from_dataframe(st.session_state['df'])
+            
+                # --- INÍCIO DO NOVO PROCESSAMENTO (Se o carregamento falhou ou é a primeira vez) ---
+                else:
+                    st.info(f"Iniciando novo processamento para **{selected_file_name}** ({st.session_state['total_lines']} linhas estimadas)...")
+                    st.session_state['df'] = None
+                    st.session_state['faiss_index'] = None
+                    st.session_state['documents'] = []
+                    for key in CHECKPOINT_EXTRA_KEYS:
+                        st.session_state[key] = None
+                    st.session_state['memoria_conversa'] = MemoriaConversa()
+                    st.session_state['df_columns'] = None
+                    st.session_state['processed_percentage'] = 0
+                    st.session_state['cleaned_status'] = {}
+                    st.session_state['current_chunk_start'] = 0
+                    lines_loaded_processed = 0
+                    if fora_da_memoria:
+                        # As partes Parquet ficam na entrada do checkpoint (mesma cota e descarte LRU)
+                        diretorio_entrada = get_checkpoint_cache().entry_dir(checkpoint_key(
+                            st.session_state['member_hash'], modo_indexacao, compressao_vetores, fora_da_memoria=True))
+                        st.session_state['tabela_colunar'] = ColumnarStore.create(os.path.join(diretorio_entrada, 'tabela'))
+                        _fixa_checkpoint_colunar()
+
+
+                # Loop de processamento de chunks
+                progress_bar = st.progress(lines_loaded_processed / st.session_state['total_lines'], 
+                                           text=f"Criando embeddings e índice RAG... {lines_loaded_processed}/{st.session_state['total_lines']} linhas...")
+            
+                start_row = lines_loaded_processed
+                tabela = st.session_state['tabela_colunar']
+                # Fora da memória, o arquivo é lido em uma única passada (sem reabrir o arquivo a cada chunk)
+                leitor = agente1_le_arquivo_em_chunks(st.session_state['zip_bytes'], selected_file_name, start_row, CHUNK_SIZE,
+                                                      st.session_state['df_columns'], expected_num_cols) if tabela is not None else None
+            
+                while start_row < st.session_state['total_lines'] or start_row == 0:
+                    # Ingestão longa: a sessão não conta como ociosa para o controle de memória
+                    memory_governor.keep_alive(session_id)
+                
+                    if leitor is not None:
+                        chunk_processed, msg = next(leitor, (None, "Processamento de todos os lotes concluído."))
+                    else:
+                        chunk_processed, msg = agente1_processa_arquivo_chunk(
+                            st.session_state['zip_bytes'], 
+                            selected_file_name, 
+                            start_row, 
+                            CHUNK_SIZE, 
+                            st.session_state['df_columns'],
+                            expected_num_cols
+                        )
+                
+                    if chunk_processed is not None:
+                    
+                        # 1. Aplica limpeza e concatena
+                        chunk_processed = agente_limpeza_dados(chunk_processed)
+                    
+                        if st.session_state['df'] is None:
+                            st.session_state['df'] = chunk_processed
+                            st.session_state['df_columns'] = chunk_processed.columns
+                            # Re-calcula o número total de colunas esperado
+                            expected_num_cols = len(st.session_state['df_columns'])
+                        else:
+                            # Garante que as colunas do chunk coincidam com o DF principal
+                            if len(chunk_processed.columns) == len(st.session_state['df_columns']):
+                                chunk_processed.columns = st.session_state['df_columns']
+                            # Fora da memória, o df guarda só o primeiro chunk (amostra do esquema)
+                            if tabela is None:
+                                st.session_state['df'] = pd.concat([st.session_state['df'], chunk_processed], ignore_index=True)
+                        # Fora da memória, o chunk vai para o buffer das partes Parquet
+                        parte_gravada = tabela.append(chunk_processed) if tabela is not None else True
+                    
+                        # 2. Cria índice RAG para o chunk e acumula o perfil estatístico
+                        create_faiss_index_for_chunk(chunk_processed, modo_indexacao, start_row, compressao_vetores)
+                        if st.session_state['perfil_dataset'] is None:
+                            st.session_state['perfil_dataset'] = DatasetProfile()
+                        st.session_state['perfil_dataset'].update(chunk_processed)
+                        # Amostra estratificada das respostas aproximadas (mantida na mesma passada)
+                        if st.session_state['amostra_estratificada'] is None:
+                            st.session_state['amostra_estratificada'] = StratifiedSample()
+                        st.session_state['amostra_estratificada'].update(chunk_processed)
+                    
+                        # 3. Atualiza progresso
+                        start_row += len(chunk_processed)
+                        st.session_state['current_chunk_start'] = start_row
+                    
+                        # Recalibra o total de linhas se necessário
+                        if len(chunk_processed) < CHUNK_SIZE and start_row < st.session_state['total_lines']:
+                             st.session_state['total_lines'] = start_row
+                         
+                        progress_value = min(start_row / st.session_state['total_lines'], 1.0) if st.session_state['total_lines'] > 0 else 1.0
+                        st.session_state['processed_percentage'] = progress_value * 100
+                    
+                        progress_bar.progress(progress_value, 
+                                              text=f"Criando embeddings e índice RAG... {start_row}/{st.session_state['total_lines']} linhas - {st.session_state['processed_percentage']:.1f}%")
+                    
+                        # Fora da memória, o checkpoint só é salvo quando uma parte é gravada (índice e partes consistentes)
+                        if parte_gravada:
+                            save_progress(st.session_state['member_hash'], st.session_state['df'], st.session_state['faiss_index'], st.session_state['documents'], st.session_state['total_lines'],
+                                          extras={key: st.session_state[key] for key in CHECKPOINT_EXTRA_KEYS})
+                    
+                        # Condição de parada (processou o último chunk)
+                        if len(chunk_processed) < CHUNK_SIZE:
+                            st.session_state['total_lines'] = start_row # Fixa o total de linhas
+                            break
+                        
+                    else:
+                        if "todos os lotes concluído" in msg:
+                            st.session_state['total_lines'] = start_row # Fixa o total de linhas
+                            break
+                        st.error(msg)
+                        break
+            
+                if tabela is not None and tabela.flush():
+                    save_progress(st.session_state['member_hash'], st.session_state['df'], st.session_state['faiss_index'], st.session_state['documents'], st.session_state['total_lines'],
+                                  extras={key: st.session_state[key] for key in CHECKPOINT_EXTRA_KEYS})
+                
+                if st.session_state['df'] is not None and len(st.session_state['df']) > 0:
+                    st.session_state['total_lines'] = _total_linhas()
+                    
+                    # Perfis de colunas sobre o arquivo completo (modos com resumos)
+                    if modo_indexacao != 'linhas':
+                        create_faiss_index_for_profiles(st.session_state['df'], st.session_state['cleaned_status'], _total_linhas(),
+                                                        perfil=st.session_state['perfil_dataset'])
+                        save_progress(st.session_state['member_hash'], st.session_state['df'], st.session_state['faiss_index'], st.session_state['documents'], st.session_state['total_lines'],
+                                      extras={key: st.session_state[key] for key in CHECKPOINT_EXTRA_KEYS})
+                    
+                    st.success(f"Processamento de **{selected_file_name}** concluído! Total de linhas carregadas: {_total_linhas()}")
+                    progress_bar.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
+                    st.session_state['processed_percentage'] = 100
+                    shared_registry.publish(dataset_key, session_id, shared_state_from_session())
+                    st.rerun() 
+                else:
+                    progress_bar.empty()
+                    st.error("Falha ao carregar o arquivo. Verifique se o formato está correto.")
+            finally:
+                build_lock.release()
+
+st.markdown("---")
+
+# --- Seção 2: Consulta à IA ---
+# A consulta e as visualizações do resultado são fragmentos: interagir com eles re-executa apenas o
+# próprio painel, sem reprocessar o restante da página. Saídas derivadas do resultado (tabela em
+# Markdown, PDF) ficam em cache por `resultado_id`.
+
+def _resultado_cache(nome, build):
+    """Retorna a saída `nome` do resultado atual, gerando-a com `build()` apenas na primeira vez."""
+    cache = st.session_state.get('resultado_cache')
+    if cache is None or cache['id'] != st.session_state['resultado_id']:
+        cache = st.session_state['resultado_cache'] = {'id': st.session_state['resultado_id']}
+    if nome not in cache:
+        cache[nome] = build()
+    return cache[nome]
+
+# PDFs gerados ao mesmo tempo no processo; a sessão só verifica periodicamente se o seu ficou pronto
+PDF_WORKERS = 2
+PDF_INTERVALO_VERIFICACAO = 1.0
+
+@st.cache_resource
+def _pdf_executor():
+    """Pool compartilhado entre as sessões para gerar os PDFs fora da thread da requisição."""
+    return ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+
+# Respostas aproximadas: o código roda primeiro na amostra estratificada e o resultado exato substitui
+# o aproximado quando a execução sobre o dataset inteiro termina (sugerido a partir deste número de linhas)
+APROXIMADO_MIN_LINHAS = int(os.environ.get('EDA_APPROX_MIN_ROWS', 100_000))
+EXECUCAO_WORKERS = 2
+
+@st.cache_resource
+def _execucao_executor():
+    """Pool compartilhado entre as sessões para as execuções exatas que refinam respostas aproximadas."""
+    return ThreadPoolExecutor(max_workers=EXECUCAO_WORKERS, thread_name_prefix="execucao")
+
+def _novo_resultado(pergunta, avisos, codigo_gerado=None, resultado_texto=None, resultado_df=None, erro_execucao=None, img_bytes=None,
+                    relatorio=None):
+    """Registra o resultado de uma consulta (invalida o cache de saídas do resultado anterior)."""
+    st.session_state.update({
+        'resultado_id': st.session_state['resultado_id'] + 1,
+        'pergunta_resultado': pergunta,
+        'avisos_consulta': avisos,
+        'codigo_gerado': codigo_gerado,
+        'resultado_texto': resultado_texto,
+        'resultado_df': resultado_df,
+        'erro_execucao': erro_execucao,
+        'img_bytes': img_bytes,
+        'relatorio_desempenho': relatorio,
+        'resultado_aproximado': None,
+        'resultado_exato': None,
+    })
+
+def _executa_consulta(pergunta_original, filtro_texto, rerank_rag, streaming=True, aproximado=False):
+    """
+    Clarifica a pergunta, recupera o contexto (RAG), gera e executa o código; guarda o resultado no session_state.
+    Em modo streaming, a clarificação, o código e as conclusões aparecem enquanto são gerados, e o código
+    começa a ser executado assim que fica completo (em paralelo à geração das conclusões).
+    Em modo aproximado, o resultado é calculado na amostra estratificada e a execução completa continua em
+    segundo plano, substituindo o resultado quando termina.
+    """
+    avisos = []  # (tipo, mensagem) exibidos junto ao resultado
+    inicio = time.perf_counter()
+    metricas = st.session_state['metricas_consulta'] = {}  # tempos (s) desde o início da consulta
+
+    def _on_token(etapa, placeholder, renderiza):
+        def on_token(texto):
+            metricas.setdefault(f"ttft_{etapa}", time.perf_counter() - inicio)
+            renderiza(placeholder, texto)
+        return on_token if streaming else None
+
+    area_clarificacao, area_codigo, area_conclusoes = st.empty(), st.empty(), st.empty()
+    if not st.session_state.get('gemini_api_key'):
+        _novo_resultado(pergunta_original, [('error', "Por favor, insira e salve sua API Key do Gemini na barra lateral.")])
+        return
+    if all(index is None or index.ntotal == 0 for index in (st.session_state['faiss_index'], st.session_state['faiss_index_resumos'])):
+        _novo_resultado(pergunta_original, [('warning', "O índice RAG não foi criado. Por favor, processe o arquivo (clique em 'Analisar Arquivo' e aguarde o progresso).")])
+        return
+
+    # --- CACHE SEMÂNTICO DE PERGUNTAS ---
+    # Pergunta equivalente já respondida para o mesmo esquema: dispensa a clarificação e/ou a geração.
+    # Com filtro, o contexto RAG (e portanto o código) depende do filtro: o cache não é usado.
+    cache_perguntas = get_question_cache()
+    tabela = st.session_state['tabela_colunar']
+    # O código reaproveitado depende do modo (Pandas ou DuckDB): os modos não compartilham respostas
+    chave_esquema = schema_hash(st.session_state['df']) + ("-duckdb" if tabela is not None else "")
+    usa_cache = QUESTION_CACHE_ENABLED and not filtro_texto.strip()
+    reaproveitada = cache_perguntas.lookup(chave_esquema, pergunta_original) if usa_cache else None
+
+    # --- ETAPA DE CLARIFICAÇÃO ---
+    if reaproveitada is not None:
+        pergunta_para_ia = reaproveitada['pergunta']
+    else:
+        with st.spinner("Clarificando sua pergunta e corrigindo possíveis erros de digitação..."):
+            pergunta_para_ia = agente0_clarifica_pergunta(
+                pergunta_original, st.session_state['gemini_api_key'],
+                on_token=_on_token('clarificacao', area_clarificacao, lambda area, texto: area.caption(f"Pergunta clarificada: {texto}"))
+            )
+        if usa_cache and pergunta_para_ia != pergunta_original:
+            reaproveitada = cache_perguntas.lookup(chave_esquema, pergunta_para_ia)
+
+    # Exibe a correção se ela ocorreu
+    if pergunta_para_ia != pergunta_original:
+        avisos.append(('warning', f"Sua consulta foi clarificada para: **{pergunta_para_ia}**"))
+
+    avisos.append(('info', f"Análise realizada sobre **{st.session_state['processed_percentage']:.1f}%** dos dados já processados (total de **{_total_linhas()}** linhas)."))
+
+    # Consulta longa (geração e execução): a sessão não conta como ociosa para o controle de memória
+    memory_governor.keep_alive(st.session_state['session_id'])
+    with st.spinner("Gerando código e analisando dados..."):
+        df_to_use = st.session_state['df']
+        faiss_index = st.session_state['faiss_index']
+        documents = st.session_state['documents']
+        api_key = st.session_state['gemini_api_key']
+
+        execucao = {}
+        if reaproveitada is not None:
+            codigo_gerado, conclusoes = reaproveitada['codigo'], reaproveitada['conclusoes']
+            avisos.append(('info', f"Resposta reaproveitada de uma pergunta equivalente já respondida: "
+                                   f"**{reaproveitada['texto']}** (similaridade {reaproveitada['similaridade']:.2f})."))
+        else:
+            # 1. Recupera o Contexto (RAG) - USANDO A PERGUNTA CLARIFICADA (e o filtro estruturado, se houver)
+            # Os documentos por linha são montados a partir do dataset (partes Parquet no modo fora da memória)
+            rag_kwargs = dict(index_resumos=st.session_state['faiss_index_resumos'],
+                              documents_resumos=st.session_state['documents_resumos'],
+                              bm25_index=st.session_state['bm25_index'],
+                              rerank=rerank_rag,
+                              linhas=tabela if tabela is not None else df_to_use)
+            try:
+                filtro = parse_filter_expression(filtro_texto, df_to_use.columns) if filtro_texto.strip() else None
+                # Fora da memória, a condição exata dos candidatos dos bitmaps é verificada nas partes Parquet
+                # (o df em memória é apenas a amostra)
+                retrieved_context = retrieve_context(pergunta_para_ia, faiss_index, documents, filtro=filtro,
+                                                     bitmap_index=st.session_state['bitmap_index'],
+                                                     df=tabela if tabela is not None else df_to_use, **rag_kwargs)
+            except (ValueError, KeyError) as e:
+                avisos.append(('warning', f"Filtro ignorado: {e}"))
+                retrieved_context = retrieve_context(pergunta_para_ia, faiss_index, documents, **rag_kwargs)
+
+            # 2. Gera Código e Conclusão - USANDO A PERGUNTA CLARIFICADA
+            # Em streaming, o código é executado em outra thread assim que o bloco é concluído
+            executor = ThreadPoolExecutor(max_workers=1)
+
+            def on_codigo(codigo):
+                metricas['codigo_completo'] = time.perf_counter() - inicio
+                execucao['futuro'] = executor.submit(executa_codigo_otimizado, codigo, df_to_use, perfil=st.session_state['perfil_dataset'], tabela=tabela)
+
+            on_token_codigo = _on_token('codigo', area_codigo, lambda area, texto: area.code(texto, language='python'))
+            on_token_conclusoes = _on_token('conclusoes', area_conclusoes, lambda area, texto: area.markdown(texto))
+            codigo_gerado, conclusoes = agente2_gera_codigo_pandas_eda(
+                pergunta_para_ia,
+                api_key,
+                df_to_use,
+                retrieved_context,
+                # Histórico limitado ao orçamento de tokens da memória (recentes na íntegra + resumo)
+                st.session_state['memoria_conversa'].contexto(pergunta_para_ia),
+                st.session_state['file_name_context'],
+                perfil=st.session_state['perfil_dataset'],
+                on_token=(lambda etapa, texto: (on_token_codigo if etapa == 'codigo' else on_token_conclusoes)(texto)) if streaming else None,
+                on_codigo=on_codigo if streaming else None,
+                tabela=tabela
+            )
+            executor.shutdown(wait=False)
+        metricas['total_geracao'] = time.perf_counter() - inicio
+
+        if conclusoes:
+            # Adiciona a pergunta e a nova conclusão à memória da conversa
+            st.session_state['memoria_conversa'].adiciona(pergunta_para_ia, conclusoes)
+
+        # 3. Executa o Código
+        memory_governor.keep_alive(st.session_state['session_id'])
+        if codigo_gerado.startswith("Erro:"):
+            avisos.append(('error', codigo_gerado))
+            _novo_resultado(pergunta_original, avisos, codigo_gerado)
+            return
+        amostra = st.session_state['amostra_estratificada']
+        if aproximado and amostra is not None and usa_dados(codigo_gerado):
+            futuro = execucao.get('futuro') or _execucao_executor().submit(
+                executa_codigo_otimizado, codigo_gerado, df_to_use, perfil=st.session_state['perfil_dataset'], tabela=tabela)
+            if not futuro.done():
+                resultado_texto, resultado_df, erro_execucao, img_bytes, info = executa_codigo_aproximado(
+                    codigo_gerado, amostra.sample(), _total_linhas(), perfil=st.session_state['perfil_dataset'],
+                    fora_da_memoria=tabela is not None)
+                if not erro_execucao:
+                    _novo_resultado(pergunta_original, avisos, codigo_gerado, resultado_texto, resultado_df, erro_execucao, img_bytes)
+                    st.session_state['resultado_aproximado'] = info
+                    # A resposta só entra no cache de perguntas se a execução completa terminar sem erro
+                    st.session_state['resultado_exato'] = {
+                        'id': st.session_state['resultado_id'], 'futuro': futuro,
+                        'cache': dict(key=chave_esquema, question=pergunta_para_ia, code=codigo_gerado, conclusions=conclusoes,
+                                      aliases=[pergunta_original]) if usa_cache and reaproveitada is None else None,
+                    }
+                    return
+            execucao['futuro'] = futuro
+        if 'futuro' in execucao:
+            resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio = execucao['futuro'].result()
+        else:
+            resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio = executa_codigo_otimizado(codigo_gerado, df_to_use, perfil=st.session_state['perfil_dataset'], tabela=tabela)
+        # Reescritas vetorizadas e execução em amostra (código acima do orçamento de tempo)
+        avisos.extend(avisos_relatorio(relatorio))
+        if erro_execucao:
+            avisos.append(('error', erro_execucao))
+        elif usa_cache and reaproveitada is None:
+            # Só respostas executadas sem erro entram no cache (com a formulação original como sinônimo)
+            cache_perguntas.add(chave_esquema, pergunta_para_ia, codigo_gerado, conclusoes, aliases=[pergunta_original])
+        _novo_resultado(pergunta_original, avisos, codigo_gerado, resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio)
+
+@st.fragment
+def painel_consulta():
+    """Pergunta, filtro e botão de consulta (digitar ou alterar opções não re-executa a página)."""
+    _mantem_sessao()
+    st.text_area(
+        "Pergunte em português sobre os dados:",
+        placeholder="Ex: Qual o tipo de cada coluna? Me dê as estatísticas descritivas. Há correlação entre V1 e V2? Gere um boxplot para outliers.",
+        height=100,
+        key="user_query_input_widget"
+    )
+
+    filtro_texto = st.text_input(
+        "Filtro opcional para o contexto RAG (ex: CLASS = 1; AMOUNT > 100):",
+        key="filtro_rag_input"
+    )
+
+    rerank_rag = st.session_state['compressao_vetores'] != 'flat' and st.checkbox(
+        "Reordenar o contexto RAG com precisão total (índice comprimido)",
+        value=True,
+        key="rerank_rag_checkbox"
+    )
+
+    streaming = st.checkbox(
+        "Exibir a resposta enquanto é gerada (streaming)",
+        value=True,
+        key="streaming_respostas_checkbox"
+    )
+
+    aproximado = st.session_state['amostra_estratificada'] is not None and st.checkbox(
+        "Resposta aproximada primeiro (amostra estratificada, refinada em segundo plano)",
+        value=_total_linhas() >= APROXIMADO_MIN_LINHAS,
+        key="resposta_aproximada_checkbox"
+    )
+
+    if st.button("Consultar (🔎)"):
+        _executa_consulta(st.session_state['user_query_input_widget'], filtro_texto, rerank_rag, streaming, aproximado)
+        # Nova consulta: a página inteira é atualizada uma vez (resultado e histórico de conclusões)
+        st.rerun()
+
+def _tabela_markdown(resultado_df):
+    """Tabela Markdown para colunas de texto longo (evita truncamento no st.dataframe)."""
+    table_markdown = "| | INFORMAÇÃO |\n"
+    table_markdown += "| :--- | :--- |\n"
+    for index, row in resultado_df.iterrows():
+        # Usa o índice como a primeira coluna e o texto como a segunda
+        index_display = index if resultado_df.index.name is None else row.name
+        table_markdown += f"| **{index_display}** | {row['INFORMAÇÃO']} |\n"
+    return table_markdown
+
+def exibe_resultado():
+    """Avisos e tabela do último resultado (renderizados só quando a página inteira é executada)."""
+    for tipo, mensagem in st.session_state['avisos_consulta']:
+        getattr(st, tipo)(mensagem)
+    metricas = st.session_state['metricas_consulta']
+    primeiros_tokens = [v for k, v in metricas.items() if k.startswith('ttft_')]
+    if primeiros_tokens and 'total_geracao' in metricas:
+        primeiro_token = min(primeiros_tokens)
+        st.caption(f"Primeiro token em {primeiro_token:.2f} s; geração concluída em {metricas['total_geracao']:.2f} s.")
+
+    resultado_df = st.session_state['resultado_df']
+    if st.session_state['erro_execucao'] or st.session_state['codigo_gerado'] is None:
+        return
+    st.subheader("Resultado da Análise:")
+    aproximado = st.session_state['resultado_aproximado']
+    if aproximado is not None:
+        aguarda_resultado_exato(st.session_state['resultado_exato'])
+        st.info(f"Resultado **aproximado**, calculado sobre uma amostra estratificada de {aproximado['linhas_amostra']} "
+                f"de {aproximado['linhas_total']} linhas (contagens e somas extrapoladas). O resultado exato substitui "
+                f"este assim que a execução sobre todos os dados terminar.")
+        if aproximado['margens'] is not None:
+            with st.expander("Margens de erro (IC de 95%, ±)"):
+                st.dataframe(aproximado['margens'], use_container_width=True)
+    if resultado_df is not None and not resultado_df.empty:
+        if 'INFORMAÇÃO' in resultado_df.columns:
+            st.markdown("##### Informação Detalhada (Texto Completo):")
+            st.markdown(_resultado_cache('tabela_markdown', lambda: _tabela_markdown(resultado_df)))
+        else:
+            # Usa o st.dataframe normal para colunas numéricas/curtas
+            column_config = {col: st.column_config.Column(
+                width="large",
+                help="Descrição"
+            ) for col in resultado_df.columns}
+
+            if resultado_df.index.name:
+                column_config[resultado_df.index.name] = st.column_config.TextColumn(
+                    width="small",
+                    help="Tipo/Índice"
+                )
+            st.dataframe(resultado_df, use_container_width=True, column_config=column_config)
+
+@st.fragment(run_every=PDF_INTERVALO_VERIFICACAO)
+def aguarda_resultado_exato(exato):
+    """Substitui o resultado aproximado pelo exato quando a execução completa termina (e re-executa a página)."""
+    futuro = exato['futuro']
+    if not futuro.done():
+        st.caption("Calculando o resultado exato em segundo plano...")
+        return
+    if st.session_state['resultado_exato'] is exato and st.session_state['resultado_id'] == exato['id']:
+        resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio = futuro.result()
+        avisos = st.session_state['avisos_consulta'] + avisos_relatorio(relatorio) + ([('error', erro_execucao)] if erro_execucao else [])
+        if not erro_execucao and exato['cache'] is not None:
+            get_question_cache().add(**exato['cache'])
+        _novo_resultado(st.session_state['pergunta_resultado'], avisos, st.session_state['codigo_gerado'],
+                        resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio)
+    st.rerun()
+
+@st.fragment(run_every=PDF_INTERVALO_VERIFICACAO)
+def aguarda_pdf(futuro_pdf):
+    """Aviso de PDF em geração; re-executa a página quando o PDF fica pronto."""
+    if futuro_pdf.done():
+        st.rerun()
+    st.info("Gerando PDF em segundo plano...")
+
+@st.fragment
+def painel_visualizacoes():
+    """Gráfico, código e PDF do último resultado; alternar as visualizações re-executa só este painel."""
+    _mantem_sessao()
+    if not st.session_state.get('codigo_gerado'):
+        return
+
+    col_grafico, col_codigo, col_pdf, _ = st.columns([1, 1, 1, 4])
+    exibir_grafico = col_grafico.toggle("Gráfico (📊)", key="exibir_grafico")
+    exibir_codigo = col_codigo.toggle("Código (✍️)", key="exibir_codigo")
+    exibir_pdf = col_pdf.toggle("PDF (📄)", key="exibir_pdf")
+
+    if exibir_grafico:
+        if st.session_state.get('img_bytes'):
+            st.subheader("Gráfico Gerado:")
+            # Mesmos bytes -> mesmo arquivo de mídia: a imagem não é reenviada ao navegador
+            st.image(st.session_state['img_bytes'], caption="Gráfico da Análise", use_container_width=True)
+        else:
+            st.warning("Nenhum gráfico gerado na última consulta.")
+
+    if exibir_codigo:
+        st.subheader("Cógido Python Gerado:")
+        st.code(st.session_state['codigo_gerado'], language='python')
+        relatorio = st.session_state['relatorio_desempenho']
+        if relatorio is not None and (relatorio['reescritas'] or relatorio['alertas']):
+            with st.expander(f"Desempenho do código (custo estimado ~{relatorio['custo_estimado_s']:.1f} s sobre {relatorio['linhas']} linhas)"):
+                for reescrita in relatorio['reescritas']:
+                    st.markdown(f"- Reescrito: {reescrita}")
+                for linha, padrao, custo in relatorio['alertas']:
+                    st.markdown(f"- Lento: linha {linha}: {padrao} (~{custo:.1f} s)")
+                if relatorio['reescritas']:
+                    st.code(relatorio['codigo'], language='python')
+
+    if exibir_pdf:
+        futuro_pdf = _resultado_cache('pdf_futuro', lambda: _pdf_executor().submit(
+            agente3_formatar_apresentacao,
+            st.session_state['resultado_texto'], st.session_state.get('resultado_df'),
+            st.session_state['pergunta_resultado'], st.session_state.get('img_bytes')))
+        if not futuro_pdf.done():
+            aguarda_pdf(futuro_pdf)
+            return
+
+        pdf_bytes = futuro_pdf.result()[2]
+        if pdf_bytes:
+            st.subheader("Download do Relatório:")
+            st.download_button(
+                label="Baixar Relatório em PDF",
+                data=pdf_bytes,
+                file_name="relatorio_eda.pdf",
+                mime="application/pdf",
+                on_click="ignore"
+            )
+        else:
+            st.warning("Não foi possível gerar o PDF. Verifique se as bibliotecas (ReportLab) estão instaladas.")
+
+@st.fragment
+def painel_checklist():
+    """Modo lote: responde uma lista de perguntas em paralelo e gera um único relatório em PDF."""
+    _mantem_sessao()
+    with st.expander("Modo lote (checklist de EDA)"):
+        texto_perguntas = st.text_area("Perguntas (uma por linha):", value="\n".join(CHECKLIST_PADRAO), height=220,
+                                       key="checklist_perguntas_input")
+        workers = st.number_input("Perguntas geradas em paralelo:", min_value=1, max_value=16,
+                                  value=CHECKLIST_WORKERS_LLM, key="checklist_workers_input")
+
+        if st.button("Executar checklist (📋)"):
+            perguntas = [p.strip() for p in texto_perguntas.splitlines() if p.strip()]
+            if not st.session_state.get('gemini_api_key'):
+                st.error("Por favor, insira e salve sua API Key do Gemini na barra lateral.")
+            elif perguntas:
+                progresso = st.progress(0.0, text="Gerando análises...")
+                session_id = st.session_state['session_id']
+
+                def on_progresso(feitas, total):
+                    # Checklist longo: a sessão não conta como ociosa para o controle de memória
+                    memory_governor.keep_alive(session_id)
+                    progresso.progress(feitas / total, text=f"{feitas} de {total} perguntas geradas")
+
+                memory_governor.keep_alive(session_id)
+                rag_kwargs = dict(index=st.session_state['faiss_index'], documents=st.session_state['documents'],
+                                  index_resumos=st.session_state['faiss_index_resumos'],
+                                  documents_resumos=st.session_state['documents_resumos'],
+                                  bm25_index=st.session_state['bm25_index'],
+                                  # Mesma opção de reordenação do painel de consulta (o checkbox vale para os dois)
+                                  rerank=st.session_state['compressao_vetores'] != 'flat' and st.session_state.get('rerank_rag_checkbox', True))
+                resultados, metricas = executa_checklist(
+                    perguntas, st.session_state['gemini_api_key'], st.session_state['df'], rag_kwargs,
+                    perfil=st.session_state['perfil_dataset'],
+                    historico_conclusoes=st.session_state['memoria_conversa'].contexto(),
+                    file_context=st.session_state['file_name_context'],
+                    workers_llm=int(workers),
+                    on_progresso=on_progresso,
+                    tabela=st.session_state['tabela_colunar'],
+                )
+                secoes = [{'pergunta': r['pergunta_clarificada'], 'resultado_df': r['resultado_df'],
+                           'img_bytes': r['img_bytes'], 'conclusoes': r['conclusoes']} for r in resultados]
+                st.session_state['checklist_pdf'] = _pdf_executor().submit(
+                    agente3_formatar_apresentacao, None, None, None, None, secoes=secoes)
+                st.session_state['checklist_resultados'] = resultados
+                st.session_state['checklist_metricas'] = metricas
+                progresso.empty()
+
+        resultados = st.session_state['checklist_resultados']
+        if not resultados:
+            return
+        metricas = st.session_state['checklist_metricas']
+        st.caption(f"{metricas['perguntas']} perguntas ({metricas['codigos_distintos']} códigos distintos executados) "
+                   f"em {metricas['tempo_total']:.1f}s — {metricas['tempo_geracao_serial']:.1f}s se feitas em série.")
+        for r in resultados:
+            st.markdown(f"**{r['pergunta_clarificada']}**" + (" _(resultado reaproveitado)_" if r['reaproveitado'] else ""))
+            for _, mensagem in avisos_relatorio(r['relatorio_desempenho']):
+                st.caption(mensagem)
+            if r['erro_execucao']:
+                st.error(r['erro_execucao'])
+            elif r['resultado_df'] is not None:
+                st.dataframe(r['resultado_df'], use_container_width=True)
+            elif r['resultado_texto']:
+                st.text(r['resultado_texto'])
+            if r['img_bytes']:
+                st.image(r['img_bytes'], use_container_width=True)
+            if r['conclusoes']:
+                st.caption(r['conclusoes'])
+        futuro_pdf = st.session_state['checklist_pdf']
+        if futuro_pdf is not None and not futuro_pdf.done():
+            aguarda_pdf(futuro_pdf)
+        elif futuro_pdf is not None and futuro_pdf.result()[2]:
+            st.download_button(
+                label="Baixar Relatório da Checklist em PDF",
+                data=futuro_pdf.result()[2],
+                file_name="relatorio_checklist_eda.pdf",
+                mime="application/pdf",
+                on_click="ignore"
+            )
+
+st.header("2. Consultar a IA")
+
+if st.session_state['df'] is None or st.session_state['processed_percentage'] < 5.0:
+    st.info("Aguardando o processamento do arquivo para habilitar a consulta.")
+else:
+    if st.session_state['file_name_context'] and st.session_state['selected_file_name']:
+        st.info(f"Analisando: **{st.session_state['selected_file_name']}**. Contexto: **{st.session_state['file_name_context']}**.")
+
+    painel_consulta()
+    st.markdown("---")
+    if st.session_state['resultado_id']:
+        exibe_resultado()
+        painel_visualizacoes()
+    painel_checklist()
+
+st.markdown("---")
+
+# --- Seção 3: Conclusões do Agente ---
+st.header("3. Conclusões do Agente")
+memoria = st.session_state['memoria_conversa']
+if memoria:
+    st.markdown(memoria.markdown())
+    memoria_stats = memoria.metricas()
+    st.caption(
+        f"Memória da conversa: {memoria_stats['turnos']} análises; última consulta enviou "
+        f"{memoria_stats['tokens_contexto']} tokens de histórico (orçamento {memoria_stats['orcamento_tokens']}, "
+        f"histórico completo {memoria_stats['tokens_historico_completo']}; {memoria_stats['turnos_resumidos']} resumidas, "
+        f"{memoria_stats['turnos_omitidos']} omitidas)."
+    )
+else:
+    st.info("As conclusões da análise aparecerão aqui após a primeira consulta.")
+
+st.markdown("---")
 st.markdown("Adaptado por Daniel, com apoio de Rafael - grupo TENKAI")
\ No newline at end of file
@@ -1 +1,5 @@
-from modules.init_session_state import init_session_state
\ No newline at end of file
+from modules.init_session_state import init_session_state
+from modules.shared_dataset_registry import get_shared_dataset_registry
+from modules.session_memory_governor import get_session_memory_governor
+from modules.executa_checklist import executa_checklist, CHECKLIST_PADRAO
+from modules.memoria_conversa import MemoriaConversa
@@ -0,0 +1,100 @@
+import ast
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from agents.agente0 import agente0_clarifica_pergunta
+from agents.agente2 import agente2_gera_codigo_pandas_eda
+from rag_components.retrieve_context import retrieve_context
+from sandboxing.otimizador_codigo import executa_codigo_otimizado
+
+# Perguntas padrão feitas a todo arquivo novo (uma por linha no modo checklist)
+CHECKLIST_PADRAO = [
+    "Quais são os tipos de dados de cada coluna?",
+    "Me dê as estatísticas descritivas das colunas numéricas.",
+    "Quantos valores nulos existem em cada coluna?",
+    "Qual a matriz de correlação entre as colunas numéricas?",
+    "Qual a média de cada coluna numérica?",
+    "Há linhas duplicadas no conjunto de dados?",
+    "Qual a distribuição de cada coluna numérica? Gere histogramas.",
+    "Existem outliers nas colunas numéricas? Gere boxplots.",
+    "Quais colunas têm baixa variabilidade (poucos valores distintos)?",
+    "Qual a frequência dos valores das colunas categóricas?",
+]
+# Gerações de código (LLM) simultâneas; o cliente LLM ainda aplica o limite global de taxa
+CHECKLIST_WORKERS_LLM = 6
+# Execuções simultâneas no sandbox (códigos com gráficos são serializados pelo próprio sandbox)
+CHECKLIST_WORKERS_EXECUCAO = 4
+
+
+def _chave_codigo(codigo):
+    """Chave de deduplicação: AST do código (ignora comentários e formatação) ou o texto normalizado."""
+    try:
+        return ast.dump(ast.parse(codigo))
+    except SyntaxError:
+        return "\n".join(linha.strip() for linha in codigo.strip().splitlines() if linha.strip())
+
+
+def executa_checklist(perguntas, api_key, df, rag_kwargs, perfil=None, historico_conclusoes=None, file_context=None,
+                      workers_llm=CHECKLIST_WORKERS_LLM, workers_execucao=CHECKLIST_WORKERS_EXECUCAO, on_progresso=None, tabela=None):
+    """
+    Responde uma lista de perguntas em paralelo: clarificação, contexto RAG e geração de código
+    concorrentes; cada código distinto é executado uma única vez no sandbox, assim que fica pronto.
+    `rag_kwargs` contém o índice e os documentos (`index`, `documents`) e os parâmetros opcionais de
+    `retrieve_context`; `tabela` é o store Parquet do modo fora da memória (ou None).
+    Retorna (lista de resultados na ordem das perguntas, métricas).
+    """
+    inicio = time.perf_counter()
+    # As threads herdam o contexto da execução do Streamlit (st.cache_resource do modelo e do cliente LLM)
+    ctx = get_script_run_ctx()
+    inicializa = (lambda: add_script_run_ctx(threading.current_thread(), ctx)) if ctx is not None else None
+
+    execucoes = {}  # chave do código -> future da execução
+    lock = threading.Lock()
+    concluidas = []
+
+    with ThreadPoolExecutor(workers_llm, thread_name_prefix="checklist-llm", initializer=inicializa) as pool_llm, \
+            ThreadPoolExecutor(workers_execucao, thread_name_prefix="checklist-exec", initializer=inicializa) as pool_execucao:
+
+        def gera(pergunta):
+            t0 = time.perf_counter()
+            pergunta_clarificada = agente0_clarifica_pergunta(pergunta, api_key)
+            contexto = retrieve_context(pergunta_clarificada, linhas=tabela if tabela is not None else df, **rag_kwargs)
+            codigo, conclusoes = agente2_gera_codigo_pandas_eda(pergunta_clarificada, api_key, df, contexto,
+                                                                historico_conclusoes, file_context, perfil=perfil, tabela=tabela)
+            chave = _chave_codigo(codigo)
+            with lock:
+                futuro = execucoes.get(chave)
+                reaproveitado = futuro is not None
+                if futuro is None:
+                    futuro = execucoes[chave] = pool_execucao.submit(executa_codigo_otimizado, codigo, df, perfil=perfil, tabela=tabela)
+            resultado = {
+                'pergunta': pergunta,
+                'pergunta_clarificada': pergunta_clarificada,
+                'codigo': codigo,
+                'conclusoes': conclusoes,
+                'execucao': futuro,
+                'reaproveitado': reaproveitado,
+                'tempo_geracao': time.perf_counter() - t0,
+            }
+            with lock:
+                concluidas.append(pergunta)
+                if on_progresso is not None:
+                    on_progresso(len(concluidas), len(perguntas))
+            return resultado
+
+        resultados = list(pool_llm.map(gera, perguntas))
+
+    for resultado in resultados:
+        resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio = resultado.pop('execucao').result()
+        resultado.update({'resultado_texto': resultado_texto, 'resultado_df': resultado_df,
+                          'erro_execucao': erro_execucao, 'img_bytes': img_bytes, 'relatorio_desempenho': relatorio})
+
+    metricas = {
+        'perguntas': len(perguntas),
+        'codigos_distintos': len(execucoes),
+        'tempo_total': time.perf_counter() - inicio,
+        # Soma dos tempos de geração: estimativa do custo da mesma checklist feita em série
+        'tempo_geracao_serial': sum(r['tempo_geracao'] for r in resultados),
+    }
+    return resultados, metricas
@@ -1,60 +1,103 @@
-import streamlit as st
-
-def init_session_state():
-    if 'gemini_api_key' not in st.session_state:
-        st.session_state['gemini_api_key'] = ''
-    if 'zip_bytes' not in st.session_state:
-        st.session_state['zip_bytes'] = None
-    if 'zip_hash' not in st.session_state:
-        st.session_state['zip_hash'] = None
-        
-    # CORREÇÃO DO KeyError: "available_files"
-    if 'available_files' not in st.session_state:
-        st.session_state['available_files'] = [] 
-        
-    if 'file_options_map' not in st.session_state:
-        st.session_state['file_options_map'] = {}
-    if 'selected_file_name' not in st.session_state:
-        st.session_state['selected_file_name'] = None
-    if 'df' not in st.session_state:
-        st.session_state['df'] = None
-    if 'df_columns' not in st.session_state:
-        st.session_state['df_columns'] = None
-    if 'faiss_index' not in st.session_state:
-        st.session_state['faiss_index'] = None
-    if 'documents' not in st.session_state:
-        st.session_state['documents'] = []
-    if 'total_lines' not in st.session_state:
-        st.session_state['total_lines'] = 0
-    if 'processed_percentage' not in st.session_state:
-        st.session_state['processed_percentage'] = 0
-    if 'current_chunk_start' not in st.session_state:
-        st.session_state['current_chunk_start'] = 0
-    if 'cleaned_status' not in st.session_state:
-        st.session_state['cleaned_status'] = {}
-    if 'file_name_context' not in st.session_state:
-        st.session_state['file_name_context'] = ""
-    if 'conclusoes_historico' not in st.session_state:
-        st.session_state['conclusoes_historico'] = ""
-    if 'codigo_gerado' not in st.session_state:
-        st.session_state['codigo_gerado'] = None
-    if 'resultado_texto' not in st.session_state:
-        st.session_state['resultado_texto'] = None
-    if 'resultado_df' not in st.session_state:
-        st.session_state['resultado_df'] = None
-    if 'erro_execucao' not in st.session_state:
-        st.session_state['erro_execucao'] = None
-    if 'img_bytes' not in st.session_state:
-        st.session_state['img_bytes'] = None
-    if 'consultar_ia' not in st.session_state:
-        st.session_state['consultar_ia'] = False
-    if 'exibir_codigo' not in st.session_state:
-        st.session_state['exibir_codigo'] = False
-    if 'habilitar_grafico' not in st.session_state:
-        st.session_state['habilitar_grafico'] = False
-    if 'gerar_pdf' not in st.session_state:
-        st.session_state['gerar_pdf'] = False
-    if 'user_query_input_widget' not in st.session_state:
-        st.session_state['user_query_input_widget'] = ""
-    if 'current_query_text' not in st.session_state:
-        st.session_state['current_query_text'] = ""
\ No newline at end of file
+import uuid
+import streamlit as st
+from rag_components.save_progress import CHECKPOINT_EXTRA_KEYS
+from modules.memoria_conversa import MemoriaConversa
+
+def init_session_state():
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    # Objetos pesados descarregados para o disco pelo controle de memória (restaurados na próxima interação)
+    if 'sessao_descarregada' not in st.session_state:
+        st.session_state['sessao_descarregada'] = None
+    if 'avisos_restauracao' not in st.session_state:
+        st.session_state['avisos_restauracao'] = []
+    if 'gemini_api_key' not in st.session_state:
+        st.session_state['gemini_api_key'] = ''
+    if 'zip_bytes' not in st.session_state:
+        st.session_state['zip_bytes'] = None
+    if 'zip_hash' not in st.session_state:
+        st.session_state['zip_hash'] = None
+    if 'member_hash' not in st.session_state:
+        st.session_state['member_hash'] = None
+        
+    # CORREÇÃO DO KeyError: "available_files"
+    if 'available_files' not in st.session_state:
+        st.session_state['available_files'] = [] 
+        
+    if 'file_options_map' not in st.session_state:
+        st.session_state['file_options_map'] = {}
+    if 'selected_file_name' not in st.session_state:
+        st.session_state['selected_file_name'] = None
+    if 'df' not in st.session_state:
+        st.session_state['df'] = None
+    if 'df_columns' not in st.session_state:
+        st.session_state['df_columns'] = None
+    if 'faiss_index' not in st.session_state:
+        st.session_state['faiss_index'] = None
+    if 'documents' not in st.session_state:
+        st.session_state['documents'] = []
+    if 'modo_indexacao' not in st.session_state:
+        st.session_state['modo_indexacao'] = 'linhas'
+    if 'compressao_vetores' not in st.session_state:
+        st.session_state['compressao_vetores'] = 'flat'
+    for key in CHECKPOINT_EXTRA_KEYS:
+        if key not in st.session_state:
+            st.session_state[key] = None
+    if 'total_lines' not in st.session_state:
+        st.session_state['total_lines'] = 0
+    if 'processed_percentage' not in st.session_state:
+        st.session_state['processed_percentage'] = 0
+    if 'current_chunk_start' not in st.session_state:
+        st.session_state['current_chunk_start'] = 0
+    if 'cleaned_status' not in st.session_state:
+        st.session_state['cleaned_status'] = {}
+    if 'file_name_context' not in st.session_state:
+        st.session_state['file_name_context'] = ""
+    if 'memoria_conversa' not in st.session_state:
+        st.session_state['memoria_conversa'] = MemoriaConversa()
+    if 'codigo_gerado' not in st.session_state:
+        st.session_state['codigo_gerado'] = None
+    if 'resultado_texto' not in st.session_state:
+        st.session_state['resultado_texto'] = None
+    if 'resultado_df' not in st.session_state:
+        st.session_state['resultado_df'] = None
+    if 'erro_execucao' not in st.session_state:
+        st.session_state['erro_execucao'] = None
+    if 'img_bytes' not in st.session_state:
+        st.session_state['img_bytes'] = None
+    # Reescritas, custo estimado e ação (executar/amostrar/rejeitar) da análise de desempenho do código gerado
+    if 'relatorio_desempenho' not in st.session_state:
+        st.session_state['relatorio_desempenho'] = None
+    if 'resultado_id' not in st.session_state:
+        st.session_state['resultado_id'] = 0
+    if 'resultado_cache' not in st.session_state:
+        st.session_state['resultado_cache'] = None
+    if 'pergunta_resultado' not in st.session_state:
+        st.session_state['pergunta_resultado'] = ""
+    if 'avisos_consulta' not in st.session_state:
+        st.session_state['avisos_consulta'] = []
+    if 'metricas_consulta' not in st.session_state:
+        st.session_state['metricas_consulta'] = {}
+    # Resposta aproximada (amostra) exibida enquanto o resultado exato é calculado em segundo plano
+    if 'resultado_aproximado' not in st.session_state:
+        st.session_state['resultado_aproximado'] = None
+    if 'resultado_exato' not in st.session_state:
+        st.session_state['resultado_exato'] = None
+    # Visualizações do resultado (toggles do painel de visualizações)
+    if 'exibir_grafico' not in st.session_state:
+        st.session_state['exibir_grafico'] = True
+    if 'exibir_codigo' not in st.session_state:
+        st.session_state['exibir_codigo'] = False
+    if 'exibir_pdf' not in st.session_state:
+        st.session_state['exibir_pdf'] = False
+    if 'user_query_input_widget' not in st.session_state:
+        st.session_state['user_query_input_widget'] = ""
+    if 'current_query_text' not in st.session_state:
+        st.session_state['current_query_text'] = ""
+    # Modo lote (checklist): resultados, métricas e PDF (future da geração) da última execução
+    if 'checklist_resultados' not in st.session_state:
+        st.session_state['checklist_resultados'] = None
+    if 'checklist_metricas' not in st.session_state:
+        st.session_state['checklist_metricas'] = {}
+    if 'checklist_pdf' not in st.session_state:
+        st.session_state['checklist_pdf'] = None
\ No newline at end of file
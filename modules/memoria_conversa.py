@@ -0,0 +1,109 @@
+import os
+import re
+from agents.llm_client import estima_tokens
+from helpers.normalize_text import normalize_text
+
+# Orçamento (tokens) do histórico enviado no prompt de geração de código, qualquer que seja o tamanho da sessão
+MEMORIA_ORCAMENTO_TOKENS = int(os.environ.get('EDA_MEMORY_TOKENS', 600))
+# Últimos turnos mantidos na íntegra; os anteriores entram no resumo, uma linha curta por turno
+MEMORIA_TURNOS_RECENTES = 3
+MEMORIA_CARACTERES_RESUMO = 160
+# Com EDA_MEMORY_RELEVANCE=1, o resumo prioriza os turnos com mais termos em comum com a pergunta atual
+MEMORIA_RELEVANCIA = os.environ.get('EDA_MEMORY_RELEVANCE', '1') == '1'
+TITULO_RESUMO = "Resumo de análises anteriores:"
+TITULO_RECENTES = "Análises mais recentes:"
+
+
+def _termos(texto):
+    return {t for t in re.findall(r"\w+", normalize_text(texto).upper()) if len(t) > 3}
+
+
+def _primeira_frase(texto):
+    return re.split(r"(?<=[.!?])\s", texto.strip(), maxsplit=1)[0]
+
+
+class MemoriaConversa:
+    """
+    Histórico de perguntas e conclusões da sessão com orçamento fixo de tokens para o prompt:
+    os turnos recentes entram na íntegra e os anteriores como um resumo compacto (opcionalmente só os
+    mais relevantes para a pergunta atual). O histórico completo continua disponível para exibição.
+    """
+
+    def __init__(self, orcamento_tokens=MEMORIA_ORCAMENTO_TOKENS, turnos_recentes=MEMORIA_TURNOS_RECENTES,
+                 relevancia=MEMORIA_RELEVANCIA):
+        self.orcamento_tokens = orcamento_tokens
+        self.turnos_recentes = turnos_recentes
+        self.relevancia = relevancia
+        self.turnos = []  # {'pergunta', 'conclusao'}
+        self._ultimo = {'tokens_contexto': 0, 'turnos_resumidos': 0, 'turnos_omitidos': 0}
+
+    def __len__(self):
+        return len(self.turnos)
+
+    def adiciona(self, pergunta, conclusao):
+        self.turnos.append({'pergunta': pergunta.strip(), 'conclusao': conclusao.strip()})
+
+    @staticmethod
+    def _completo(turno):
+        return f"- Pergunta: {turno['pergunta']}\n  Conclusão: {turno['conclusao']}"
+
+    @staticmethod
+    def _compacto(turno):
+        linha = f"- {turno['pergunta']} → {_primeira_frase(turno['conclusao'])}"
+        return linha if len(linha) <= MEMORIA_CARACTERES_RESUMO else linha[:MEMORIA_CARACTERES_RESUMO - 1] + "…"
+
+    def contexto(self, pergunta=None):
+        """Texto do histórico para o prompt, dentro de `orcamento_tokens` (string vazia se não houver turnos)."""
+        if not self.turnos:
+            return ""
+        restante = self.orcamento_tokens - estima_tokens(f"{TITULO_RESUMO}\n{TITULO_RECENTES}\n")
+        recentes, antigos = self.turnos[-self.turnos_recentes:], self.turnos[:-self.turnos_recentes]
+
+        # Turnos recentes, do mais novo para o mais antigo; o que não couber na íntegra é compactado
+        linhas_recentes = {}
+        for i in range(len(recentes) - 1, -1, -1):
+            for linha in (self._completo(recentes[i]), self._compacto(recentes[i])):
+                if estima_tokens(linha) <= restante:
+                    linhas_recentes[i] = linha
+                    restante -= estima_tokens(linha)
+                    break
+
+        # Resumo dos turnos anteriores: por relevância para a pergunta (e recência), até esgotar o orçamento
+        ordem = list(range(len(antigos) - 1, -1, -1))
+        if self.relevancia and pergunta:
+            termos = _termos(pergunta)
+            ordem.sort(key=lambda i: -len(termos & _termos(antigos[i]['pergunta'] + " " + antigos[i]['conclusao'])))
+        linhas_resumo = {}
+        for i in ordem:
+            linha = self._compacto(antigos[i])
+            if estima_tokens(linha) > restante:
+                continue
+            linhas_resumo[i] = linha
+            restante -= estima_tokens(linha)
+
+        partes = []
+        if linhas_resumo:
+            partes.append(f"{TITULO_RESUMO}\n" + "\n".join(linhas_resumo[i] for i in sorted(linhas_resumo)))
+        if linhas_recentes:
+            partes.append(f"{TITULO_RECENTES}\n" + "\n".join(linhas_recentes[i] for i in sorted(linhas_recentes)))
+        texto = "\n".join(partes)
+
+        self._ultimo = {
+            'tokens_contexto': estima_tokens(texto),
+            'turnos_resumidos': len(linhas_resumo) + sum(1 for i, l in linhas_recentes.items() if not l.startswith("- Pergunta:")),
+            'turnos_omitidos': len(self.turnos) - len(linhas_resumo) - len(linhas_recentes),
+        }
+        return texto
+
+    def markdown(self):
+        """Todas as conclusões da sessão, uma por item (para exibição)."""
+        return "\n".join(f"- {t['conclusao']}" for t in self.turnos)
+
+    def metricas(self):
+        """Tamanho do último contexto montado em comparação ao histórico completo."""
+        return {
+            'turnos': len(self.turnos),
+            'tokens_historico_completo': sum(estima_tokens(self._completo(t)) for t in self.turnos),
+            'orcamento_tokens': self.orcamento_tokens,
+            **self._ultimo,
+        }
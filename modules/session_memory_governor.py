@@ -0,0 +1,359 @@
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import streamlit as st
+from rag_components.checkpoint_cache import CACHE_DIR, get_checkpoint_cache
+from rag_components.save_progress import CHECKPOINT_EXTRA_KEYS, checkpoint_key, save_progress
+from rag_components.load_progress import load_progress
+from modules.shared_dataset_registry import get_shared_dataset_registry, shared_state_from_session
+
+# Orçamento (bytes) para os objetos pesados de todas as sessões do processo
+MEMORY_BUDGET_BYTES = int(os.environ.get('EDA_MEMORY_BUDGET_BYTES', 4 * 1024 ** 3))
+# Acima do orçamento, sessões sem interação há este tempo (s) são descarregadas para o disco (LRU)
+MEMORY_EVICT_MIN_IDLE = int(os.environ.get('EDA_MEMORY_EVICT_MIN_IDLE_S', 120))
+# Abaixo do orçamento, só as sessões ociosas há mais que isso (abas abandonadas)
+MEMORY_EVICT_IDLE_TTL = int(os.environ.get('EDA_MEMORY_EVICT_IDLE_TTL_S', 15 * 60))
+# Intervalo mínimo (s) entre duas aplicações da política quando o orçamento não foi excedido
+MEMORY_CHECK_INTERVAL = 30
+# Arquivos das sessões descarregadas (ZIP enviado e último resultado)
+SPILL_DIR = os.path.join(CACHE_DIR, 'sessoes')
+# Tabela por sessão na barra lateral (ids e nomes de arquivo de todas as sessões)
+ADMIN_VIEW = os.environ.get('EDA_ADMIN_VIEW', '0') == '1'
+
+# Objetos do dataset: voltam do checkpoint (ou do registro compartilhado)
+DATASET_KEYS = ('df', 'faiss_index', 'documents') + CHECKPOINT_EXTRA_KEYS
+# Objetos da sessão sem checkpoint: gravados em um arquivo próprio da sessão
+SPILL_KEYS = ('zip_bytes', 'resultado_texto', 'resultado_df', 'img_bytes', 'checklist_resultados')
+# Saídas derivadas do resultado (tabela em Markdown, PDFs): descartadas e geradas de novo sob demanda
+DERIVED_KEYS = ('resultado_cache', 'checklist_pdf')
+HEAVY_KEYS = DATASET_KEYS + SPILL_KEYS + DERIVED_KEYS
+
+# Tamanho da amostra de elementos usada para estimar listas, dicionários e colunas de texto
+ESTIMATE_SAMPLE = 100
+ESTIMATE_MAX_DEPTH = 4
+
+
+def estimate_bytes(obj, seen=None, depth=0):
+    """
+    Estimativa barata dos bytes de `obj`: DataFrames pelos buffers das colunas, índices FAISS pelos
+    códigos, listas e colunas de texto extrapoladas a partir de uma amostra de elementos.
+    """
+    seen = set() if seen is None else seen
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'dtypes'):
+        return _estimate_pandas(obj)
+    if hasattr(obj, 'ntotal') and hasattr(obj, 'd'):
+        # Índice FAISS: códigos dos vetores (índices sem code_size, como o HNSW, contam como float32)
+        return int(obj.ntotal) * int(getattr(obj, 'code_size', 4 * obj.d))
+    if depth >= ESTIMATE_MAX_DEPTH:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + _estimate_items(list(obj.items()), seen, depth)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + _estimate_items(list(obj), seen, depth)
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + estimate_bytes(vars(obj), seen, depth + 1)
+    return sys.getsizeof(obj)
+
+
+def _estimate_items(items, seen, depth):
+    if not items:
+        return 0
+    if len(items) <= ESTIMATE_SAMPLE:
+        return sum(estimate_bytes(item, seen, depth + 1) for item in items)
+    posicoes = np.linspace(0, len(items) - 1, ESTIMATE_SAMPLE).astype(int)
+    amostra = sum(estimate_bytes(items[i], seen, depth + 1) for i in posicoes)
+    return int(amostra * len(items) / ESTIMATE_SAMPLE)
+
+
+def _estimate_pandas(obj):
+    total = int(np.sum(obj.memory_usage(index=True, deep=False)))
+    colunas = [obj[col] for col in obj.columns] if hasattr(obj, 'columns') else [obj]
+    for serie in colunas:
+        if serie.dtype == object and len(serie):
+            # Textos: o buffer guarda só ponteiros; soma o tamanho médio dos objetos de uma amostra
+            posicoes = np.linspace(0, len(serie) - 1, min(ESTIMATE_SAMPLE, len(serie))).astype(int)
+            media = np.mean([sys.getsizeof(valor) for valor in serie.iloc[posicoes]])
+            total += int(media * len(serie))
+    return total
+
+
+def _runtime_session_active(runtime_session_id):
+    """A sessão do Streamlit ainda está conectada (fora do servidor, como nos testes, considera ativa)."""
+    from streamlit.runtime import Runtime
+    return not Runtime.exists() or bool(Runtime.instance().is_active_session(runtime_session_id))
+
+
+def _runtime_session_running(runtime_session_id):
+    """O script (ou um fragmento) da sessão está em execução (fora do servidor, como nos testes, considera parado)."""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.app_session import AppSessionState
+    if not Runtime.exists():
+        return False
+    # O SessionManager não expõe o estado da execução; o AppSession o mantém em `_state`
+    info = Runtime.instance()._session_mgr.get_active_session_info(runtime_session_id)
+    return info is not None and getattr(info.session, '_state', None) == AppSessionState.APP_IS_RUNNING
+
+
+class SessionMemoryGovernor:
+    """
+    Controle da memória das sessões do processo. Cada execução do script registra a sessão e mede
+    seus objetos pesados (df, ZIP, índices, documentos, resultado); objetos compartilhados entre
+    sessões contam uma vez. Acima do orçamento, as sessões ociosas há mais tempo são descarregadas:
+    o dataset fica no checkpoint (gravado se ainda não existir), o ZIP e o último resultado em um
+    arquivo da sessão, e os objetos saem do session_state. Na próxima interação da sessão, `touch`
+    recarrega tudo (do registro compartilhado ou via load_progress) antes de o script usar os dados.
+    O descarregamento roda em segundo plano e só alcança sessões cujo script não está em execução.
+    """
+
+    def __init__(self, registry, budget_bytes=MEMORY_BUDGET_BYTES, min_idle=MEMORY_EVICT_MIN_IDLE,
+                 idle_ttl=MEMORY_EVICT_IDLE_TTL, spill_dir=SPILL_DIR):
+        self.registry = registry
+        self.budget_bytes = budget_bytes
+        self.min_idle = min_idle
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        self.evictions = 0
+        self.restores = 0
+        self._lock = threading.Lock()
+        # session_id -> {'state', 'runtime_id', 'lock', 'last_access', 'objects': {id: bytes}, 'evicted'}
+        self._sessions = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="governador-memoria")
+        self._pending = None
+        self._last_check = 0.0
+
+    # --- Sessão atual ---
+
+    def touch(self, session_id):
+        """
+        Registra a interação da sessão atual (início de cada execução do script ou fragmento), restaura
+        seus objetos se ela tiver sido descarregada e atualiza sua medição. Retorna True se restaurou.
+        """
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return False
+        with self._lock:
+            record = self._sessions.setdefault(session_id, {
+                'state': ctx.session_state._state, 'runtime_id': ctx.session_id, 'lock': threading.Lock(),
+                'last_access': 0.0, 'objects': {}, 'evicted': False,
+            })
+        # Aguarda um descarregamento desta sessão em andamento antes de o script ler o session_state
+        with record['lock']:
+            record['last_access'] = time.time()
+            restored = st.session_state.get('sessao_descarregada') is not None and self._restore(session_id)
+            record['evicted'] = False
+            record['objects'] = self._measure(st.session_state)
+        self._schedule()
+        return restored
+
+    def keep_alive(self, session_id):
+        """Marca a sessão como ativa durante uma execução longa (ingestão, consulta, checklist), sem medi-la de novo."""
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is not None:
+                record['last_access'] = time.time()
+
+    def _measure(self, state):
+        objects = {}
+        for key in HEAVY_KEYS:
+            value = state[key] if key in state else None
+            if value is not None:
+                objects[id(value)] = estimate_bytes(value)
+        return objects
+
+    @staticmethod
+    def _merge_missing(values):
+        """
+        Devolve ao session_state só as chaves que ainda estão vazias: o que a sessão gravou depois do
+        descarregamento (ex.: um checklist concluído em seguida) não é sobrescrito pelo que estava no disco.
+        """
+        for key, value in values.items():
+            atual = st.session_state[key] if key in st.session_state else None
+            if atual is None or (isinstance(atual, list) and not atual):
+                st.session_state[key] = value
+
+    def _restore(self, session_id):
+        info = st.session_state['sessao_descarregada']
+        avisos = []
+        st.session_state['sessao_descarregada'] = None
+        # Exibidos pela página na próxima execução completa
+        st.session_state['avisos_restauracao'] = avisos
+        self.restores += 1
+        if info['arquivo'] and os.path.exists(info['arquivo']):
+            with open(info['arquivo'], "rb") as f:
+                self._merge_missing(pickle.load(f))
+            os.remove(info['arquivo'])
+        elif info['arquivo']:
+            # Sem o ZIP não há como selecionar nem reprocessar o arquivo: volta à tela de envio
+            st.session_state.update({'zip_bytes': None, 'zip_hash': None, 'available_files': [], 'file_options_map': {},
+                                     'selected_file_name': None, 'member_hash': None, 'processed_percentage': 0})
+            avisos.append("O arquivo ZIP e o último resultado desta sessão expiraram. Envie o ZIP novamente para continuar a análise.")
+            return True
+
+        if info['member_hash'] is not None:
+            shared_state = self.registry.acquire(info['dataset_key'], session_id)
+            if shared_state is not None:
+                self._merge_missing(shared_state)
+            else:
+                df, faiss_index, documents, _, extras = load_progress(info['member_hash'], st.session_state['modo_indexacao'],
+                                                                      st.session_state['compressao_vetores'], info['fora_da_memoria'])
+                if df is None:
+                    # Checkpoint descartado pela cota do cache: o arquivo precisa ser analisado de novo
+                    st.session_state['processed_percentage'] = 0
+                    avisos.append("Os dados desta sessão foram descartados do cache. Clique em 'Analisar Arquivo' para processá-lo novamente.")
+                else:
+                    self._merge_missing({'df': df, 'faiss_index': faiss_index, 'documents': documents,
+                                         **{key: extras.get(key) for key in CHECKPOINT_EXTRA_KEYS}})
+                    if st.session_state['processed_percentage'] >= 100:
+                        self.registry.publish(info['dataset_key'], session_id, shared_state_from_session())
+        return True
+
+    # --- Política ---
+
+    def _total_bytes(self, records):
+        objects = {}
+        for record in records:
+            if not record['evicted']:
+                objects.update(record['objects'])
+        return sum(objects.values())
+
+    def _schedule(self):
+        """Aplica a política em segundo plano (no máximo uma aplicação pendente)."""
+        with self._lock:
+            now = time.time()
+            over_budget = self._total_bytes(self._sessions.values()) > self.budget_bytes
+            if (self._pending is not None and not self._pending.done()) or (
+                    not over_budget and now - self._last_check < MEMORY_CHECK_INTERVAL):
+                return
+            self._last_check = now
+            self._pending = self._executor.submit(self.enforce)
+
+    def enforce(self):
+        """Descarrega sessões ociosas (LRU) até o total caber no orçamento e as abandonadas há mais de `idle_ttl`."""
+        now = time.time()
+        with self._lock:
+            # Sessões encerradas pelo Streamlit e já descarregadas saem do registro (e o arquivo da sessão é apagado)
+            for session_id, record in list(self._sessions.items()):
+                if (record['evicted'] and now - record['last_access'] > self.idle_ttl
+                        and not _runtime_session_active(record['runtime_id'])):
+                    self._remove_spill(session_id)
+                    del self._sessions[session_id]
+            candidates = sorted(((sid, r) for sid, r in self._sessions.items() if not r['evicted']),
+                                key=lambda item: item[1]['last_access'])
+        for session_id, record in candidates:
+            with self._lock:
+                over_budget = self._total_bytes(self._sessions.values()) > self.budget_bytes
+            self._evict(session_id, record, over_budget)
+        with self._lock:
+            over_budget = self._total_bytes(self._sessions.values()) > self.budget_bytes
+        if over_budget:
+            # Datasets sem nenhuma sessão não aguardam o tempo de ociosidade do registro
+            self.registry.drop_unreferenced()
+
+    def _evict(self, session_id, record, over_budget):
+        with record['lock']:
+            state = record['state']
+            get = lambda key: state[key] if key in state else None
+            # Decidido sob o lock da sessão: uma interação concorrente (touch) impede o descarregamento.
+            # Abas fechadas/desconectadas podem ser descarregadas sem aguardar o tempo mínimo.
+            idle = time.time() - record['last_access']
+            ociosa = idle >= self.idle_ttl or (over_budget and (idle >= self.min_idle or not _runtime_session_active(record['runtime_id'])))
+            # Sessões que ainda aguardam o resultado exato de uma resposta aproximada ficam em memória, e
+            # sessões com o script em execução não têm o session_state alterado por esta thread
+            if (record['evicted'] or not ociosa or get('resultado_exato') is not None
+                    or _runtime_session_running(record['runtime_id'])):
+                return False
+            member_hash = get('member_hash') if get('df') is not None else None
+            fora_da_memoria = get('tabela_colunar') is not None
+            if member_hash is not None and not self._ensure_checkpoint(state, member_hash, fora_da_memoria):
+                return False
+
+            arquivo = None
+            spill = {key: get(key) for key in SPILL_KEYS if get(key) is not None}
+            if spill:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                arquivo = os.path.join(self.spill_dir, f"{session_id}.pkl")
+                with open(arquivo + ".tmp", "wb") as f:
+                    pickle.dump(spill, f)
+                os.replace(arquivo + ".tmp", arquivo)
+
+            self.registry.release(session_id)
+            for key in HEAVY_KEYS:
+                state[key] = [] if key == 'documents' else None
+            state['sessao_descarregada'] = {
+                'arquivo': arquivo,
+                'member_hash': member_hash,
+                'fora_da_memoria': fora_da_memoria,
+                'dataset_key': (get('zip_hash'), get('selected_file_name'), get('modo_indexacao'),
+                                get('compressao_vetores'), fora_da_memoria),
+                'bytes': sum(record['objects'].values()),
+            }
+            with self._lock:
+                record['evicted'] = True
+                self.evictions += 1
+            return True
+
+    def _ensure_checkpoint(self, state, member_hash, fora_da_memoria):
+        """O dataset da sessão está no cache de checkpoints (grava a entrada se ela foi descartada)."""
+        get = lambda key: state[key] if key in state else None
+        key = checkpoint_key(member_hash, get('modo_indexacao'), get('compressao_vetores'), fora_da_memoria=fora_da_memoria)
+        if get_checkpoint_cache().has_entry(key):
+            return True
+        opcoes = {name: get(name) for name in ('selected_file_name', 'modo_indexacao', 'compressao_vetores', 'tabela_colunar')}
+        return save_progress(member_hash, get('df'), get('faiss_index'), get('documents'), get('total_lines'),
+                             extras={name: get(name) for name in CHECKPOINT_EXTRA_KEYS}, state=opcoes)
+
+    def _remove_spill(self, session_id):
+        path = os.path.join(self.spill_dir, f"{session_id}.pkl")
+        if os.path.exists(path):
+            os.remove(path)
+
+    # --- Diagnóstico ---
+
+    def stats(self):
+        """Resumo do uso de memória das sessões (para exibição na interface)."""
+        with self._lock:
+            records = list(self._sessions.values())
+            return {
+                'sessoes': len(records),
+                'descarregadas': sum(r['evicted'] for r in records),
+                'bytes': self._total_bytes(records),
+                'orcamento_bytes': self.budget_bytes,
+                'descarregamentos': self.evictions,
+                'restauracoes': self.restores,
+            }
+
+    def sessions(self):
+        """Uso por sessão (visão de administração)."""
+        now = time.time()
+        with self._lock:
+            items = list(self._sessions.items())
+        rows = []
+        for session_id, record in items:
+            state = record['state']
+            rows.append({
+                'sessao': session_id[:8],
+                'arquivo': state['selected_file_name'] if 'selected_file_name' in state else None,
+                'mb': round(sum(record['objects'].values()) / 1024 ** 2, 1),
+                'ocioso_s': round(now - record['last_access'], 1),
+                'conectada': _runtime_session_active(record['runtime_id']),
+                'descarregada': record['evicted'],
+            })
+        return sorted(rows, key=lambda row: -row['mb'])
+
+
+@st.cache_resource
+def get_session_memory_governor():
+    """Instância única do controle de memória por processo do servidor Streamlit."""
+    return SessionMemoryGovernor(get_shared_dataset_registry())
@@ -0,0 +1,132 @@
+import threading
+import time
+import streamlit as st
+from rag_components.save_progress import CHECKPOINT_EXTRA_KEYS
+
+# Tempo (s) sem interação para considerar uma sessão abandonada
+SESSION_IDLE_TTL = 30 * 60
+# Tempo (s) que um dataset sem sessões ativas permanece em memória antes de ser descartado
+DATASET_IDLE_TTL = 10 * 60
+
+# Chaves do st.session_state que pertencem ao dataset compartilhado (somente leitura)
+SHARED_KEYS = ('df', 'df_columns', 'faiss_index', 'documents', 'cleaned_status', 'total_lines', 'modo_indexacao', 'compressao_vetores', 'member_hash') + CHECKPOINT_EXTRA_KEYS
+
+
+def _copia_da_sessao(state):
+    """
+    Cópia barata do estado compartilhado para uma sessão: o DataFrame é copiado sem duplicar os dados
+    (copy-on-write do pandas: a primeira escrita de uma sessão copia só o bloco alterado), listas e
+    dicionários são copiados rasos. Índices FAISS e stores de documentos seguem compartilhados e são
+    somente leitura depois da publicação (as sessões só consultam; a ingestão termina antes do publish).
+    """
+    import pandas as pd  # já carregado quando há um dataset; import tardio mantém o cold start
+
+    pd.set_option('mode.copy_on_write', True)
+    copia = {}
+    for key, value in state.items():
+        if isinstance(value, pd.DataFrame):
+            value = value.copy(deep=False)
+        elif isinstance(value, (list, dict)):
+            value = value.copy()
+        copia[key] = value
+    return copia
+
+
+class SharedDatasetRegistry:
+    """
+    Registro, por processo, dos datasets e índices RAG já carregados.
+    As sessões que abrem o mesmo arquivo (chave: hash do ZIP + nome do arquivo) compartilham
+    uma única cópia dos dados, com contagem de referências e descarte por ociosidade. Cada sessão
+    recebe sua própria visão (`_copia_da_sessao`), então alterações de uma não aparecem nas outras.
+    """
+
+    def __init__(self, session_idle_ttl=SESSION_IDLE_TTL, dataset_idle_ttl=DATASET_IDLE_TTL):
+        self.session_idle_ttl = session_idle_ttl
+        self.dataset_idle_ttl = dataset_idle_ttl
+        self._lock = threading.RLock()
+        self._entries = {}      # chave -> {'state', 'holders': {session_id: último acesso}, 'last_access'}
+        self._build_locks = {}  # chave -> threading.Lock (uma única carga por arquivo)
+
+    def get_build_lock(self, key):
+        """Retorna o lock de carga do arquivo; sessões concorrentes aguardam a mesma ingestão."""
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def acquire(self, key, session_id):
+        """Retorna o estado compartilhado de `key` (ou None) e registra a sessão como referência."""
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.release(session_id)
+            now = time.time()
+            entry['holders'][session_id] = now
+            entry['last_access'] = now
+            return _copia_da_sessao(entry['state'])
+
+    def publish(self, key, session_id, state):
+        """Publica o dataset recém-carregado por uma sessão para uso das demais."""
+        with self._lock:
+            self.release(session_id)
+            now = time.time()
+            self._entries[key] = {'state': _copia_da_sessao(state), 'holders': {session_id: now}, 'last_access': now}
+
+    def release(self, session_id):
+        """Remove a referência da sessão ao dataset que ela estiver usando."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry['holders'].pop(session_id, None) is not None:
+                    entry['last_access'] = time.time()
+
+    def touch(self, session_id):
+        """Marca a sessão como ativa (chamado a cada execução do script) e descarta o que estiver ocioso."""
+        with self._lock:
+            now = time.time()
+            for entry in self._entries.values():
+                if session_id in entry['holders']:
+                    entry['holders'][session_id] = now
+                    entry['last_access'] = now
+            self._evict_idle()
+
+    def _evict_idle(self):
+        now = time.time()
+        for key in list(self._entries):
+            entry = self._entries[key]
+            for session_id, last_seen in list(entry['holders'].items()):
+                if now - last_seen > self.session_idle_ttl:
+                    del entry['holders'][session_id]
+            if not entry['holders'] and now - entry['last_access'] > self.dataset_idle_ttl:
+                del self._entries[key]
+                lock = self._build_locks.get(key)
+                if lock is not None and not lock.locked():
+                    del self._build_locks[key]
+
+    def drop_unreferenced(self):
+        """Descarta já os datasets sem nenhuma sessão (sem aguardar o tempo de ociosidade)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if not entry['holders']]:
+                del self._entries[key]
+                lock = self._build_locks.get(key)
+                if lock is not None and not lock.locked():
+                    del self._build_locks[key]
+
+    def stats(self):
+        """Resumo dos datasets compartilhados (para exibição/diagnóstico)."""
+        with self._lock:
+            return [
+                {'zip_hash': key[0], 'arquivo': key[1], 'sessoes': len(entry['holders']),
+                 'ocioso_s': round(time.time() - entry['last_access'], 1)}
+                for key, entry in self._entries.items()
+            ]
+
+
+@st.cache_resource
+def get_shared_dataset_registry():
+    """Instância única do registro por processo do servidor Streamlit."""
+    return SharedDatasetRegistry()
+
+
+def shared_state_from_session():
+    """Extrai do st.session_state as chaves que compõem o dataset compartilhado."""
+    return {key: st.session_state.get(key) for key in SHARED_KEYS}
@@ -1,5 +1,6 @@
-from rag_components.load_embedding_model import load_embedding_model
-from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk
-from rag_components.retrieve_context import retrieve_context
-from rag_components.save_progress import save_progress
-from rag_components.load_progress import load_progress
\ No newline at end of file
+from rag_components.load_embedding_model import load_embedding_model
+from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk
+from rag_components.retrieve_context import retrieve_context
+from rag_components.save_progress import save_progress
+from rag_components.load_progress import load_progress
+from rag_components.create_faiss_index_for_profiles import create_faiss_index_for_profiles
\ No newline at end of file
@@ -0,0 +1,257 @@
+import re
+import numpy as np
+
+# Containers com até este número de ids são guardados como array ordenado; acima, como bitset
+ARRAY_CONTAINER_MAX = 4096
+CONTAINER_BITS = 1 << 16
+# Faixas (quantis do primeiro chunk) usadas para indexar colunas numéricas
+NUMERIC_BINS = 16
+
+FILTER_PATTERN = re.compile(r"^\s*(.+?)\s*(==|!=|>=|<=|=|>|<|\bin\b)\s*(.+?)\s*$", re.IGNORECASE)
+
+
+class CompressedBitmap:
+    """
+    Bitmap comprimido no estilo Roaring: os ids são particionados pelos 16 bits mais altos e cada
+    partição é um array ordenado de uint16 (esparsa) ou um bitset de 8 KB (densa).
+    """
+
+    def __init__(self):
+        self.containers = {}
+
+    @staticmethod
+    def _to_container(lows):
+        if lows.size <= ARRAY_CONTAINER_MAX:
+            return lows.astype('uint16')
+        bits = np.zeros(CONTAINER_BITS, dtype=bool)
+        bits[lows] = True
+        return np.packbits(bits)
+
+    @staticmethod
+    def _container_ids(container):
+        if container.dtype == np.uint16:
+            return container.astype('int64')
+        return np.flatnonzero(np.unpackbits(container)).astype('int64')
+
+    def add_ids(self, ids):
+        """Adiciona ids (inteiros não negativos) ao bitmap."""
+        ids = np.unique(np.asarray(ids, dtype='int64'))
+        if ids.size == 0:
+            return self
+        highs = ids >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        for part in np.split(ids, bounds):
+            high = int(part[0] >> 16)
+            lows = part & 0xFFFF
+            if high in self.containers:
+                lows = np.union1d(self._container_ids(self.containers[high]), lows)
+            self.containers[high] = self._to_container(lows)
+        return self
+
+    @classmethod
+    def from_ids(cls, ids):
+        return cls().add_ids(ids)
+
+    def to_array(self):
+        """Ids do bitmap em ordem crescente."""
+        parts = [self._container_ids(self.containers[high]) + (high << 16) for high in sorted(self.containers)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype='int64')
+
+    def __or__(self, other):
+        return CompressedBitmap.from_ids(np.union1d(self.to_array(), other.to_array()))
+
+    def __and__(self, other):
+        result = CompressedBitmap()
+        for high in self.containers.keys() & other.containers.keys():
+            lows = np.intersect1d(self._container_ids(self.containers[high]), self._container_ids(other.containers[high]))
+            if lows.size:
+                result.containers[high] = self._to_container(lows)
+        return result
+
+    def __len__(self):
+        return sum(c.size if c.dtype == np.uint16 else int(np.unpackbits(c).sum()) for c in self.containers.values())
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.containers.values())
+
+
+class BitmapIndex:
+    """
+    Índices de bitmap por coluna: um bitmap por categoria (colunas `Categorical`) e um por faixa
+    de valores (colunas numéricas). Os ids são as posições das linhas, iguais aos ids do índice FAISS.
+    """
+
+    def __init__(self):
+        self.categorical = {}  # coluna -> {valor (str): CompressedBitmap}
+        self.numeric = {}      # coluna -> {'edges': array, 'bins': {faixa: CompressedBitmap}}
+        self.nulls = {}        # coluna -> CompressedBitmap
+        self.ntotal = 0
+
+    def add_chunk(self, chunk, start_row, cleaned_status):
+        """Indexa as colunas categóricas e numéricas de um chunk cujas linhas começam em `start_row`."""
+        import pandas as pd
+        row_ids = np.arange(start_row, start_row + len(chunk), dtype='int64')
+        for col in chunk.columns:
+            status = cleaned_status.get(col)
+            series = chunk[col]
+            nulls = series.isna().to_numpy()
+            if nulls.any():
+                self.nulls.setdefault(col, CompressedBitmap()).add_ids(row_ids[nulls])
+
+            if status == 'Categorical':
+                bitmaps = self.categorical.setdefault(col, {})
+                codes, uniques = pd.factorize(series.astype(str)[~nulls])
+                valid_ids = row_ids[~nulls]
+                for code, value in enumerate(uniques):
+                    bitmaps.setdefault(value, CompressedBitmap()).add_ids(valid_ids[codes == code])
+
+            elif status == 'Numeric':
+                values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64')
+                valid = ~np.isnan(values)
+                if not valid.any():
+                    continue
+                if col not in self.numeric:
+                    edges = np.unique(np.quantile(values[valid], np.linspace(0, 1, NUMERIC_BINS + 1)))
+                    self.numeric[col] = {'edges': edges, 'bins': {}}
+                entry = self.numeric[col]
+                bins = np.searchsorted(entry['edges'], values[valid], side='right')
+                valid_ids = row_ids[valid]
+                for b in np.unique(bins):
+                    entry['bins'].setdefault(int(b), CompressedBitmap()).add_ids(valid_ids[bins == b])
+
+        self.ntotal = max(self.ntotal, start_row + len(chunk))
+        return self
+
+    def columns(self):
+        return set(self.categorical) | set(self.numeric)
+
+    def _bins_matching(self, col, op, value):
+        """Faixas da coluna numérica que podem conter valores que satisfazem `op value`."""
+        entry = self.numeric[col]
+        edges = entry['edges']
+        lows = np.concatenate([[-np.inf], edges])   # faixa b cobre [lows[b], highs[b])
+        highs = np.concatenate([edges, [np.inf]])
+        if op == 'in':
+            return {int(np.searchsorted(edges, float(v), side='right')) for v in value}
+        keep = {
+            '==': (lows <= value) & (value <= highs),
+            '>': highs > value, '>=': highs >= value,
+            '<': lows < value, '<=': lows <= value,
+            '!=': np.ones(len(lows), dtype=bool),
+        }[op]
+        return {int(b) for b in np.flatnonzero(keep)}
+
+    def _column_bitmap(self, col, op, value):
+        if col in self.categorical:
+            bitmaps = self.categorical[col]
+            wanted = {str(v) for v in (value if op == 'in' else [value])}
+            if op == '!=':
+                keys = [k for k in bitmaps if k not in wanted]
+            elif op in ('==', 'in'):
+                keys = [k for k in bitmaps if k in wanted or _same_number(k, wanted)]
+            else:
+                keys = list(bitmaps)  # comparação de ordem em categorias: refinada depois
+            result = CompressedBitmap()
+            for key in keys:
+                result = result | bitmaps[key]
+            return result
+        try:
+            value = [float(v) for v in value] if op == 'in' else float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"A coluna numérica '{col}' exige valores numéricos no filtro.")
+        bins = self._bins_matching(col, op, value)
+        result = CompressedBitmap()
+        for b, bitmap in self.numeric[col]['bins'].items():
+            if b in bins:
+                result = result | bitmap
+        return result
+
+    def match(self, filters, df=None):
+        """
+        Retorna os ids das linhas que satisfazem todos os filtros (lista de (coluna, operador, valor)).
+        Os bitmaps selecionam candidatos; com o `df` (DataFrame ou, fora da memória, o ColumnarStore),
+        a condição exata é verificada só nesses candidatos (faixas numéricas contêm valores fora do filtro).
+        """
+        result = None
+        for col, op, value in filters:
+            if col not in self.columns():
+                raise KeyError(f"A coluna '{col}' não possui índice de bitmap.")
+            bitmap = self._column_bitmap(col, op, value)
+            result = bitmap if result is None else result & bitmap
+        ids = result.to_array() if result is not None else np.arange(self.ntotal, dtype='int64')
+
+        if df is not None and len(ids):
+            colunar = hasattr(df, 'parts')
+            ids = ids[ids < (df.rows if colunar else len(df))]
+            if not len(ids):
+                return ids
+            # Partes Parquet: lê só as colunas do filtro, e só nos row groups dos candidatos
+            candidates = df.take(ids, columns=list(dict.fromkeys(col for col, _, _ in filters))) if colunar else df.iloc[ids]
+            mask = np.ones(len(ids), dtype=bool)
+            for col, op, value in filters:
+                mask &= _evaluate(candidates[col], op, value)
+            ids = ids[mask]
+        return ids
+
+
+def _same_number(key, wanted):
+    try:
+        return any(float(key) == float(w) for w in wanted)
+    except ValueError:
+        return False
+
+
+def _evaluate(series, op, value):
+    """Avalia a condição exata do filtro sobre uma Series (usado para refinar os candidatos)."""
+    import pandas as pd
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+        numeric = pd.to_numeric(series.astype(str), errors='coerce')
+        if op in ('==', '!=', 'in') and numeric.isna().all():
+            values = series.astype(str)
+            wanted = [str(v) for v in (value if op == 'in' else [value])]
+            mask = values.isin(wanted).to_numpy()
+            return ~mask if op == '!=' else mask
+        series = numeric
+    if op == 'in':
+        return series.isin([float(v) for v in value]).to_numpy()
+    return {
+        '==': series == value, '!=': series != value, '>': series > value,
+        '>=': series >= value, '<': series < value, '<=': series <= value,
+    }[op].to_numpy()
+
+
+def _parse_value(text):
+    text = text.strip().strip('"\'')
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_filter_expression(expression, columns):
+    """
+    Converte um filtro textual (ex: "CLASS = 1; AMOUNT > 100; TIPO in (A, B)") em uma lista de
+    (coluna, operador, valor). Lança ValueError para condições inválidas.
+    """
+    filters = []
+    columns_by_name = {str(c).upper(): c for c in columns}
+    for condition in re.split(r"[;\n]|\s+e\s+|\s+and\s+", expression or "", flags=re.IGNORECASE):
+        if not condition.strip():
+            continue
+        match = FILTER_PATTERN.match(condition)
+        if not match:
+            raise ValueError(f"Condição inválida: '{condition.strip()}'.")
+        col_text, op, value_text = match.groups()
+        col = columns_by_name.get(col_text.strip().upper())
+        if col is None:
+            raise ValueError(f"Coluna desconhecida no filtro: '{col_text.strip()}'.")
+        op = '==' if op == '=' else op.lower()
+        if op == 'in':
+            value = [_parse_value(v) for v in value_text.strip('()[] ').split(',') if v.strip()]
+        else:
+            value = _parse_value(value_text)
+            if op not in ('==', '!=') and isinstance(value, str):
+                raise ValueError(f"O operador '{op}' exige um valor numérico: '{condition.strip()}'.")
+        filters.append((col, op, value))
+    return filters
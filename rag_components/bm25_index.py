@@ -0,0 +1,129 @@
+import hashlib
+import math
+import re
+from collections import Counter
+import numpy as np
+from helpers.normalize_text import normalize_text
+
+# Parâmetros clássicos do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Compactação em níveis: o segmento novo é fundido ao anterior enquanto o anterior tiver até este número de
+# vezes o seu tamanho. Os tamanhos crescem em progressão geométrica: O(log n) segmentos e cada posting é
+# refundido O(log n) vezes ao longo da ingestão (em vez de todos os segmentos a cada lote)
+SEGMENT_MERGE_RATIO = 2
+
+TOKEN_PATTERN = re.compile(r"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?|[a-z0-9_]+")
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?")
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas', 'um', 'uma',
+    'com', 'para', 'por', 'que', 'qual', 'quais', 'se', 'me', 'mostre', 'mostrar', 'liste', 'existe', 'ha',
+    'valor', 'linha', 'linhas', 'registro', 'registros', 'igual', 'the', 'of', 'with', 'is',
+}
+
+
+def tokenize(text):
+    """Tokeniza texto para o índice lexical (números são canonizados: '1.0' e '1' viram o mesmo token)."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(normalize_text(str(text)).lower()):
+        if NUMBER_PATTERN.fullmatch(token):
+            try:
+                token = f"{float(token):.10g}"
+            except ValueError:
+                pass
+        tokens.append(token)
+    return tokens
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 construído incrementalmente sobre `documents`.
+    Cada lote adicionado vira um segmento com postings ordenados (hash do token, id do documento, tf)
+    em arrays NumPy, o que mantém o custo de memória baixo mesmo com milhões de tokens numéricos distintos.
+    """
+
+    def __init__(self, field_names=None):
+        self.field_names = {t for name in (field_names or []) for t in tokenize(name)}
+        self.doc_lengths = np.zeros(0, dtype='int32')
+        self.segments = []  # lista de (hashes int64 ordenados, doc_ids int32, tfs uint16)
+
+    @property
+    def ntotal(self):
+        return len(self.doc_lengths)
+
+    def add_documents(self, docs):
+        """Adiciona documentos; os ids continuam a numeração dos já indexados (mesma ordem do FAISS)."""
+        if not docs:
+            return
+        hashes, doc_ids, tfs, lengths = [], [], [], []
+        for offset, doc in enumerate(docs):
+            tokens = tokenize(doc)
+            lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                hashes.append(_token_hash(token))
+                doc_ids.append(self.ntotal + offset)
+                tfs.append(min(tf, 65535))
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.asarray(lengths, dtype='int32')])
+        self.segments.append(self._sorted_segment(np.asarray(hashes, dtype='int64'),
+                                                  np.asarray(doc_ids, dtype='int32'),
+                                                  np.asarray(tfs, dtype='uint16')))
+        while len(self.segments) > 1 and len(self.segments[-2][0]) <= SEGMENT_MERGE_RATIO * len(self.segments[-1][0]):
+            anterior, ultimo = self.segments[-2], self.segments.pop()
+            # Dois blocos já ordenados: a ordenação estável (timsort) os intercala em tempo linear
+            self.segments[-1] = self._sorted_segment(*(np.concatenate(parts) for parts in zip(anterior, ultimo)))
+
+    @staticmethod
+    def _sorted_segment(hashes, doc_ids, tfs):
+        order = np.argsort(hashes, kind='stable')
+        return hashes[order], doc_ids[order], tfs[order]
+
+    def _postings(self, token_hash):
+        ids, tfs = [], []
+        for hashes, doc_ids, seg_tfs in self.segments:
+            lo, hi = np.searchsorted(hashes, token_hash, 'left'), np.searchsorted(hashes, token_hash, 'right')
+            if hi > lo:
+                ids.append(doc_ids[lo:hi])
+                tfs.append(seg_tfs[lo:hi])
+        if not ids:
+            return None, None
+        return np.concatenate(ids), np.concatenate(tfs).astype('float32')
+
+    def search(self, query, top_k=3, allowed_ids=None):
+        """Retorna (ids, scores) dos `top_k` documentos com maior BM25 para a consulta."""
+        n_docs = self.ntotal
+        if n_docs == 0:
+            return np.zeros(0, dtype='int64'), np.zeros(0, dtype='float32')
+
+        avgdl = max(float(self.doc_lengths.mean()), 1.0)
+        scores = np.zeros(n_docs, dtype='float32')
+        for token in set(tokenize(query)) - STOPWORDS:
+            ids, tfs = self._postings(_token_hash(token))
+            if ids is None:
+                continue
+            idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[ids] / avgdl)
+            scores[ids] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        if allowed_ids is not None:
+            mask = np.zeros(n_docs, dtype=bool)
+            mask[np.asarray(allowed_ids, dtype='int64')] = True
+            scores[~mask] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return np.zeros(0, dtype='int64'), np.zeros(0, dtype='float32')
+        top = candidates[np.argsort(-scores[candidates], kind='stable')[:top_k]]
+        return top.astype('int64'), scores[top]
+
+    def is_literal_query(self, query, threshold=0.5):
+        """Indica se a consulta é dominada por valores literais (números, IDs, nomes de colunas)."""
+        tokens = [t for t in tokenize(query) if t not in STOPWORDS]
+        if not tokens:
+            return False
+        values = [t for t in tokens if t not in self.field_names and (NUMBER_PATTERN.fullmatch(t) or any(c.isdigit() for c in t))]
+        fields = [t for t in tokens if t in self.field_names]
+        return bool(values) and (len(values) + len(fields)) / len(tokens) >= threshold
@@ -0,0 +1,250 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import streamlit as st
+
+# Diretório e cota (bytes) do cache de checkpoints, configuráveis por variável de ambiente
+CACHE_DIR = os.environ.get('EDA_RAG_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'eda_rag_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('EDA_RAG_CACHE_MAX_BYTES', 20 * 1024 ** 3))
+MANIFEST_NAME = 'manifest.json'
+HASH_BLOCK_SIZE = 1024 * 1024
+# Tempo (s) sem renovação após o qual a fixação de uma entrada por uma sessão expira (sessão abandonada)
+CACHE_PIN_TTL = int(os.environ.get('EDA_RAG_CACHE_PIN_TTL', 30 * 60))
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def member_content_hash(zip_bytes, member_name):
+    """Hash SHA-256 do conteúdo do arquivo dentro do ZIP (independe do ZIP e do nome do arquivo)."""
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as z:
+        with z.open(member_name, 'r') as file_in_zip:
+            for block in iter(lambda: file_in_zip.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointCache:
+    """
+    Cache de checkpoints endereçado por conteúdo, com manifesto, cota em bytes e descarte LRU.
+    Cada chave é um diretório; o manifesto guarda tamanho e SHA-256 de cada arquivo para
+    verificar a integridade na leitura (e a data de modificação, para não recalcular o hash
+    de arquivos que não mudaram entre dois commits da mesma entrada).
+    Entradas fixadas por sessões (partes Parquet e shards em uso no modo fora da memória)
+    não são descartadas pelo LRU, mesmo que a cota fique temporariamente excedida.
+    Os hashes são calculados fora do lock, e `stats()` lê um resumo mantido a cada alteração do
+    manifesto: a verificação de uma entrada grande não bloqueia as demais sessões.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, pin_ttl=CACHE_PIN_TTL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.pin_ttl = pin_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._pins = {}  # chave -> {session_id: última renovação}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._summary = {}
+        self._update_summary(self._read_manifest())
+
+    # --- Fixação (entradas em uso) ---
+
+    def pin(self, key, session_id):
+        """Marca a entrada como em uso pela sessão (renova a fixação; uma entrada por sessão)."""
+        with self._lock:
+            self.release(session_id)
+            self._pins.setdefault(key, {})[session_id] = time.time()
+            self._summary = dict(self._summary, fixadas=len(self._pins))
+
+    def release(self, session_id):
+        """Libera a entrada fixada pela sessão, se houver."""
+        with self._lock:
+            for key in list(self._pins):
+                self._pins[key].pop(session_id, None)
+                if not self._pins[key]:
+                    del self._pins[key]
+            self._summary = dict(self._summary, fixadas=len(self._pins))
+
+    def _pinned_keys(self):
+        now = time.time()
+        for key in list(self._pins):
+            holders = self._pins[key]
+            for session_id, last_seen in list(holders.items()):
+                if now - last_seen > self.pin_ttl:
+                    del holders[session_id]
+            if not holders:
+                del self._pins[key]
+        self._summary = dict(self._summary, fixadas=len(self._pins))
+        return set(self._pins)
+
+    # --- Manifesto ---
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        # Escrita atômica: um manifesto parcial nunca substitui o anterior
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+        self._update_summary(manifest)
+
+    def _update_summary(self, manifest):
+        # Troca do dicionário inteiro (atribuição atômica): `stats()` lê sem o lock
+        self._summary = {
+            'entradas': len(manifest),
+            'bytes': sum(entry['bytes'] for entry in manifest.values()),
+            'fixadas': len(self._pins),
+        }
+
+    # --- Escrita ---
+
+    def entry_dir(self, key):
+        path = os.path.join(self.cache_dir, key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def write_file(self, key, name, writer):
+        """Grava um arquivo da entrada via `writer(caminho)` em arquivo temporário, com troca atômica."""
+        final_path = os.path.join(self.entry_dir(key), name)
+        tmp_path = final_path + ".tmp"
+        writer(tmp_path)
+        os.replace(tmp_path, final_path)
+
+    def commit(self, key):
+        """Registra no manifesto os arquivos atuais da entrada e aplica a cota (LRU)."""
+        directory = self.entry_dir(key)
+        with self._lock:
+            anteriores = self._read_manifest().get(key, {}).get('files', {})
+        # Hashes fora do lock. Só os arquivos regravados desde o último commit são lidos, mas o df.pkl,
+        # o documents.pkl e o índice FAISS são regravados a cada chunk: o custo do checkpoint por chunk
+        # continua crescendo com o tamanho do dataset já processado
+        files = {}
+        dir_bytes = 0
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                # Subdiretórios (ex.: partes Parquet do modo fora da memória) contam na cota, sem hash
+                dir_bytes += _dir_size(path)
+                continue
+            if name.endswith(".tmp") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            anterior = anteriores.get(name)
+            if anterior is not None and anterior['size'] == stat.st_size and anterior.get('mtime_ns') == stat.st_mtime_ns:
+                files[name] = anterior  # arquivo não regravado desde o último commit: reaproveita o hash
+                continue
+            files[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _sha256_file(path)}
+        with self._lock:
+            manifest = self._read_manifest()
+            now = time.time()
+            manifest[key] = {
+                'files': files,
+                'bytes': sum(info['size'] for info in files.values()) + dir_bytes,
+                'created': manifest.get(key, {}).get('created', now),
+                'last_access': now,
+            }
+            self._evict(manifest, keep=key)
+            self._write_manifest(manifest)
+
+    def _evict(self, manifest, keep=None):
+        """Remove as entradas usadas há mais tempo (e não fixadas por nenhuma sessão) até o total caber na cota."""
+        total = sum(entry['bytes'] for entry in manifest.values())
+        pinned = self._pinned_keys()
+        for key in sorted(manifest, key=lambda k: manifest[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in pinned:
+                continue
+            total -= manifest[key]['bytes']
+            self._remove(manifest, key)
+
+    def _remove(self, manifest, key):
+        manifest.pop(key, None)
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    # --- Leitura ---
+
+    def has_entry(self, key):
+        """A entrada está registrada no manifesto (sem verificar os arquivos nem contar hit/miss)."""
+        with self._lock:
+            return bool(self._read_manifest().get(key, {}).get('files'))
+
+    def open_entry(self, key, verify=True):
+        """
+        Retorna {nome: caminho} dos arquivos da entrada, verificando tamanho e SHA-256.
+        Entradas ausentes ou corrompidas contam como miss (as corrompidas são descartadas).
+        O hash é calculado sobre uma cópia da entrada do manifesto, fora do lock.
+        """
+        with self._lock:
+            entry = self._read_manifest().get(key)
+        if entry is None or not entry['files']:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        directory = os.path.join(self.cache_dir, key)
+        valida = self._files_match(directory, entry['files'], verify)
+
+        with self._lock:
+            manifest = self._read_manifest()
+            atual = manifest.get(key)
+            if atual is None or atual['files'] != entry['files']:
+                # A entrada foi descartada ou regravada durante a verificação: verifica o estado atual
+                return self.open_entry(key, verify)
+            if not valida:
+                self._remove(manifest, key)
+                self._write_manifest(manifest)
+                self.misses += 1
+                return None
+            atual['last_access'] = time.time()
+            self._write_manifest(manifest)
+            self.hits += 1
+            return {name: os.path.join(directory, name) for name in atual['files']}
+
+    @staticmethod
+    def _files_match(directory, files, verify):
+        try:
+            for name, info in files.items():
+                path = os.path.join(directory, name)
+                if os.path.getsize(path) != info['size'] or (verify and _sha256_file(path) != info['sha256']):
+                    return False
+        except OSError:
+            return False  # arquivo ausente (ou removido por um descarte concorrente)
+        return True
+
+    def stats(self):
+        """Resumo do cache para exibição na interface (sem o lock: lido a cada rerun de cada sessão)."""
+        return dict(self._summary, cota_bytes=self.max_bytes, hits=self.hits, misses=self.misses)
+
+
+@st.cache_resource
+def get_checkpoint_cache():
+    """Instância única do cache de checkpoints por processo."""
+    return CheckpointCache()
@@ -0,0 +1,186 @@
+import os
+import shutil
+
+# Modo fora da memória: os dados ingeridos ficam em arquivos Parquet em disco e o código gerado
+# consulta uma relação DuckDB sobre eles (sem carregar o arquivo inteiro em um DataFrame)
+# Arquivos (descompactados) acima deste tamanho ativam o modo por padrão
+OUT_OF_CORE_AUTO_BYTES = int(os.environ.get('EDA_OUT_OF_CORE_AUTO_BYTES', 1024 ** 3))
+# Linhas acumuladas em memória antes de gravar uma parte Parquet (e o checkpoint correspondente)
+OUT_OF_CORE_PART_ROWS = int(os.environ.get('EDA_OUT_OF_CORE_PART_ROWS', 250_000))
+# Row groups menores permitem descartar blocos pelas estatísticas min/max e paralelizar a leitura
+OUT_OF_CORE_ROW_GROUP_ROWS = 64_000
+# Threads e memória do DuckDB por consulta (acima do limite, as operações usam arquivos temporários)
+OUT_OF_CORE_THREADS = int(os.environ.get('EDA_OUT_OF_CORE_THREADS', os.cpu_count() or 1))
+OUT_OF_CORE_MEMORY_LIMIT = os.environ.get('EDA_OUT_OF_CORE_MEMORY_LIMIT', '2GB')
+# Linhas materializadas quando o código deixa uma relação (e não um DataFrame) em `resultado_df`
+OUT_OF_CORE_MAX_RESULT_ROWS = 10_000
+
+
+def quote_identifier(name):
+    """Nome de coluna entre aspas duplas para o SQL do DuckDB."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_arrow(df):
+    """Tabela Arrow do chunk; colunas object com tipos mistos são gravadas como texto."""
+    import pyarrow as pa
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        mistas = {col: str for col in df.columns if df[col].dtype == object}
+        return pa.Table.from_pandas(df.astype(mistas), preserve_index=False)
+
+
+class ColumnarStore:
+    """
+    Dados ingeridos gravados em partes Parquet (zstd) em um diretório, expostos como a relação `df`
+    de uma conexão DuckDB. As leituras fazem projeção e filtro diretamente nos arquivos (só as colunas
+    e row groups necessários) e usam várias threads. Só as partes registradas fazem parte da tabela:
+    uma parte gravada após o último checkpoint é descartada ao retomar a ingestão.
+    """
+
+    def __init__(self, directory, part_rows=OUT_OF_CORE_PART_ROWS):
+        self.directory = directory
+        self.part_rows = part_rows
+        self.parts = []  # {'name', 'rows', 'bytes'}
+        self._buffer = []
+        self._buffered_rows = 0
+
+    @classmethod
+    def create(cls, directory, part_rows=OUT_OF_CORE_PART_ROWS):
+        """Store vazio em `directory` (apaga partes de uma ingestão anterior)."""
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        return cls(directory, part_rows)
+
+    def __getstate__(self):
+        # O checkpoint guarda apenas as partes já gravadas
+        state = dict(self.__dict__)
+        state['_buffer'], state['_buffered_rows'] = [], 0
+        return state
+
+    @property
+    def rows(self):
+        return sum(part['rows'] for part in self.parts)
+
+    @property
+    def bytes(self):
+        return sum(part['bytes'] for part in self.parts)
+
+    def paths(self):
+        return [os.path.join(self.directory, part['name']) for part in self.parts]
+
+    # --- Escrita ---
+
+    def append(self, chunk):
+        """Acumula o chunk; grava uma parte ao atingir `part_rows` linhas. Retorna True se gravou."""
+        if chunk is None or chunk.empty:
+            return False
+        self._buffer.append(chunk)
+        self._buffered_rows += len(chunk)
+        return self.flush() if self._buffered_rows >= self.part_rows else False
+
+    def flush(self):
+        """Grava as linhas acumuladas como uma nova parte Parquet. Retorna True se gravou."""
+        if not self._buffer:
+            return False
+        import pandas as pd
+        import pyarrow.parquet as pq
+        table = _to_arrow(pd.concat(self._buffer, ignore_index=True))
+        name = f"part-{len(self.parts):05d}.parquet"
+        path = os.path.join(self.directory, name)
+        pq.write_table(table, path + ".tmp", row_group_size=OUT_OF_CORE_ROW_GROUP_ROWS, compression='zstd')
+        os.replace(path + ".tmp", path)
+        self.parts.append({'name': name, 'rows': table.num_rows, 'bytes': os.path.getsize(path)})
+        self._buffer, self._buffered_rows = [], 0
+        return True
+
+    # --- Leitura ---
+
+    def is_valid(self):
+        """Todas as partes registradas existem com o tamanho gravado."""
+        return all(os.path.exists(path) and os.path.getsize(path) == part['bytes']
+                   for path, part in zip(self.paths(), self.parts))
+
+    def discard_unregistered(self):
+        """Remove partes gravadas depois do último checkpoint (e temporários de uma gravação interrompida)."""
+        registered = {part['name'] for part in self.parts}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name not in registered and os.path.isfile(path):
+                os.remove(path)
+
+    def connect(self):
+        """Nova conexão DuckDB (em memória) com a view `df` sobre as partes; uma por execução/thread."""
+        import duckdb
+        con = duckdb.connect(config={
+            'threads': OUT_OF_CORE_THREADS,
+            'memory_limit': OUT_OF_CORE_MEMORY_LIMIT,
+            'temp_directory': os.path.join(self.directory, 'tmp'),
+        })
+        # union_by_name: partes com tipos diferentes na mesma coluna (ex.: int e float) são unificadas
+        con.read_parquet(self.paths(), union_by_name=True).create_view('df')
+        return con
+
+    def column(self, name):
+        """Uma coluna inteira como Series (lê só essa coluna dos arquivos)."""
+        with self.connect() as con:
+            return con.sql(f"SELECT {quote_identifier(name)} FROM df").df().iloc[:, 0]
+
+    def sample(self, columns, n):
+        """Amostra aleatória (reprodutível) de até `n` linhas das colunas pedidas, como DataFrame."""
+        projection = ", ".join(quote_identifier(col) for col in columns)
+        with self.connect() as con:
+            if self.rows <= n:
+                return con.sql(f"SELECT {projection} FROM df").df()
+            return con.sql(f"SELECT {projection} FROM df USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE (0)").df()
+
+    def take(self, positions, columns=None):
+        """
+        Linhas nas posições pedidas (na ordem pedida), lendo só os row groups que as contêm
+        (e só as `columns` pedidas, quando informadas).
+        """
+        import numpy as np
+        import pandas as pd
+        import pyarrow.parquet as pq
+        positions = np.asarray(positions, dtype='int64')
+        part_starts = np.cumsum([0] + [part['rows'] for part in self.parts])
+        wanted = np.unique(positions)
+        wanted_parts = np.searchsorted(part_starts, wanted, side='right') - 1
+        frames = []
+        for part in np.unique(wanted_parts):
+            in_part = wanted[wanted_parts == part]
+            offsets = in_part - part_starts[part]
+            arquivo = pq.ParquetFile(self.paths()[part])
+            group_starts = np.cumsum([0] + [arquivo.metadata.row_group(g).num_rows for g in range(arquivo.num_row_groups)])
+            groups = np.searchsorted(group_starts, offsets, side='right') - 1
+            for group in np.unique(groups):
+                selected = groups == group
+                frame = arquivo.read_row_group(int(group), columns=columns).take(offsets[selected] - group_starts[group]).to_pandas()
+                frame.index = in_part[selected]
+                frames.append(frame)
+        return pd.concat(frames).loc[positions].reset_index(drop=True)
+
+
+class DataFrameStore:
+    """Mesma interface de leitura do ColumnarStore sobre um DataFrame em memória (ex.: uma amostra)."""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def rows(self):
+        return len(self.df)
+
+    def connect(self):
+        import duckdb
+        con = duckdb.connect(config={'threads': OUT_OF_CORE_THREADS})
+        con.register('df', self.df)
+        return con
+
+    def column(self, name):
+        return self.df[name]
+
+    def sample(self, columns, n):
+        dados = self.df[list(columns)]
+        return dados if len(dados) <= n else dados.sample(n, random_state=0)
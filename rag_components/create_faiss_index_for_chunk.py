@@ -1,35 +1,93 @@
-import streamlit as st
-import faiss
-import numpy as np
-from rag_components.load_embedding_model import load_embedding_model
-
-def create_faiss_index_for_chunk(chunk):
-    """Cria/adiciona a um índice FAISS para um chunk específico."""
-    model = load_embedding_model()
-    
-    # 1. Pré-processamento
-    docs_chunk = chunk.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
-    
-    # Verifica se há documentos para processar
-    if not docs_chunk:
-        return True
-
-    # 2. Embedding
-    embeddings_chunk = model.encode(docs_chunk, show_progress_bar=False)
-    
-    dimension = embeddings_chunk.shape[1]
-    
-    # 3. Criação/Adição ao Índice FAISS
-    if st.session_state['faiss_index'] is not None:
-        st.session_state['faiss_index'].add(np.array(embeddings_chunk).astype('float32'))
-    else:
-        index = faiss.IndexFlatL2(dimension)
-        index.add(np.array(embeddings_chunk).astype('float32'))
-        st.session_state['faiss_index'] = index
-        
-    # 4. Atualiza Documentos
-    if st.session_state['documents'] is None:
-        st.session_state['documents'] = []
-    st.session_state['documents'].extend(docs_chunk)
-    
-    return True
\ No newline at end of file
+import streamlit as st
+import numpy as np
+from rag_components.load_embedding_model import load_embedding_model, EMBEDDING_BACKEND
+from rag_components.summary_documents import build_block_summary_documents
+from rag_components.document_store import RowDocumentStore, TextDocumentStore, format_row_documents
+from rag_components.sharded_index import ShardedIndex
+
+# Compressão dos vetores do índice por linha (string do faiss.index_factory; bytes por vetor com d=384)
+VECTOR_COMPRESSION = {
+    'flat': ("Sem compressão (float32, 1536 B/vetor)", "Flat"),
+    'fp16': ("float16 (768 B/vetor)", "SQfp16"),
+    'sq8': ("Quantização escalar 8 bits (384 B/vetor)", "SQ8"),
+    'pq': ("Quantização por produto (48 B/vetor)", "PQ48x8"),
+}
+# A quantização por produto com 8 bits precisa de ao menos 256 vetores de treino
+PQ_MIN_TRAINING = 256
+
+def create_vector_index(embeddings, compressao='flat'):
+    """Cria o índice FAISS com a compressão escolhida, treinando-o com os primeiros embeddings se necessário."""
+    import faiss
+    dimension = embeddings.shape[1]
+    spec = VECTOR_COMPRESSION.get(compressao, VECTOR_COMPRESSION['flat'])[1]
+    if spec.startswith('PQ') and (len(embeddings) < PQ_MIN_TRAINING or dimension % 48 != 0):
+        spec = VECTOR_COMPRESSION['sq8'][1]
+    if spec == "Flat":
+        return faiss.IndexFlatL2(dimension)
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(embeddings)
+    return index
+
+def add_documents_to_index(docs, index_key, documents_key, compressao='flat', start_row=None):
+    """
+    Gera os embeddings de `docs` e os adiciona ao índice/store de documentos do session_state.
+    Com `start_row`, os documentos são as linhas a partir dessa posição, o store guarda só as posições
+    e o índice é dividido em shards (buscados em paralelo e gravados de forma incremental no checkpoint).
+    """
+    if not docs:
+        return True
+
+    # Embedding
+    model = load_embedding_model()
+    embeddings = np.array(model.encode(docs, show_progress_bar=False)).astype('float32')
+
+    # Criação/Adição ao Índice FAISS
+    if st.session_state.get(index_key) is not None:
+        st.session_state[index_key].add(embeddings)
+    else:
+        index = create_vector_index(embeddings, compressao)
+        if start_row is not None:
+            index = ShardedIndex(index)
+        index.add(embeddings)
+        st.session_state[index_key] = index
+    # Registra o backend que gerou os vetores (salvo no checkpoint junto com o índice)
+    st.session_state['embedding_backend'] = EMBEDDING_BACKEND
+
+    # Atualiza Documentos (checkpoints antigos guardam uma lista de textos, que continua sendo estendida)
+    documents = st.session_state.get(documents_key)
+    if not documents:
+        documents = st.session_state[documents_key] = RowDocumentStore() if start_row is not None else TextDocumentStore()
+    if isinstance(documents, RowDocumentStore):
+        documents.add_rows(start_row, len(docs))
+    else:
+        documents.extend(docs)
+
+    return True
+
+def create_faiss_index_for_chunk(chunk, modo_indexacao='linhas', start_row=0, compressao='flat'):
+    """Cria/adiciona a um índice FAISS para um chunk específico."""
+    from rag_components.bitmap_index import BitmapIndex
+    from rag_components.bm25_index import BM25Index
+
+    # 1. Documentos por linha (modo padrão)
+    if modo_indexacao in ('linhas', 'ambos'):
+        # Os textos só existem durante a ingestão (embeddings e BM25); o store guarda as posições das linhas
+        docs_chunk = format_row_documents(chunk)
+        add_documents_to_index(docs_chunk, 'faiss_index', 'documents', compressao, start_row=start_row)
+
+        # Índice lexical (BM25) sobre os mesmos documentos, com os mesmos ids do FAISS
+        if st.session_state.get('bm25_index') is None:
+            st.session_state['bm25_index'] = BM25Index(field_names=list(chunk.columns))
+        st.session_state['bm25_index'].add_documents(docs_chunk)
+
+        # Bitmaps por categoria/faixa numérica para buscas filtradas (ids = posições das linhas)
+        if st.session_state.get('bitmap_index') is None:
+            st.session_state['bitmap_index'] = BitmapIndex()
+        st.session_state['bitmap_index'].add_chunk(chunk, start_row, st.session_state.get('cleaned_status', {}))
+
+    # 2. Resumo agregado do bloco (índice separado, ordens de grandeza menor)
+    if modo_indexacao in ('resumos', 'ambos'):
+        add_documents_to_index(build_block_summary_documents(chunk, start_row), 'faiss_index_resumos', 'documents_resumos')
+
+    return True
@@ -0,0 +1,19 @@
+import streamlit as st
+from rag_components.create_faiss_index_for_chunk import add_documents_to_index
+from rag_components.summary_documents import build_column_profile_documents, build_profile_documents_from_stats, PROFILE_DOC_PREFIX
+
+def create_faiss_index_for_profiles(df, cleaned_status=None, total_rows=None, perfil=None):
+    """
+    Adiciona ao índice de resumos um documento de perfil por coluna (uma única vez por arquivo).
+    Quando `df` é só a amostra do primeiro bloco (arquivo fora da memória), os documentos vêm do `perfil`
+    acumulado na ingestão, que cobre todas as linhas.
+    """
+    documents_resumos = st.session_state.get('documents_resumos') or []
+    if any(doc.startswith(PROFILE_DOC_PREFIX) for doc in documents_resumos):
+        return True
+
+    if perfil is not None and perfil.rows > (0 if df is None else len(df)):
+        docs = build_profile_documents_from_stats(perfil, cleaned_status)
+    else:
+        docs = build_column_profile_documents(df, cleaned_status, total_rows)
+    return add_documents_to_index(docs, 'faiss_index_resumos', 'documents_resumos')
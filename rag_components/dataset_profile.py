@@ -0,0 +1,254 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# Tamanho de cada nível do sketch de quantis (erro de rank ~ 1/k)
+QUANTILE_SKETCH_K = 256
+# Número de faixas dos histogramas mescláveis
+HISTOGRAM_BINS = 64
+# Máximo de categorias distintas mantidas por coluna (as menos frequentes são descartadas)
+MAX_CATEGORIES = 1000
+
+
+class QuantileSketch:
+    """Sketch de quantis aproximados (estilo KLL): memória O(k log n) e mesclável entre chunks."""
+
+    def __init__(self, k=QUANTILE_SKETCH_K, seed=0):
+        self.k = k
+        self.levels = []  # levels[h] contém itens com peso 2**h
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        if not self.levels:
+            self.levels.append(values)
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        for h, items in enumerate(other.levels):
+            if h < len(self.levels):
+                self.levels[h] = np.concatenate([self.levels[h], items])
+            else:
+                self.levels.append(items.copy())
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            if self.levels[h].size > self.k:
+                items = np.sort(self.levels[h])
+                # Mantém metade dos itens (posições pares ou ímpares), que sobem de nível com peso dobrado
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[h] = np.empty(0)
+                if h + 1 < len(self.levels):
+                    self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                else:
+                    self.levels.append(promoted)
+            h += 1
+
+    def quantiles(self, qs):
+        """Retorna os quantis aproximados para cada q em `qs` (0 a 1)."""
+        items = [level for level in self.levels if level.size]
+        if not items:
+            return [np.nan for _ in qs]
+        values = np.concatenate(items)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels) if level.size])
+        order = np.argsort(values)
+        values, cum = values[order], np.cumsum(weights[order])
+        return [float(values[min(np.searchsorted(cum, q * cum[-1]), len(values) - 1)]) for q in qs]
+
+
+class StreamingHistogram:
+    """Histograma de largura fixa que dobra a largura das faixas quando os dados saem do intervalo."""
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins
+        self.lo = None
+        self.width = None
+        self.counts = np.zeros(bins, dtype='int64')
+
+    def _expand_to(self, vmin, vmax):
+        while vmin < self.lo or vmax >= self.lo + self.width * self.bins:
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            self.counts = np.zeros(self.bins, dtype='int64')
+            if vmin < self.lo:
+                # Estende para baixo: as faixas atuais ocupam a metade superior
+                self.counts[self.bins // 2:] = merged
+                self.lo -= self.width * self.bins
+            else:
+                self.counts[:self.bins // 2] = merged
+            self.width *= 2
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype='float64')
+        mask = ~np.isnan(values)
+        values = values[mask]
+        weights = None if weights is None else np.asarray(weights)[mask]
+        if values.size == 0:
+            return
+        vmin, vmax = values.min(), values.max()
+        if self.lo is None:
+            self.lo = vmin
+            self.width = (vmax - vmin) / self.bins if vmax > vmin else 1.0
+        self._expand_to(vmin, vmax)
+        idx = np.clip(((values - self.lo) // self.width).astype('int64'), 0, self.bins - 1)
+        self.counts += np.bincount(idx, weights=weights, minlength=self.bins).astype('int64')
+
+    def merge(self, other):
+        if other.lo is not None:
+            centers, counts = other.edges()[:-1] + other.width / 2, other.counts
+            self.update(centers[counts > 0], counts[counts > 0])
+
+    def edges(self):
+        return self.lo + self.width * np.arange(self.bins + 1)
+
+
+class DatasetProfile:
+    """
+    Perfil estatístico acumulado chunk a chunk durante a ingestão.
+    Contagem/média/variância (Welford/Chan), min/max, nulos, quantis aproximados, histogramas,
+    frequências de categorias e matriz de correlação, com custo constante em relação ao número de linhas.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self.numeric_columns = []
+        self.nulls = {}
+        self.numeric = {}     # coluna -> {'count', 'mean', 'm2', 'min', 'max', 'sketch', 'hist'}
+        self.categories = {}  # coluna -> Counter
+        self.truncated_categories = set()
+        # Co-momentos para correlação (linhas completas das colunas numéricas)
+        self._corr_n = 0
+        self._corr_mean = None
+        self._corr_c = None
+
+    def update(self, chunk):
+        """Acumula as estatísticas de um chunk (já limpo pelo agente_limpeza_dados)."""
+        if chunk is None or chunk.empty:
+            return self
+
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.numeric_columns = [c for c in self.columns
+                                    if pd.api.types.is_numeric_dtype(chunk[c]) and not isinstance(chunk[c].dtype, pd.CategoricalDtype)]
+        self.rows += len(chunk)
+
+        for col in self.columns:
+            if col not in chunk.columns:
+                continue
+            series = chunk[col]
+            self.nulls[col] = self.nulls.get(col, 0) + int(series.isna().sum())
+            if col in self.numeric_columns:
+                self._update_numeric(col, pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64'))
+            else:
+                self._update_categories(col, series.dropna().astype(str).value_counts())
+
+        self._update_correlation(chunk)
+        return self
+
+    def _update_numeric(self, col, values):
+        values = values[~np.isnan(values)]
+        stats = self.numeric.setdefault(col, {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf,
+                                              'sketch': QuantileSketch(), 'hist': StreamingHistogram()})
+        if values.size == 0:
+            return
+        # Combinação de Chan (Welford por blocos) das médias e somas de quadrados
+        n_b, mean_b = values.size, values.mean()
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n_a, mean_a = stats['count'], stats['mean']
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        stats['mean'] = mean_a + delta * n_b / n
+        stats['m2'] += m2_b + delta ** 2 * n_a * n_b / n
+        stats['count'] = n
+        stats['min'] = min(stats['min'], float(values.min()))
+        stats['max'] = max(stats['max'], float(values.max()))
+        stats['sketch'].update(values)
+        stats['hist'].update(values)
+
+    def _update_categories(self, col, counts):
+        counter = self.categories.setdefault(col, Counter())
+        counter.update(counts.to_dict())
+        if len(counter) > MAX_CATEGORIES:
+            self.categories[col] = Counter(dict(counter.most_common(MAX_CATEGORIES)))
+            self.truncated_categories.add(col)
+
+    def _update_correlation(self, chunk):
+        if len(self.numeric_columns) < 2:
+            return
+        x = chunk.reindex(columns=self.numeric_columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+        x = x[~np.isnan(x).any(axis=1)]
+        if x.shape[0] == 0:
+            return
+        n_b, mean_b = x.shape[0], x.mean(axis=0)
+        centered = x - mean_b
+        c_b = centered.T @ centered
+        if self._corr_n == 0:
+            self._corr_n, self._corr_mean, self._corr_c = n_b, mean_b, c_b
+            return
+        n = self._corr_n + n_b
+        delta = mean_b - self._corr_mean
+        self._corr_c = self._corr_c + c_b + np.outer(delta, delta) * self._corr_n * n_b / n
+        self._corr_mean = self._corr_mean + delta * n_b / n
+        self._corr_n = n
+
+    @classmethod
+    def from_dataframe(cls, df, chunk_size=100000):
+        """Reconstrói o perfil a partir de um DataFrame já carregado (checkpoints antigos)."""
+        profile = cls()
+        for start in range(0, len(df), chunk_size):
+            profile.update(df.iloc[start:start + chunk_size])
+        return profile
+
+    # --- Consultas (tempo constante em relação ao número de linhas) ---
+
+    def describe(self, columns=None):
+        """Equivalente a `df.describe()` para colunas numéricas (quartis aproximados)."""
+        columns = [c for c in (columns or self.numeric_columns) if c in self.numeric]
+        data = {}
+        for col in columns:
+            stats = self.numeric[col]
+            count = stats['count']
+            std = np.sqrt(stats['m2'] / (count - 1)) if count > 1 else np.nan
+            q25, q50, q75 = stats['sketch'].quantiles([0.25, 0.5, 0.75])
+            data[col] = [count, stats['mean'] if count else np.nan, std,
+                         stats['min'] if count else np.nan, q25, q50, q75, stats['max'] if count else np.nan]
+        return pd.DataFrame(data, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def mean(self, columns=None):
+        return self.describe(columns).loc['mean']
+
+    def null_counts(self):
+        """Quantidade e percentual de nulos por coluna."""
+        nulls = pd.Series({col: self.nulls.get(col, 0) for col in self.columns}, name='NULOS')
+        return pd.DataFrame({'NULOS': nulls, 'PERCENTUAL': (nulls / self.rows * 100).round(2) if self.rows else nulls})
+
+    def correlation(self, columns=None):
+        """Matriz de correlação de Pearson (linhas sem nulos nas colunas numéricas)."""
+        if self._corr_c is None:
+            return pd.DataFrame()
+        std = np.sqrt(np.diag(self._corr_c))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self._corr_c / np.outer(std, std)
+        corr_df = pd.DataFrame(corr, index=self.numeric_columns, columns=self.numeric_columns)
+        if columns:
+            columns = [c for c in columns if c in self.numeric_columns]
+            corr_df = corr_df.loc[columns, columns]
+        return corr_df
+
+    def value_counts(self, col, top_n=20):
+        """Frequências das categorias mais comuns de uma coluna não numérica."""
+        return pd.Series(dict(self.categories.get(col, Counter()).most_common(top_n)), name=col)
+
+    def histogram(self, col):
+        """Retorna (contagens, bordas) do histograma acumulado de uma coluna numérica."""
+        hist = self.numeric[col]['hist']
+        if hist.lo is None:
+            return np.zeros(0, dtype='int64'), np.zeros(1)
+        return hist.counts.copy(), hist.edges()
@@ -0,0 +1,88 @@
+from array import array
+from bisect import bisect_right
+
+
+def format_row_documents(frame):
+    """Documento de cada linha: os valores da linha como texto, separados por espaço."""
+    return frame.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+
+
+class RowDocumentStore:
+    """
+    Documentos por linha sem cópia do texto: o id FAISS de cada documento aponta para a posição da
+    linha no dataset, e o texto é montado sob demanda (só para os top-k recuperados) a partir das
+    colunas tipadas do DataFrame ou das partes Parquet. O mapeamento é guardado em faixas contíguas
+    (id inicial, linha inicial), então ocupa poucos bytes mesmo com milhões de linhas.
+    """
+
+    def __init__(self):
+        self._id_starts = []   # primeiro id de cada faixa
+        self._row_starts = []  # linha correspondente ao primeiro id da faixa
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add_rows(self, start_row, n):
+        """Registra `n` novos documentos para as linhas `start_row`..`start_row + n - 1` (ids sequenciais)."""
+        if n <= 0:
+            return
+        if self._id_starts and self._row_starts[-1] + (self._size - self._id_starts[-1]) == start_row:
+            self._size += n  # continua a última faixa
+            return
+        self._id_starts.append(self._size)
+        self._row_starts.append(start_row)
+        self._size += n
+
+    def row_positions(self, ids):
+        """Posição da linha de cada id."""
+        positions = []
+        for doc_id in ids:
+            faixa = bisect_right(self._id_starts, doc_id) - 1
+            positions.append(self._row_starts[faixa] + doc_id - self._id_starts[faixa])
+        return positions
+
+    def get(self, ids, linhas=None):
+        """Textos dos documentos `ids`, lidos de `linhas` (DataFrame em memória ou ColumnarStore)."""
+        ids = [int(i) for i in ids if 0 <= i < self._size]
+        if not ids:
+            return []
+        if linhas is None:
+            raise ValueError("Documentos por linha exigem a fonte das linhas (DataFrame ou tabela Parquet).")
+        positions = self.row_positions(ids)
+        frame = linhas.take(positions) if hasattr(linhas, 'parts') else linhas.iloc[positions]
+        return format_row_documents(frame)
+
+
+class TextDocumentStore:
+    """
+    Documentos de texto livre, que não podem ser remontados a partir das colunas (resumos de blocos,
+    perfis de colunas), em um único blob UTF-8 com um array de offsets, em vez de um objeto str por documento.
+    """
+
+    def __init__(self, docs=()):
+        self._blob = bytearray()
+        self._offsets = array('q', [0])
+        self.extend(docs)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def extend(self, docs):
+        for doc in docs:
+            self._blob += doc.encode('utf-8')
+            self._offsets.append(len(self._blob))
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def get(self, ids, linhas=None):
+        """Textos dos documentos `ids` (`linhas` é ignorado: o texto está no próprio store)."""
+        return [self[int(i)] for i in ids if 0 <= i < len(self)]
@@ -1,7 +1,102 @@
-import streamlit as st
-
-@st.cache_resource
-def load_embedding_model():
-    """Carrega o modelo de embedding uma única vez."""
-    from sentence_transformers import SentenceTransformer
-    return SentenceTransformer('paraphrase-MiniLM-L6-v2')
\ No newline at end of file
+import json
+import logging
+import os
+import numpy as np
+import streamlit as st
+from rag_components.checkpoint_cache import CACHE_DIR
+
+EMBEDDING_MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+# Backends de inferência do modelo de embedding (EDA_EMBEDDING_BACKEND)
+EMBEDDING_BACKENDS = {
+    'torch': "PyTorch (float32, usa a GPU CUDA se houver)",
+    'onnx-int8': "ONNX Runtime quantizado em int8 (CPU)",
+}
+EMBEDDING_BACKEND = os.environ.get('EDA_EMBEDDING_BACKEND', 'torch')
+if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+    EMBEDDING_BACKEND = 'torch'
+# Configuração da quantização dinâmica: conjunto de instruções da CPU alvo ('arm64', 'avx2', 'avx512', 'avx512_vnni')
+EMBEDDING_ONNX_QCONFIG = os.environ.get('EDA_EMBEDDING_ONNX_QCONFIG', 'avx2')
+# Exportações quantizadas geradas localmente quando o modelo publicado não traz o arquivo
+EMBEDDING_ONNX_DIR = os.path.join(CACHE_DIR, 'onnx', EMBEDDING_MODEL_NAME)
+# Similaridade de cosseno mínima entre os vetores int8 e os float32 nas frases de validação: abaixo disso,
+# o backend quantizado não é usado (erro ao carregar, em vez de um índice com recuperação degradada)
+EMBEDDING_ONNX_MIN_COSINE = float(os.environ.get('EDA_EMBEDDING_ONNX_MIN_COSINE', 0.97))
+# Frases no formato dos documentos e das perguntas do RAG usadas na validação
+FRASES_VALIDACAO = [
+    "0 -1.3598071336738 -0.0727811733098497 2.53634673796914 1.37815522427443 149.62 0",
+    "406 -2.3122265423263 1.95199201064158 -1.60985073229769 3.9979055875468 0.0 1",
+    "Coluna Amount: média 88.35, desvio padrão 250.12, mínimo 0.0, máximo 25691.16",
+    "Coluna Class: 2 valores distintos, 0 (99.83%), 1 (0.17%)",
+    "transações com valor alto",
+    "Amount acima de 1000 e Class 1",
+    "fraude em cartão de crédito",
+    "linhas com valores negativos de V1",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _onnx_file_name(qconfig):
+    """Nome do arquivo gerado pelo export_dynamic_quantized_onnx_model (avx2 quantiza em uint8)."""
+    tipo = 'quint8' if qconfig == 'avx2' else 'qint8'
+    return f"onnx/model_{tipo}_{qconfig}.onnx"
+
+
+def _load_onnx_int8(qconfig):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    file_name = _onnx_file_name(qconfig)
+    try:
+        # Os modelos do sentence-transformers no Hub já publicam as variantes quantizadas
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, backend='onnx', model_kwargs={'file_name': file_name})
+    except Exception:
+        logger.warning("Modelo ONNX int8 publicado (%s) indisponível; exportando e quantizando localmente.",
+                       file_name, exc_info=True)
+    if not os.path.exists(os.path.join(EMBEDDING_ONNX_DIR, file_name)):
+        # Exporta o modelo para ONNX e aplica a quantização dinâmica int8 (sem dados de calibração)
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME, backend='onnx')
+        model.save(EMBEDDING_ONNX_DIR)
+        export_dynamic_quantized_onnx_model(model, qconfig, EMBEDDING_ONNX_DIR)
+    return SentenceTransformer(EMBEDDING_ONNX_DIR, backend='onnx', model_kwargs={'file_name': file_name})
+
+
+def similaridade_com_float32(model, frases=FRASES_VALIDACAO):
+    """Cosseno (por frase) entre os vetores de `model` e os do modelo PyTorch float32."""
+    from sentence_transformers import SentenceTransformer
+    referencia = SentenceTransformer(EMBEDDING_MODEL_NAME, device='cpu').encode(frases, normalize_embeddings=True)
+    vetores = np.asarray(model.encode(frases, normalize_embeddings=True))
+    return (vetores * referencia).sum(axis=1)
+
+
+def _valida_onnx_int8(model, qconfig):
+    """
+    Garante que o modelo quantizado fica dentro da tolerância do float32 antes de ser usado. O resultado
+    é guardado junto às exportações (a validação, que carrega o modelo PyTorch, roda uma vez por qconfig).
+    """
+    caminho = os.path.join(EMBEDDING_ONNX_DIR, f"validacao_{qconfig}.json")
+    try:
+        with open(caminho) as f:
+            minimo = json.load(f)['cosseno_minimo']
+    except (OSError, ValueError, KeyError):
+        minimo = float(similaridade_com_float32(model).min())
+        os.makedirs(EMBEDDING_ONNX_DIR, exist_ok=True)
+        with open(caminho, "w") as f:
+            json.dump({'cosseno_minimo': minimo}, f)
+    if minimo < EMBEDDING_ONNX_MIN_COSINE:
+        logger.error("Embeddings int8 (%s) fora da tolerância: cosseno mínimo %.4f < %.4f.", qconfig, minimo, EMBEDDING_ONNX_MIN_COSINE)
+        raise RuntimeError(f"O backend onnx-int8 ({qconfig}) difere do float32 além da tolerância (cosseno mínimo "
+                           f"{minimo:.4f} < {EMBEDDING_ONNX_MIN_COSINE}). Use EDA_EMBEDDING_BACKEND=torch ou outro qconfig.")
+    return model
+
+
+def build_embedding_model(backend=EMBEDDING_BACKEND):
+    """Instancia o modelo de embedding com o backend pedido (sem cache; use load_embedding_model)."""
+    if backend == 'onnx-int8':
+        return _valida_onnx_int8(_load_onnx_int8(EMBEDDING_ONNX_QCONFIG), EMBEDDING_ONNX_QCONFIG)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+@st.cache_resource
+def load_embedding_model():
+    """Carrega o modelo de embedding uma única vez."""
+    return build_embedding_model(EMBEDDING_BACKEND)
@@ -1,36 +1,63 @@
-import hashlib
-import os
-import pickle
-import tempfile
-import faiss
-
-def load_progress(file_hash, selected_file_name):
-    """Carrega o progresso do disco, se existir."""
-    try:
-        unique_file_hash = hashlib.md5((file_hash + selected_file_name).encode()).hexdigest()
-        temp_dir = tempfile.gettempdir()
-        
-        df_path = os.path.join(temp_dir, f"{unique_file_hash}_df.pkl")
-        faiss_path = os.path.join(temp_dir, f"{unique_file_hash}_faiss_index.bin")
-        docs_path = os.path.join(temp_dir, f"{unique_file_hash}_documents.pkl")
-        meta_path = os.path.join(temp_dir, f"{unique_file_hash}_metadata.txt")
-
-        # Verifica se todos os arquivos essenciais existem
-        if os.path.exists(df_path) and os.path.exists(faiss_path) and os.path.exists(docs_path):
-            with open(df_path, "rb") as f:
-                df = pickle.load(f)
-            faiss_index = faiss.read_index(faiss_path)
-            with open(docs_path, "rb") as f:
-                documents = pickle.load(f)
-            
-            total_lines = 0
-            if os.path.exists(meta_path):
-                 with open(meta_path, "r") as f:
-                    total_lines = int(f.read())
-            
-            # Retorna o total de linhas do DF carregado, que é o número real de linhas processadas
-            return df, faiss_index, documents, len(df)
-        return None, None, None, 0
-    except Exception as e:
-        # print(f"Erro ao carregar o progresso: {e}")
-        return None, None, None, 0
\ No newline at end of file
+import os
+import pickle
+from rag_components.checkpoint_cache import get_checkpoint_cache
+from rag_components.save_progress import checkpoint_key
+
+def _load_row_index(files):
+    """Índice por linha do checkpoint: em shards (.pkl + subdiretório) ou, em checkpoints antigos, um único .bin."""
+    import faiss
+    if 'faiss_index.pkl' not in files:
+        return faiss.read_index(files['faiss_index.bin'])
+    with open(files['faiss_index.pkl'], "rb") as f:
+        index = pickle.load(f)
+    index.directory = os.path.join(os.path.dirname(files['faiss_index.pkl']), 'indice')
+    return index if index.load_shards() else None
+
+def load_progress(file_hash, modo_indexacao='linhas', compressao='flat', fora_da_memoria=False):
+    """Carrega o progresso do cache de checkpoints, se existir e estiver íntegro."""
+    try:
+        import faiss
+        files = get_checkpoint_cache().open_entry(checkpoint_key(file_hash, modo_indexacao, compressao, fora_da_memoria=fora_da_memoria))
+        if files is None:
+            return None, None, None, 0, {}
+
+        # Verifica se todos os arquivos essenciais existem (no modo 'resumos' não há índice por linha)
+        has_row_index = ('faiss_index.pkl' in files or 'faiss_index.bin' in files) and 'documents.pkl' in files
+        if 'df.pkl' in files and (has_row_index or modo_indexacao == 'resumos'):
+            with open(files['df.pkl'], "rb") as f:
+                df = pickle.load(f)
+            faiss_index = _load_row_index(files) if has_row_index else None
+            if has_row_index and faiss_index is None:
+                # Shard ausente ou truncado (os arquivos do subdiretório não entram no hash do manifesto)
+                return None, None, None, 0, {}
+            documents = []
+            if has_row_index:
+                with open(files['documents.pkl'], "rb") as f:
+                    documents = pickle.load(f)
+            
+            # Artefatos adicionais salvos junto com o checkpoint
+            extras = {}
+            for name, path in files.items():
+                if not name.startswith("extra_"):
+                    continue
+                extra_name, ext = os.path.splitext(name[len("extra_"):])
+                if ext == '.bin':
+                    extras[extra_name] = faiss.read_index(path)
+                else:
+                    with open(path, "rb") as f:
+                        extras[extra_name] = pickle.load(f)
+            
+            # Modo fora da memória: o df é só a amostra do esquema; as linhas processadas são as das partes Parquet
+            tabela = extras.get('tabela_colunar')
+            if tabela is not None:
+                if not tabela.is_valid():
+                    return None, None, None, 0, {}
+                tabela.discard_unregistered()
+                return df, faiss_index, documents, tabela.rows, extras
+
+            # Retorna o total de linhas do DF carregado, que é o número real de linhas processadas
+            return df, faiss_index, documents, len(df), extras
+        return None, None, None, 0, {}
+    except Exception as e:
+        # print(f"Erro ao carregar o progresso: {e}")
+        return None, None, None, 0, {}
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import streamlit as st
+from rag_components.checkpoint_cache import CACHE_DIR
+from rag_components.load_embedding_model import load_embedding_model
+
+# Cache semântico de perguntas: reaproveita código e conclusões de perguntas equivalentes (mesmo esquema)
+QUESTION_CACHE_ENABLED = os.environ.get('EDA_QUESTION_CACHE', '1') == '1'
+QUESTION_CACHE_DIR = os.environ.get('EDA_QUESTION_CACHE_DIR', os.path.join(CACHE_DIR, 'perguntas'))
+# Similaridade de cosseno mínima entre as perguntas para reaproveitar a resposta
+QUESTION_CACHE_THRESHOLD = float(os.environ.get('EDA_QUESTION_CACHE_THRESHOLD', 0.92))
+# Perguntas mantidas por esquema e esquemas mantidos em disco (descarte LRU)
+QUESTION_CACHE_MAX_PER_SCHEMA = 500
+QUESTION_CACHE_MAX_SCHEMAS = 200
+
+
+def schema_hash(df):
+    """Hash dos nomes e tipos das colunas: perguntas só são reaproveitadas entre datasets de mesmo esquema."""
+    schema = [[str(col), str(dtype)] for col, dtype in zip(df.columns, df.dtypes)]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:32]
+
+
+def _grava_atomico(path, conteudo, modo):
+    """Grava via arquivo temporário com troca atômica (leitores nunca veem um arquivo parcial)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, modo) as f:
+        if modo == "wb":
+            np.save(f, conteudo)
+        else:
+            json.dump(conteudo, f)
+    os.replace(tmp_path, path)
+
+
+class QuestionCache:
+    """
+    Perguntas já respondidas, por esquema: um índice FAISS de produto interno sobre os embeddings
+    normalizados das perguntas, com o código e as conclusões de cada uma. Persistido em disco
+    (um .json e um .npy por esquema), com descarte LRU por esquema e entre esquemas.
+    """
+
+    def __init__(self, cache_dir=QUESTION_CACHE_DIR, threshold=QUESTION_CACHE_THRESHOLD,
+                 max_per_schema=QUESTION_CACHE_MAX_PER_SCHEMA, max_schemas=QUESTION_CACHE_MAX_SCHEMAS, model=None):
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self.max_per_schema = max_per_schema
+        self.max_schemas = max_schemas
+        self.hits = 0
+        self.misses = 0
+        self._model = model
+        self._schemas = {}  # chave -> {'index', 'vectors', 'entries'}
+        self._lock = threading.RLock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _encode(self, text):
+        model = self._model or load_embedding_model()
+        vector = np.asarray(model.encode([text]), dtype='float32')
+        return vector / np.maximum(np.linalg.norm(vector, axis=1, keepdims=True), 1e-12)
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _build(self, vectors, entries):
+        import faiss
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        if len(vectors):
+            index.add(vectors)
+        return {'index': index, 'vectors': vectors, 'entries': entries}
+
+    def _schema(self, key, dimension=None):
+        """Entradas do esquema em memória (carregadas do disco na primeira vez), ou None se não houver."""
+        if key in self._schemas:
+            return self._schemas[key]
+        json_path, npy_path = self._paths(key)
+        try:
+            with open(json_path, "r") as f:
+                entries = json.load(f)
+            vectors = np.load(npy_path).astype('float32')
+            if len(vectors) != len(entries):
+                raise ValueError("cache de perguntas inconsistente")
+        except (OSError, ValueError):
+            if dimension is None:
+                return None
+            entries, vectors = [], np.zeros((0, dimension), dtype='float32')
+        self._schemas[key] = self._build(vectors, entries)
+        return self._schemas[key]
+
+    def _persist(self, key, schema, vectors=True):
+        json_path, npy_path = self._paths(key)
+        if vectors:
+            _grava_atomico(npy_path, schema['vectors'], "wb")
+        _grava_atomico(json_path, schema['entries'], "w")
+
+    def lookup(self, key, question):
+        """Resposta reaproveitável para `question` ({'pergunta', 'codigo', 'conclusoes', 'similaridade'}) ou None."""
+        with self._lock:
+            schema = self._schema(key)
+            if schema is None or schema['index'].ntotal == 0:
+                self.misses += 1
+                return None
+            scores, ids = schema['index'].search(self._encode(question), 1)
+            if ids[0][0] < 0 or scores[0][0] < self.threshold:
+                self.misses += 1
+                return None
+            entry = schema['entries'][ids[0][0]]
+            entry['last_access'] = time.time()
+            entry['hits'] = entry.get('hits', 0) + 1
+            self._persist(key, schema, vectors=False)
+            self.hits += 1
+            return {**entry, 'similaridade': float(scores[0][0])}
+
+    def add(self, key, question, code, conclusions, aliases=()):
+        """Registra a resposta de `question` (e das formulações em `aliases`) para o esquema `key`."""
+        with self._lock:
+            now = time.time()
+            for text in dict.fromkeys([question, *aliases]):
+                vector = self._encode(text)
+                schema = self._schema(key, dimension=vector.shape[1])
+                entry = {'pergunta': question, 'texto': text, 'codigo': code, 'conclusoes': conclusions,
+                         'created': now, 'last_access': now, 'hits': 0}
+                vectors = np.vstack([schema['vectors'], vector])
+                entries = schema['entries'] + [entry]
+                if len(entries) > self.max_per_schema:
+                    keep = np.argsort([e['last_access'] for e in entries])[-self.max_per_schema:]
+                    keep.sort()
+                    vectors, entries = vectors[keep], [entries[i] for i in keep]
+                self._schemas[key] = self._build(vectors, entries)
+            self._persist(key, self._schemas[key])
+            self._evict_schemas(keep=key)
+
+    def _evict_schemas(self, keep=None):
+        """Remove do disco (e da memória) os esquemas usados há mais tempo além de `max_schemas`."""
+        files = [f for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+        if len(files) <= self.max_schemas:
+            return
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(self.cache_dir, f)))
+        for name in files[:len(files) - self.max_schemas]:
+            key = name[:-len(".json")]
+            if key == keep:
+                continue
+            self._schemas.pop(key, None)
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def stats(self):
+        """Resumo do cache para exibição na interface."""
+        with self._lock:
+            return {
+                'esquemas': sum(1 for f in os.listdir(self.cache_dir) if f.endswith(".json")),
+                'perguntas_em_memoria': sum(len(s['entries']) for s in self._schemas.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+@st.cache_resource
+def get_question_cache():
+    """Instância única do cache de perguntas por processo."""
+    return QuestionCache()
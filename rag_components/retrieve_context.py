@@ -1,17 +1,113 @@
-import numpy as np
-from rag_components.load_embedding_model import load_embedding_model
-
-def retrieve_context(query, index, documents, top_k=3):
-    """Recupera os documentos mais relevantes do índice FAISS para uma dada consulta."""
-    model = load_embedding_model()
-    query_embedding = model.encode([query])
-    
-    if index is None or index.ntotal == 0:
-        return ""
-    
-    # Faiss espera np.float32, então convertemos a query embedding
-    D, I = index.search(np.array(query_embedding).astype('float32'), top_k)
-    
-    retrieved_docs = [documents[i] for i in I[0] if i < len(documents)]
-    
-    return "\n".join(retrieved_docs)
\ No newline at end of file
+import numpy as np
+from rag_components.load_embedding_model import load_embedding_model
+from rag_components.sharded_index import ShardedIndex
+
+# Constante da fusão por rank recíproco (RRF) entre a busca densa e a lexical
+RRF_K = 60
+# Candidatos buscados em cada método antes da fusão (múltiplo de top_k)
+FUSION_CANDIDATES = 5
+# Até este número de linhas filtradas, as distâncias são calculadas só sobre os vetores do subconjunto
+SMALL_SUBSET = 50000
+
+def _textos(documents, ids, linhas=None):
+    """Textos dos documentos `ids`: listas (checkpoints antigos) ou stores, que montam só os pedidos."""
+    if hasattr(documents, 'get'):
+        return documents.get(ids, linhas)
+    return [documents[i] for i in ids if 0 <= i < len(documents)]
+
+def _search(index, documents, query_embedding, top_k):
+    """Busca os `top_k` documentos mais próximos em um índice FAISS."""
+    if index is None or index.ntotal == 0 or not documents:
+        return []
+    D, I = index.search(query_embedding, top_k)
+    return _textos(documents, I[0])
+
+def _dense_ids(index, query_embedding, k, allowed_ids=None):
+    """Ids mais próximos no índice FAISS, opcionalmente restritos a `allowed_ids`."""
+    if allowed_ids is None:
+        D, I = index.search(query_embedding, k)
+        return I[0]
+    k = min(k, len(allowed_ids))
+    if len(allowed_ids) <= SMALL_SUBSET:
+        # Subconjunto pequeno: reconstrói só os vetores filtrados em vez de varrer o índice inteiro
+        vectors = index.reconstruct_batch(allowed_ids)
+        distances = ((vectors - query_embedding) ** 2).sum(axis=1)
+        return allowed_ids[np.argsort(distances, kind='stable')[:k]]
+    if isinstance(index, ShardedIndex):
+        D, I = index.search(query_embedding, k, allowed_ids=allowed_ids)
+        return I[0]
+    import faiss
+    params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_ids))
+    D, I = index.search(query_embedding, k, params=params)
+    return I[0]
+
+def _is_flat(index):
+    import faiss
+    if isinstance(index, ShardedIndex):
+        return index.is_flat
+    return isinstance(index, faiss.IndexFlat)
+
+def _rerank(model, query_embedding, documents, candidate_ids, top_k, linhas=None):
+    """Reordena candidatos de um índice comprimido pela distância exata (float32), re-codificando seus documentos."""
+    candidate_ids = [i for i in candidate_ids if 0 <= i < len(documents)]
+    if len(candidate_ids) <= 1:
+        return candidate_ids
+    vectors = np.array(model.encode(_textos(documents, candidate_ids, linhas), show_progress_bar=False)).astype('float32')
+    distances = ((vectors - query_embedding) ** 2).sum(axis=1)
+    return [candidate_ids[j] for j in np.argsort(distances, kind='stable')[:top_k]]
+
+def _fuse(rankings, top_k):
+    """Combina listas de ids ordenados por relevância usando Reciprocal Rank Fusion."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            if doc_id >= 0:
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
+
+def retrieve_context(query, index, documents, top_k=3, index_resumos=None, documents_resumos=None, bm25_index=None,
+                     filtro=None, bitmap_index=None, df=None, rerank=False, linhas=None):
+    """
+    Recupera os documentos mais relevantes do índice FAISS para uma dada consulta.
+    `filtro` (lista de (coluna, operador, valor)) restringe a busca às linhas indicadas pelos índices de bitmap.
+    O `df` (DataFrame completo ou ColumnarStore) confirma a condição exata dos candidatos dos bitmaps.
+    `rerank` reordena os candidatos de índices comprimidos (fp16/SQ8/PQ) pela distância em precisão total.
+    `linhas` é a fonte dos documentos por linha (DataFrame completo ou ColumnarStore), montados só para os top-k.
+    """
+    has_rows = index is not None and index.ntotal > 0
+    has_summaries = index_resumos is not None and index_resumos.ntotal > 0
+    has_lexical = bm25_index is not None and bm25_index.ntotal > 0
+    if not has_rows and not has_summaries:
+        return ""
+
+    allowed_ids = None
+    if filtro and has_rows and bitmap_index is not None:
+        allowed_ids = bitmap_index.match(filtro, df)
+        allowed_ids = allowed_ids[allowed_ids < index.ntotal]
+        if len(allowed_ids) == 0:
+            return ""
+
+    # Caminho rápido: consulta dominada por valores literais (ex: "CLASS 1 AMOUNT 149.62") dispensa o embedding
+    if has_lexical and bm25_index.is_literal_query(query):
+        ids, _ = bm25_index.search(query, top_k, allowed_ids=allowed_ids)
+        if len(ids):
+            return "\n".join(_textos(documents, ids, linhas))
+
+    model = load_embedding_model()
+    # Faiss espera np.float32, então convertemos a query embedding
+    query_embedding = np.array(model.encode([query])).astype('float32')
+    
+    # Perfis/resumos primeiro (mais informativos para EDA), seguidos das linhas mais próximas
+    retrieved_docs = _search(index_resumos, documents_resumos, query_embedding, top_k)
+    if has_rows:
+        rerank = rerank and not _is_flat(index)
+        n_candidates = top_k * FUSION_CANDIDATES if (has_lexical or rerank) else top_k
+        ranking = _dense_ids(index, query_embedding, n_candidates, allowed_ids).tolist()
+        if has_lexical:
+            lexical_ids, _ = bm25_index.search(query, n_candidates, allowed_ids=allowed_ids)
+            ranking = _fuse([ranking, lexical_ids.tolist()], n_candidates)
+        if rerank:
+            ranking = _rerank(model, query_embedding, documents, ranking, top_k, linhas)
+        retrieved_docs += _textos(documents, ranking[:top_k], linhas)
+    
+    return "\n".join(retrieved_docs)
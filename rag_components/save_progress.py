@@ -1,36 +1,84 @@
-import streamlit as st
-import os
-import pickle
-import hashlib
-import faiss
-import tempfile
-
-def save_progress(file_hash, df, faiss_index, documents, total_lines):
-    """Salva o progresso no disco."""
-    try:
-        if st.session_state.get('selected_file_name'):
-            unique_file_hash = hashlib.md5((file_hash + st.session_state['selected_file_name']).encode()).hexdigest()
-            
-            temp_dir = tempfile.gettempdir()
-            
-            # Garante que o df não está vazio antes de salvar
-            if df is not None and not df.empty:
-                with open(os.path.join(temp_dir, f"{unique_file_hash}_df.pkl"), "wb") as f:
-                    pickle.dump(df, f)
-            
-            # Garante que o índice foi criado antes de salvar
-            if faiss_index is not None and faiss_index.ntotal > 0:
-                faiss.write_index(faiss_index, os.path.join(temp_dir, f"{unique_file_hash}_faiss_index.bin"))
-                
-            if documents:
-                with open(os.path.join(temp_dir, f"{unique_file_hash}_documents.pkl"), "wb") as f:
-                    pickle.dump(documents, f)
-            
-            with open(os.path.join(temp_dir, f"{unique_file_hash}_metadata.txt"), "w") as f:
-                f.write(str(total_lines))
-                
-            return True
-        return False
-    except Exception as e:
-        # st.error(f"Erro ao salvar o progresso: {e}") 
-        return False
\ No newline at end of file
+import streamlit as st
+import os
+import pickle
+from rag_components.checkpoint_cache import get_checkpoint_cache
+from rag_components.load_embedding_model import EMBEDDING_BACKEND
+from rag_components.sharded_index import ShardedIndex
+
+# Chaves do st.session_state salvas como artefatos adicionais do checkpoint
+CHECKPOINT_EXTRA_KEYS = ('faiss_index_resumos', 'documents_resumos', 'perfil_dataset', 'bm25_index', 'bitmap_index', 'embedding_backend',
+                         'tabela_colunar', 'amostra_estratificada')
+
+def checkpoint_key(content_hash, modo_indexacao='linhas', compressao='flat', embedding_backend=EMBEDDING_BACKEND,
+                   fora_da_memoria=False):
+    """
+    Chave do checkpoint no cache: hash do conteúdo do arquivo + opções de indexação não padrão.
+    O backend de embedding entra na chave para um índice nunca misturar vetores de backends diferentes.
+    """
+    key = content_hash
+    if modo_indexacao != 'linhas':
+        key += f"-{modo_indexacao}"
+    if compressao != 'flat':
+        key += f"-{compressao}"
+    if embedding_backend != 'torch':
+        key += f"-{embedding_backend}"
+    if fora_da_memoria:
+        key += "-ooc"
+    return key
+
+def _pickle_to(value):
+    def writer(path):
+        with open(path, "wb") as f:
+            pickle.dump(value, f)
+    return writer
+
+def save_progress(file_hash, df, faiss_index, documents, total_lines, extras=None, state=None):
+    """
+    Salva o progresso no cache de checkpoints (`file_hash` é o hash do conteúdo do arquivo).
+    As opções de indexação vêm de `state` (padrão: o st.session_state da sessão atual).
+    """
+    state = st.session_state if state is None else state
+    try:
+        if state.get('selected_file_name'):
+            import faiss
+            cache = get_checkpoint_cache()
+            key = checkpoint_key(file_hash, state.get('modo_indexacao', 'linhas'), state.get('compressao_vetores', 'flat'),
+                                 fora_da_memoria=state.get('tabela_colunar') is not None)
+            
+            # Garante que o df não está vazio antes de salvar (no modo fora da memória, é só a amostra do esquema)
+            if df is not None and not df.empty:
+                cache.write_file(key, "df.pkl", _pickle_to(df))
+            
+            # Garante que o índice foi criado antes de salvar
+            if faiss_index is not None and faiss_index.ntotal > 0:
+                if isinstance(faiss_index, ShardedIndex):
+                    # Índice em shards: só os shards novos ou alterados são gravados; o .pkl descreve os arquivos
+                    faiss_index.persist(os.path.join(cache.entry_dir(key), 'indice'))
+                    cache.write_file(key, "faiss_index.pkl", _pickle_to(faiss_index))
+                else:
+                    cache.write_file(key, "faiss_index.bin", lambda path: faiss.write_index(faiss_index, path))
+                
+            if documents:
+                cache.write_file(key, "documents.pkl", _pickle_to(documents))
+            
+            # Artefatos adicionais (índices FAISS em .bin, demais objetos em .pkl)
+            for name, value in (extras or {}).items():
+                if value is None:
+                    continue
+                if isinstance(value, faiss.Index):
+                    cache.write_file(key, f"extra_{name}.bin", lambda path, index=value: faiss.write_index(index, path))
+                else:
+                    cache.write_file(key, f"extra_{name}.pkl", _pickle_to(value))
+            
+            def write_metadata(path):
+                with open(path, "w") as f:
+                    f.write(str(total_lines))
+            cache.write_file(key, "metadata.txt", write_metadata)
+            
+            # Registra a entrada no manifesto (tamanhos e hashes) e aplica a cota do cache
+            cache.commit(key)
+            return True
+        return False
+    except Exception as e:
+        # st.error(f"Erro ao salvar o progresso: {e}") 
+        return False
@@ -0,0 +1,181 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import streamlit as st
+
+# Vetores por shard do índice por linha: ao atingir o limite, o shard é selado (não muda mais) e um novo é aberto
+INDEX_SHARD_ROWS = int(os.environ.get('EDA_INDEX_SHARD_ROWS', 50_000))
+# Threads da busca em paralelo nos shards (a busca do FAISS libera o GIL)
+INDEX_SEARCH_THREADS = int(os.environ.get('EDA_INDEX_SEARCH_THREADS', os.cpu_count() or 1))
+
+
+@st.cache_resource
+def _search_executor():
+    """Pool compartilhado entre as sessões para as buscas nos shards."""
+    return ThreadPoolExecutor(max_workers=INDEX_SEARCH_THREADS, thread_name_prefix="busca-shards")
+
+
+class ShardedIndex:
+    """
+    Índice FAISS dividido em shards de até `shard_rows` vetores, com ids globais sequenciais (o id de um
+    vetor é o deslocamento do seu shard mais a posição local). Só o último shard recebe novos vetores; os
+    anteriores são selados, gravados uma única vez no checkpoint e buscados em paralelo, com os top-k de
+    cada shard combinados pela distância. Expõe a parte da interface do FAISS usada pelo app
+    (`ntotal`, `d`, `add`, `search`, `reconstruct_batch`).
+    """
+
+    def __init__(self, template, shard_rows=INDEX_SHARD_ROWS):
+        import faiss
+        # Índice vazio (já treinado, no caso das compressões SQ/PQ) copiado para cada novo shard
+        self._template = faiss.clone_index(template)
+        self._template.reset()
+        self.d = template.d
+        self.shard_rows = shard_rows
+        self.shards = []
+        self.directory = None
+        self._files = []  # {'name', 'rows', 'bytes'} de cada shard gravado em `directory`
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # O checkpoint guarda só a descrição dos shards: os vetores ficam nos arquivos de `directory`
+        import faiss
+        state = {key: value for key, value in self.__dict__.items() if key not in ('shards', '_lock')}
+        state['_template'] = faiss.serialize_index(self._template)
+        return state
+
+    def __setstate__(self, state):
+        import faiss
+        self.__dict__.update(state)
+        self._template = faiss.deserialize_index(state['_template'])
+        self.shards = []
+        self._lock = threading.Lock()
+
+    @property
+    def ntotal(self):
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def code_size(self):
+        return getattr(self._template, 'code_size', 4 * self.d)
+
+    @property
+    def is_flat(self):
+        import faiss
+        return isinstance(self._template, faiss.IndexFlat)
+
+    def _offsets(self, shards):
+        return np.cumsum([0] + [shard.ntotal for shard in shards])
+
+    # --- Escrita ---
+
+    def add(self, vectors):
+        """Adiciona os vetores ao shard aberto, selando-o (e abrindo outro) a cada `shard_rows` vetores."""
+        import faiss
+        with self._lock:
+            while len(vectors):
+                if not self.shards or self.shards[-1].ntotal >= self.shard_rows:
+                    self.shards.append(faiss.clone_index(self._template))
+                livres = self.shard_rows - self.shards[-1].ntotal
+                self.shards[-1].add(vectors[:livres])
+                vectors = vectors[livres:]
+
+    def persist(self, directory):
+        """
+        Grava em `directory` os shards novos ou alterados desde a última gravação: os selados são gravados
+        uma vez só; a cada checkpoint, apenas o shard aberto (no máximo `shard_rows` vetores) é regravado.
+        """
+        import faiss
+        with self._lock:
+            if directory != self.directory:
+                # Outra entrada do checkpoint: grava todos os shards (e descarta os de uma ingestão anterior)
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory, exist_ok=True)
+                self.directory, self._files = directory, []
+            for i, shard in enumerate(self.shards):
+                name = f"shard-{i:05d}.bin"
+                path = os.path.join(directory, name)
+                if i < len(self._files) and self._files[i]['rows'] == shard.ntotal and os.path.exists(path):
+                    continue
+                faiss.write_index(shard, path + ".tmp")
+                os.replace(path + ".tmp", path)
+                arquivo = {'name': name, 'rows': shard.ntotal, 'bytes': os.path.getsize(path)}
+                if i < len(self._files):
+                    self._files[i] = arquivo
+                else:
+                    self._files.append(arquivo)
+
+    # --- Leitura ---
+
+    def load_shards(self):
+        """Lê os shards gravados em `directory`. Retorna False se algum estiver ausente ou com outro tamanho."""
+        import faiss
+        shards = []
+        for arquivo in self._files:
+            path = os.path.join(self.directory, arquivo['name'])
+            if not os.path.exists(path) or os.path.getsize(path) != arquivo['bytes']:
+                return False
+            shards.append(faiss.read_index(path))
+        with self._lock:
+            self.shards = shards
+        return True
+
+    def _map(self, function, tasks):
+        """Aplica `function` às tarefas (uma por shard) em paralelo; com uma tarefa só, na própria thread."""
+        if len(tasks) <= 1:
+            return [function(*task) for task in tasks]
+        return list(_search_executor().map(lambda task: function(*task), tasks))
+
+    def search(self, x, k, allowed_ids=None):
+        """
+        Busca os `k` vizinhos mais próximos em todos os shards (em paralelo) e combina os resultados.
+        `allowed_ids` (ids globais, ordenados) restringe a busca, como o IDSelectorBatch do FAISS.
+        Retorna (D, I) no formato do FAISS, com -1 nas posições sem resultado.
+        """
+        import faiss
+        with self._lock:
+            shards = list(self.shards)
+        offsets = self._offsets(shards)
+        tasks = []
+        for shard, start, end in zip(shards, offsets[:-1], offsets[1:]):
+            if allowed_ids is None:
+                tasks.append((shard, start, min(k, shard.ntotal), None))
+                continue
+            local = allowed_ids[(allowed_ids >= start) & (allowed_ids < end)] - start
+            if len(local):
+                tasks.append((shard, start, min(k, len(local)), local))
+
+        def busca(shard, start, k_shard, local):
+            if local is None:
+                D, I = shard.search(x, k_shard)
+            else:
+                D, I = shard.search(x, k_shard, params=faiss.SearchParameters(sel=faiss.IDSelectorBatch(local)))
+            return D, np.where(I >= 0, I + start, -1)
+
+        resultados = self._map(busca, [task for task in tasks if task[2] > 0])
+        D_out = np.full((len(x), k), np.inf, dtype='float32')
+        I_out = np.full((len(x), k), -1, dtype='int64')
+        if not resultados:
+            return D_out, I_out
+        D = np.concatenate([D for D, _ in resultados], axis=1)
+        I = np.concatenate([I for _, I in resultados], axis=1)
+        D = np.where(I >= 0, D, np.inf)
+        ordem = np.argsort(D, axis=1, kind='stable')[:, :k]
+        n = ordem.shape[1]
+        D_out[:, :n] = np.take_along_axis(D, ordem, axis=1)
+        I_out[:, :n] = np.take_along_axis(I, ordem, axis=1)
+        return D_out, I_out
+
+    def reconstruct_batch(self, ids):
+        """Vetores (reconstruídos, nos índices comprimidos) dos ids globais pedidos."""
+        ids = np.asarray(ids, dtype='int64')
+        with self._lock:
+            shards = list(self.shards)
+        offsets = self._offsets(shards)
+        owners = np.searchsorted(offsets, ids, side='right') - 1
+        vectors = np.empty((len(ids), self.d), dtype='float32')
+        for i in np.unique(owners):
+            mask = owners == i
+            vectors[mask] = shards[i].reconstruct_batch(ids[mask] - offsets[i])
+        return vectors
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Linhas da amostra usada nas respostas aproximadas (cada estrato guarda até este número de linhas)
+SAMPLE_ROWS = int(os.environ.get('EDA_SAMPLE_ROWS', 20_000))
+# Colunas com até este número de valores distintos no primeiro chunk podem definir os estratos
+SAMPLE_MAX_STRATA = 10
+# Valores que surgem depois que os estratos se esgotam vão para um estrato comum
+OTHER_STRATUM = "__outros__"
+MISSING_STRATUM = "__nulos__"
+
+
+class StratifiedSample:
+    """
+    Amostra estratificada mantida durante a ingestão: um reservatório (algoritmo R) por valor da coluna
+    de estratificação, escolhida no primeiro chunk como a categórica mais desbalanceada (ex.: a classe
+    rara de um dataset de fraudes). `sample()` monta uma amostra com alocação proporcional aos estratos,
+    de modo que as proporções entre grupos são exatas e os grupos raros nunca desaparecem por acaso.
+    """
+
+    def __init__(self, capacity=SAMPLE_ROWS, max_strata=SAMPLE_MAX_STRATA, seed=0):
+        self.capacity = capacity
+        self.max_strata = max_strata
+        self.column = None
+        self.counts = {}  # estrato -> linhas vistas
+        self._reservoirs = {}  # estrato -> DataFrame com até `capacity` linhas
+        self._initialized = False
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rows(self):
+        """Linhas vistas na ingestão (população)."""
+        return sum(self.counts.values())
+
+    def _choose_column(self, chunk):
+        candidatas = []
+        for col in chunk.columns:
+            frequencias = chunk[col].value_counts(normalize=True, dropna=False)
+            if 2 <= len(frequencias) <= self.max_strata:
+                candidatas.append((frequencias.min(), col))
+        return min(candidatas, key=lambda c: c[0])[1] if candidatas else None
+
+    def _strata(self, chunk):
+        if self.column is None or self.column not in chunk.columns:
+            return pd.Series(OTHER_STRATUM, index=chunk.index)
+        valores = chunk[self.column].astype(object).where(chunk[self.column].notna(), MISSING_STRATUM)
+        conhecidos = set(self.counts)
+        for valor in pd.unique(valores):
+            if valor not in conhecidos and len(conhecidos) < self.max_strata:
+                conhecidos.add(valor)
+        return valores.where(valores.isin(list(conhecidos)), OTHER_STRATUM)
+
+    def update(self, chunk):
+        """Atualiza os reservatórios com as linhas do chunk."""
+        if chunk is None or chunk.empty:
+            return
+        if not self._initialized:
+            self.column = self._choose_column(chunk)
+            self._initialized = True
+        chunk = chunk.reset_index(drop=True)
+        for estrato, posicoes in chunk.groupby(self._strata(chunk), sort=False).indices.items():
+            self._update_stratum(estrato, chunk.iloc[posicoes])
+
+    def _update_stratum(self, estrato, linhas):
+        reservatorio = self._reservoirs.get(estrato)
+        vistas = self.counts.get(estrato, 0)
+        livres = self.capacity - (0 if reservatorio is None else len(reservatorio))
+        if livres > 0:
+            novas = linhas.iloc[:livres]
+            reservatorio = novas if reservatorio is None else pd.concat([reservatorio, novas], ignore_index=True)
+        restantes = linhas.iloc[max(livres, 0):]
+        if len(restantes):
+            # Algoritmo R vetorizado: a i-ésima linha vista substitui uma posição aleatória com probabilidade capacidade/i
+            indices = vistas + max(livres, 0) + np.arange(1, len(restantes) + 1)
+            posicoes = (self._rng.random(len(restantes)) * indices).astype('int64')
+            aceitas = np.flatnonzero(posicoes < self.capacity)
+            if aceitas.size:
+                # Várias linhas sorteadas para a mesma posição: fica a última, como na versão sequencial
+                slots, ultimas = np.unique(posicoes[aceitas][::-1], return_index=True)
+                aceitas = aceitas[::-1][ultimas]
+                mantidas = np.ones(len(reservatorio), dtype=bool)
+                mantidas[slots] = False
+                reservatorio = pd.concat([reservatorio[mantidas], restantes.iloc[aceitas]], ignore_index=True)
+        self._reservoirs[estrato] = reservatorio
+        self.counts[estrato] = vistas + len(linhas)
+
+    def sample(self, n=None, seed=0):
+        """Amostra com `n` linhas (padrão: a capacidade) em alocação proporcional às linhas vistas por estrato."""
+        n = n or self.capacity
+        total = self.rows
+        if total == 0:
+            return None
+        partes = []
+        for estrato, reservatorio in self._reservoirs.items():
+            n_estrato = min(len(reservatorio), int(round(n * self.counts[estrato] / total)))
+            if n_estrato:
+                partes.append(reservatorio.sample(n_estrato, random_state=seed) if n_estrato < len(reservatorio) else reservatorio)
+        if not partes:
+            return None
+        return pd.concat(partes, ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
@@ -0,0 +1,94 @@
+# Modos de indexação RAG disponíveis (selecionáveis por arquivo)
+INDEXING_MODES = {
+    'linhas': "Linhas (um documento por linha)",
+    'resumos': "Resumos (perfis de colunas e resumos por bloco)",
+    'ambos': "Linhas + Resumos",
+}
+
+# Colunas por documento de resumo de bloco (o modelo de embedding trunca textos longos)
+BLOCK_SUMMARY_COLUMNS_PER_DOC = 8
+# Numéricas com poucos valores distintos são tratadas como classes (ex: CLASS 0/1)
+MAX_CLASS_VALUES = 10
+PROFILE_DOC_PREFIX = "PERFIL DA COLUNA"
+
+
+def _fmt(value):
+    """Formata números de forma compacta para os documentos de resumo."""
+    import pandas as pd
+    if pd.isna(value):
+        return "nan"
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def _frequencias(series, top_n):
+    """Top categorias com a proporção de cada uma."""
+    counts = series.value_counts(normalize=True, dropna=True).head(top_n)
+    return ", ".join(f"{valor} ({proporcao:.1%})" for valor, proporcao in counts.items())
+
+
+def _resume_coluna(series, top_n):
+    """Resumo textual de uma coluna: faixas e quantis (numéricas) ou categorias mais frequentes."""
+    import pandas as pd
+    nulos = int(series.isna().sum())
+    if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+        if series.nunique(dropna=True) <= MAX_CLASS_VALUES:
+            return f"classes {_frequencias(series, top_n)}; nulos={nulos}"
+        q = series.quantile([0.25, 0.5, 0.75])
+        return (f"min={_fmt(series.min())}, p25={_fmt(q[0.25])}, mediana={_fmt(q[0.5])}, "
+                f"p75={_fmt(q[0.75])}, max={_fmt(series.max())}, media={_fmt(series.mean())}, nulos={nulos}")
+    return f"distintos={series.nunique(dropna=True)}, top {_frequencias(series.astype(str), top_n)}; nulos={nulos}"
+
+
+def build_block_summary_documents(chunk, start_row):
+    """Gera documentos com o resumo agregado de um bloco (chunk) de linhas."""
+    if chunk is None or chunk.empty:
+        return []
+
+    end_row = start_row + len(chunk) - 1
+    columns = list(chunk.columns)
+    docs = []
+    for i in range(0, len(columns), BLOCK_SUMMARY_COLUMNS_PER_DOC):
+        partes = [f"{col}: {_resume_coluna(chunk[col], 3)}" for col in columns[i:i + BLOCK_SUMMARY_COLUMNS_PER_DOC]]
+        docs.append(f"RESUMO DO BLOCO (linhas {start_row}-{end_row}): " + "; ".join(partes))
+    return docs
+
+
+def build_column_profile_documents(df, cleaned_status=None, total_rows=None):
+    """Gera um documento de perfil por coluna do DataFrame completo (ou de uma amostra de `total_rows` linhas)."""
+    if df is None or df.empty:
+        return []
+
+    cleaned_status = cleaned_status or {}
+    docs = []
+    for col in df.columns:
+        tipo = cleaned_status.get(col, str(df[col].dtype))
+        docs.append(f"{PROFILE_DOC_PREFIX} {col} ({tipo}, {df[col].dtype}, {total_rows or len(df)} linhas): {_resume_coluna(df[col], 10)}")
+    return docs
+
+
+def build_profile_documents_from_stats(profile, cleaned_status=None):
+    """Gera os documentos de perfil por coluna a partir do DatasetProfile acumulado na ingestão (arquivo fora da memória)."""
+    if profile is None or not profile.rows:
+        return []
+
+    cleaned_status = cleaned_status or {}
+    describe = profile.describe()
+    docs = []
+    for col in profile.columns:
+        nulos = profile.nulls.get(col, 0)
+        if col in describe.columns:
+            tipo_base = 'numérico'
+            stats = describe[col]
+            resumo = (f"min={_fmt(stats['min'])}, p25={_fmt(stats['25%'])}, mediana={_fmt(stats['50%'])}, "
+                      f"p75={_fmt(stats['75%'])}, max={_fmt(stats['max'])}, media={_fmt(stats['mean'])}, nulos={nulos}")
+        else:
+            tipo_base = 'categórico'
+            counts = profile.value_counts(col, top_n=10)
+            nao_nulos = max(profile.rows - nulos, 1)
+            distintos = len(profile.categories.get(col, ()))
+            distintos = f">={distintos}" if col in profile.truncated_categories else str(distintos)
+            top = ", ".join(f"{valor} ({quantidade / nao_nulos:.1%})" for valor, quantidade in counts.items())
+            resumo = f"distintos={distintos}, top {top}; nulos={nulos}"
+        tipo = cleaned_status.get(col, tipo_base)
+        docs.append(f"{PROFILE_DOC_PREFIX} {col} ({tipo}, {tipo_base}, {profile.rows} linhas): {resumo}")
+    return docs
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+from rag_components.load_embedding_model import load_embedding_model
+
+# Aquecimento em segundo plano ao iniciar o servidor (desative com EDA_RAG_WARMUP=0)
+WARMUP_ENABLED = os.environ.get('EDA_RAG_WARMUP', '1') != '0'
+WARMUP_TEXT = "aquecimento do modelo de embedding"
+
+
+def _warm_embedding():
+    """Carrega o modelo de embedding (cache_resource) e executa uma busca FAISS de teste."""
+    import faiss
+    import numpy as np
+    model = load_embedding_model()
+    embedding = np.array(model.encode([WARMUP_TEXT], show_progress_bar=False)).astype('float32')
+    index = faiss.IndexFlatL2(embedding.shape[1])
+    index.add(embedding)
+    index.search(embedding, 1)
+
+
+def _warm_plotting():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+
+
+# Etapas na ordem em que costumam ser usadas: listagem/ingestão, RAG, agentes, gráfico e PDF
+WARMUP_STEPS = (
+    ('pandas', lambda: __import__('pandas')),
+    ('embedding', _warm_embedding),
+    ('gemini', lambda: __import__('google.generativeai')),
+    ('matplotlib', _warm_plotting),
+    ('reportlab', lambda: __import__('reportlab.platypus')),
+)
+
+
+def _run_warmup(status):
+    inicio = time.perf_counter()
+    for name, step in WARMUP_STEPS:
+        step_start = time.perf_counter()
+        try:
+            step()
+            status['etapas'][name] = time.perf_counter() - step_start
+        except Exception as e:
+            # Uma etapa com falha é apenas adiada: o uso real tenta de novo e exibe o erro
+            status['erros'][name] = str(e)
+    status['segundos'] = time.perf_counter() - inicio
+    status['concluido'] = True
+
+
+@st.cache_resource
+def start_background_warmup():
+    """
+    Inicia, uma única vez por processo, o carregamento do modelo de embedding e das bibliotecas
+    pesadas em uma thread, sem bloquear a primeira renderização. Retorna o dicionário de status.
+    """
+    status = {'concluido': not WARMUP_ENABLED, 'etapas': {}, 'erros': {}, 'segundos': None}
+    if WARMUP_ENABLED:
+        thread = threading.Thread(target=_run_warmup, args=(status,), name="eda-rag-warmup", daemon=True)
+        # O contexto da execução que iniciou o aquecimento permite usar o st.cache_resource na thread
+        add_script_run_ctx(thread)
+        thread.start()
+    return status
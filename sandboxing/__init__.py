@@ -1 +1,2 @@
-from sandboxing.executa_codigo_seguro import executa_codigo_seguro
\ No newline at end of file
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+from sandboxing.otimizador_codigo import executa_codigo_otimizado
\ No newline at end of file
@@ -0,0 +1,87 @@
+import re
+import numpy as np
+from scipy.stats import t
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro, PADRAO_GRAFICO
+from sandboxing.otimizador_codigo import otimiza_codigo
+from rag_components.columnar_store import DataFrameStore
+
+# Subamostras disjuntas em que o código é repetido para estimar as margens de erro (médias por lotes)
+APROXIMADO_GRUPOS = 10
+# Nível de confiança das margens (quantil t de Student com grupos - 1 graus de liberdade)
+APROXIMADO_CONFIANCA = 0.95
+# Rótulos de linhas/colunas de extremos: não estimáveis a partir de uma amostra (margem em branco)
+APROXIMADO_EXTREMOS = {'min', 'max'}
+# Razão entre o valor na amostra inteira e a média dos grupos que caracteriza um total (contagem, soma)
+APROXIMADO_TOLERANCIA_TOTAL = 0.25
+
+
+def usa_dados(codigo):
+    """O código lê as linhas do dataset (e não só o perfil da ingestão)?"""
+    return bool(re.search(r"\bdf\b|\bgraficos\b", codigo))
+
+
+def _numericas(resultado_df):
+    return resultado_df.select_dtypes(include=np.number)
+
+
+def _margens(codigo, amostra, resultado_df, fator, perfil, fora_da_memoria, grupos):
+    """
+    Margens de erro (IC de 95%) de cada célula numérica de `resultado_df` por médias por lotes: o código é
+    repetido em `grupos` subamostras disjuntas e a dispersão entre elas estima o erro da amostra inteira.
+    Células que crescem com o número de linhas (contagens, somas) são extrapoladas para a população.
+    Retorna (resultado_df estimado, margens) ou (resultado_df, None) se o resultado não for comparável.
+    """
+    numericas = _numericas(resultado_df)
+    if numericas.empty or len(amostra) < grupos * 10:
+        return resultado_df, None
+
+    valores = []
+    for posicoes in np.array_split(np.arange(len(amostra)), grupos):
+        parte = amostra.iloc[posicoes].reset_index(drop=True)
+        _, df_grupo, erro, _ = executa_codigo_seguro(codigo, parte, perfil=perfil,
+                                                     tabela=DataFrameStore(parte) if fora_da_memoria else None)
+        if erro or df_grupo is None:
+            return resultado_df, None
+        df_grupo = _numericas(df_grupo)
+        # Grupos sem algum rótulo do resultado (ex.: categoria ausente na subamostra) não são comparáveis
+        if not (df_grupo.columns.equals(numericas.columns) and df_grupo.index.equals(numericas.index)):
+            return resultado_df, None
+        valores.append(df_grupo.to_numpy(dtype='float64'))
+
+    valores = np.stack(valores)
+    media, desvio = valores.mean(axis=0), valores.std(axis=0, ddof=1)
+    completo = numericas.to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.isclose(completo / media, grupos, rtol=APROXIMADO_TOLERANCIA_TOTAL)
+    quantil = t.ppf(0.5 + APROXIMADO_CONFIANCA / 2, grupos - 1)
+    margem = np.where(total, quantil * desvio * np.sqrt(grupos) * fator, quantil * desvio / np.sqrt(grupos))
+
+    estimado = resultado_df.copy()
+    for j, col in enumerate(numericas.columns):
+        if total[:, j].any():
+            coluna = np.where(total[:, j], completo[:, j] * fator, completo[:, j])
+            estimado[col] = np.round(coluna).astype(resultado_df[col].dtype) if resultado_df[col].dtype.kind in 'iu' else coluna
+    margens = numericas.copy().astype('float64')
+    margens.loc[:, :] = margem
+    margens.loc[:, [str(c).lower() in APROXIMADO_EXTREMOS for c in margens.columns]] = np.nan
+    margens.loc[[str(i).lower() in APROXIMADO_EXTREMOS for i in margens.index], :] = np.nan
+    return estimado, margens
+
+
+def executa_codigo_aproximado(codigo, amostra, linhas_total, perfil=None, fora_da_memoria=False, grupos=APROXIMADO_GRUPOS):
+    """
+    Executa o código gerado na amostra estratificada (milissegundos, em vez de varrer o dataset inteiro).
+    Retorna (resultado_texto, resultado_df, erro_execucao, img_bytes, info), com `info` contendo as linhas
+    da amostra e da população e as margens de erro das células numéricas de `resultado_df` (ou None).
+    """
+    tabela = DataFrameStore(amostra) if fora_da_memoria else None
+    # Mesmas reescritas vetorizadas da execução completa (o custo sobre a amostra cabe no orçamento)
+    codigo = otimiza_codigo(codigo, len(amostra), [str(c) for c in amostra.columns], fora_da_memoria=fora_da_memoria)[0]
+    resultado_texto, resultado_df, erro_execucao, img_bytes = executa_codigo_seguro(codigo, amostra, perfil=perfil, tabela=tabela)
+    info = {'linhas_amostra': len(amostra), 'linhas_total': linhas_total, 'margens': None}
+    if erro_execucao or resultado_df is None or 'INFORMAÇÃO' in resultado_df.columns or img_bytes or PADRAO_GRAFICO.search(codigo):
+        return resultado_texto, resultado_df, erro_execucao, img_bytes, info
+
+    fator = linhas_total / max(len(amostra), 1)
+    resultado_df, info['margens'] = _margens(codigo, amostra, resultado_df, fator, perfil, fora_da_memoria, grupos)
+    return resultado_texto, resultado_df, erro_execucao, img_bytes, info
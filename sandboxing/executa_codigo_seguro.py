@@ -1,62 +1,143 @@
-import io
-import contextlib
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from helpers.normalize_text import normalize_text
-
-def executa_codigo_seguro(codigo, df):
-    """Executa o código Pandas/Matplotlib gerado em um ambiente isolado."""
-    if codigo.startswith("Erro:"):
-        return codigo, None, None, None
-
-    output_stream = io.StringIO()
-    local_vars = {'df': df, 'pd': pd, 'plt': plt, 'normalize_text': normalize_text, 'np': np} # Adiciona np
-    img_bytes = None
-
-    try:
-        with contextlib.redirect_stdout(output_stream):
-            # Adiciona o df de forma segura para o exec
-            local_vars['df'] = df.copy() 
-            exec(codigo, {"__builtins__": __builtins__}, local_vars)
-        
-        # --- Lógica Aprimorada de Captura de Gráfico ---
-        # Captura apenas a primeira figura (esperamos que seja a figura com todos os subplots)
-        if len(plt.get_fignums()) > 0:
-            for fig_num in plt.get_fignums():
-                plt.figure(fig_num)
-                buf = io.BytesIO()
-                
-                # Garante que layout está ajustado para subplots
-                try:
-                    plt.tight_layout()
-                except Exception:
-                    pass
-                    
-                plt.savefig(buf, format="png")
-                img_bytes = buf.getvalue()
-                buf.close()
-                plt.close(fig_num)
-                break
-        
-        resultado_texto = output_stream.getvalue().strip()
-        resultado_df = local_vars.get('resultado_df')
-
-        # Normaliza Series para DataFrame
-        if isinstance(resultado_df, pd.Series):
-            resultado_df = resultado_df.reset_index()
-            if len(resultado_df.columns) == 2 and 'index' in resultado_df.columns:
-                resultado_df.columns = ['Categoria', 'Valor']
-        
-        # BLOCO CRÍTICO: GARANTE QUE TODO TEXTO SEJA CONVERTIDO EM DATAFRAME (TABELA)
-        if resultado_df is None and resultado_texto and not img_bytes:
-            # Cria um DataFrame de 1x1 com a resposta textual
-            resultado_df = pd.DataFrame({'INFORMAÇÃO': [resultado_texto]})
-            # Limpa o resultado_texto para que o Streamlit priorize resultado_df
-            resultado_texto = ""
-
-        return resultado_texto, resultado_df, None, img_bytes
-
-    except Exception as e:
-        error_message = f"Erro ao executar o código gerado pela IA:\n\n{e}\n\nCódigo que falhou:\n```python\n{codigo}\n```"
-        return error_message, None, error_message, None
\ No newline at end of file
+import io
+import re
+import sys
+import threading
+import contextlib
+from helpers.normalize_text import normalize_text
+from sandboxing.graficos import Graficos, GRAFICO_DPI, GRAFICO_FORMATO
+from rag_components.columnar_store import OUT_OF_CORE_MAX_RESULT_ROWS
+
+# O pyplot mantém estado global (figuras abertas): códigos com gráficos executam um de cada vez
+_PYPLOT_LOCK = threading.Lock()
+PADRAO_GRAFICO = re.compile(r"\bplt\b|matplotlib|pyplot|\bsns\b|seaborn|plotting|\.plot\b|\.hist\(|\.boxplot\(|\.figure\(|subplots")
+_saida_thread = threading.local()
+_instalacao_lock = threading.Lock()
+
+
+class _StdoutPorThread(io.TextIOBase):
+    """Encaminha o `print` de cada thread para o seu próprio buffer (ou para o stdout original)."""
+
+    def __init__(self, original):
+        self.original = original
+
+    def _destino(self):
+        return getattr(_saida_thread, 'stream', None) or self.original
+
+    def write(self, texto):
+        return self._destino().write(texto)
+
+    def flush(self):
+        self._destino().flush()
+
+
+@contextlib.contextmanager
+def _captura_stdout(stream):
+    """Como `contextlib.redirect_stdout`, mas restrito à thread atual (execuções paralelas não se misturam)."""
+    with _instalacao_lock:
+        if not isinstance(sys.stdout, _StdoutPorThread):
+            sys.stdout = _StdoutPorThread(sys.stdout)
+    anterior = getattr(_saida_thread, 'stream', None)
+    _saida_thread.stream = stream
+    try:
+        yield
+    finally:
+        _saida_thread.stream = anterior
+
+def _captura_figura(plt):
+    """PNG da primeira figura aberta no pyplot (ou None); fecha todas. Chamar com o `_PYPLOT_LOCK`."""
+    img_bytes = None
+    # Captura apenas a primeira figura (esperamos que seja a figura com todos os subplots)
+    for fig_num in plt.get_fignums():
+        plt.figure(fig_num)
+        buf = io.BytesIO()
+
+        # Garante que layout está ajustado para subplots
+        try:
+            plt.tight_layout()
+        except Exception:
+            pass
+
+        plt.savefig(buf, format=GRAFICO_FORMATO, dpi=GRAFICO_DPI)
+        img_bytes = buf.getvalue()
+        buf.close()
+        break
+    # Fecha todas as figuras para a próxima execução começar sem estado
+    plt.close('all')
+    return img_bytes
+
+def executa_codigo_seguro(codigo, df, perfil=None, tabela=None, copia_df=True):
+    """
+    Executa o código Pandas/Matplotlib gerado em um ambiente isolado (pode ser chamado de várias threads).
+    Com `tabela` (modo fora da memória), `df` é uma relação DuckDB sobre as partes Parquet e `sql(consulta)`
+    executa SQL sobre ela; o `df` recebido é só a amostra do esquema. `copia_df=False` dispensa a cópia
+    defensiva do df quando ele já é uma cópia descartável (a amostra do `executa_codigo_otimizado`).
+    """
+    if codigo.startswith("Erro:"):
+        return codigo, None, None, None
+
+    import numpy as np
+    import pandas as pd
+    import matplotlib
+    matplotlib.use('Agg')  # backend sem interface: o servidor só gera PNGs
+    import matplotlib.pyplot as plt
+
+    output_stream = io.StringIO()
+    graficos = Graficos(df, perfil, tabela=tabela)  # figuras próprias (sem pyplot), desenhadas a partir de agregados
+    local_vars = {'df': df, 'pd': pd, 'plt': plt, 'normalize_text': normalize_text, 'np': np, 'perfil': perfil,
+                  'graficos': graficos} # Adiciona np, o perfil do dataset e o helper de gráficos
+    img_bytes = None
+    # Uma conexão por execução: as consultas leem só as colunas e row groups necessários, em paralelo
+    conexao = tabela.connect() if tabela is not None else None
+    if conexao is not None:
+        local_vars['df'] = conexao.table('df')
+        local_vars['sql'] = conexao.sql
+
+    # A regex é só uma dica para executar sob o lock: a captura e o fechamento das figuras do pyplot sempre
+    # acontecem sob o lock, mesmo para códigos que desenham por caminhos não previstos (ex.: getattr(df, 'hist')).
+    # Só esses códigos (fora da dica) desenham sem o lock; a figura deles é capturada e nunca fica aberta
+    usa_grafico = bool(PADRAO_GRAFICO.search(codigo))
+    try:
+        with _captura_stdout(output_stream), (_PYPLOT_LOCK if usa_grafico else contextlib.nullcontext()):
+            # Adiciona o df de forma segura para o exec (a cópia só é feita se o código usar o df)
+            if conexao is None and copia_df and re.search(r"\bdf\b", codigo):
+                local_vars['df'] = graficos.df = df.copy()
+            exec(codigo, {"__builtins__": __builtins__}, local_vars)
+            if usa_grafico:
+                img_bytes = _captura_figura(plt)
+        if not usa_grafico:
+            with _PYPLOT_LOCK:
+                img_bytes = _captura_figura(plt)
+
+        # Figuras do helper `graficos` não dependem do estado global do pyplot (fora do lock)
+        if img_bytes is None:
+            img_bytes = graficos.imagem()
+        
+        resultado_texto = output_stream.getvalue().strip()
+        resultado_df = local_vars.get('resultado_df')
+        if conexao is not None and resultado_df is not None and not isinstance(resultado_df, (pd.DataFrame, pd.Series)):
+            # Relação DuckDB não materializada: converte um número limitado de linhas
+            resultado_df = resultado_df.limit(OUT_OF_CORE_MAX_RESULT_ROWS).df()
+
+        # Normaliza Series para DataFrame
+        if isinstance(resultado_df, pd.Series):
+            resultado_df = resultado_df.reset_index()
+            if len(resultado_df.columns) == 2 and 'index' in resultado_df.columns:
+                resultado_df.columns = ['Categoria', 'Valor']
+        
+        # BLOCO CRÍTICO: GARANTE QUE TODO TEXTO SEJA CONVERTIDO EM DATAFRAME (TABELA)
+        if resultado_df is None and resultado_texto and not img_bytes:
+            # Cria um DataFrame de 1x1 com a resposta textual
+            resultado_df = pd.DataFrame({'INFORMAÇÃO': [resultado_texto]})
+            # Limpa o resultado_texto para que o Streamlit priorize resultado_df
+            resultado_texto = ""
+
+        return resultado_texto, resultado_df, None, img_bytes
+
+    except Exception as e:
+        with _PYPLOT_LOCK:
+            plt.close('all')
+        error_message = f"Erro ao executar o código gerado pela IA:\n\n{e}\n\nCódigo que falhou:\n```python\n{codigo}\n```"
+        return error_message, None, error_message, None
+    finally:
+        if conexao is not None:
+            conexao.close()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import io
+import os
+import numpy as np
+
+# Resolução e formato das imagens geradas (png, jpeg ou webp)
+GRAFICO_DPI = int(os.environ.get('EDA_PLOT_DPI', 100))
+GRAFICO_FORMATO = os.environ.get('EDA_PLOT_FORMAT', 'png')
+GRAFICO_BINS = 30
+# Pontos desenhados no gráfico de dispersão e outliers por boxplot (amostras acima disso)
+GRAFICO_MAX_PONTOS = 50_000
+GRAFICO_MAX_OUTLIERS = 500
+
+
+def _valores(serie):
+    """Valores numéricos finitos de uma coluna, como array float64 (sem cópia quando possível)."""
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    return valores[np.isfinite(valores)]
+
+
+def _amostra_ordenada(valores, n):
+    """Até `n` valores espaçados de forma uniforme em `valores` ordenados (preserva os extremos)."""
+    valores = np.sort(valores)
+    if valores.size <= n:
+        return valores
+    return valores[np.linspace(0, valores.size - 1, n).astype('int64')]
+
+
+def estatisticas_boxplot(valores, rotulo=""):
+    """Estatísticas de boxplot (formato de `Axes.bxp`) calculadas de forma vetorizada, com outliers amostrados."""
+    if valores.size == 0:
+        return None
+    q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+    iqr = q3 - q1
+    dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+    fora = valores[(valores < q1 - 1.5 * iqr) | (valores > q3 + 1.5 * iqr)]
+    return {'label': rotulo, 'q1': q1, 'med': mediana, 'q3': q3,
+            'whislo': dentro.min() if dentro.size else q1, 'whishi': dentro.max() if dentro.size else q3,
+            'fliers': _amostra_ordenada(fora, GRAFICO_MAX_OUTLIERS)}
+
+
+def estatisticas_boxplot_perfil(perfil, coluna):
+    """Estatísticas de boxplot a partir do perfil da ingestão (quartis aproximados; só min/max como outliers)."""
+    stats = perfil.numeric.get(coluna)
+    if not stats or not stats['count']:
+        return None
+    q1, mediana, q3 = stats['sketch'].quantiles([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    whislo, whishi = max(stats['min'], q1 - 1.5 * iqr), min(stats['max'], q3 + 1.5 * iqr)
+    fliers = [v for v in (stats['min'], stats['max']) if v < whislo or v > whishi]
+    return {'label': coluna, 'q1': q1, 'med': mediana, 'q3': q3, 'whislo': whislo, 'whishi': whishi,
+            'fliers': np.array(fliers)}
+
+
+class Graficos:
+    """
+    Gráficos para o código gerado, disponível no sandbox como `graficos`.
+    Histogramas e boxplots são desenhados a partir de agregados (NumPy ou o perfil da ingestão), não dos
+    pontos; as figuras são objetos próprios (backend Agg, sem pyplot), seguras entre execuções paralelas.
+    Com `tabela` (modo fora da memória), o `df` é só a amostra do esquema e os valores vêm das partes Parquet.
+    """
+
+    def __init__(self, df=None, perfil=None, dpi=GRAFICO_DPI, formato=GRAFICO_FORMATO, tabela=None):
+        self.df = df
+        self.perfil = perfil
+        self.tabela = tabela
+        self.dpi = dpi
+        self.formato = formato
+        self.figuras = []
+
+    def _usa_perfil(self):
+        # O perfil só substitui o df quando cobre exatamente as mesmas linhas
+        if self.tabela is not None:
+            return self.perfil is not None and self.perfil.rows == self.tabela.rows
+        return self.perfil is not None and self.df is not None and self.perfil.rows == len(self.df)
+
+    def _serie(self, coluna):
+        return self.tabela.column(coluna) if self.tabela is not None else self.df[coluna]
+
+    def _colunas(self, colunas):
+        if colunas is None:
+            return list(self.df.select_dtypes(include=np.number).columns)
+        return [colunas] if isinstance(colunas, str) else list(colunas)
+
+    def figura(self, n_paineis=1, max_colunas=4, largura=4, altura=3):
+        """Nova figura com `n_paineis` eixos em grade (até `max_colunas` por linha); retorna (fig, eixos)."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        n_cols = max(1, min(max_colunas, n_paineis))
+        n_rows = int(np.ceil(n_paineis / n_cols))
+        fig = Figure(figsize=(largura * n_cols, altura * n_rows))
+        FigureCanvasAgg(fig)
+        axes = list(np.atleast_1d(fig.subplots(n_rows, n_cols, squeeze=False)).flatten())
+        for ax in axes[n_paineis:]:
+            fig.delaxes(ax)
+        self.figuras.append(fig)
+        return fig, axes[:n_paineis]
+
+    def histogramas(self, colunas=None, bins=GRAFICO_BINS, titulo=None):
+        """Um histograma por coluna numérica (todas, por padrão)."""
+        colunas = self._colunas(colunas)
+        if not colunas:
+            print("Não há colunas numéricas para plotar.")
+            return None
+        fig, axes = self.figura(len(colunas))
+        for ax, col in zip(axes, colunas):
+            if self._usa_perfil() and col in self.perfil.numeric:
+                contagens, bordas = self.perfil.histogram(col)
+            else:
+                contagens, bordas = np.histogram(_valores(self._serie(col)), bins=bins)
+            if contagens.size:
+                ax.stairs(contagens, bordas, fill=True, edgecolor='black', linewidth=0.5)
+            ax.set_title(col, fontsize=10)
+            ax.tick_params(axis='x', rotation=45)
+        if titulo:
+            fig.suptitle(titulo, fontsize=14)
+        return fig
+
+    def boxplots(self, colunas=None, titulo=None):
+        """Um boxplot por coluna numérica (todas, por padrão), com os outliers amostrados."""
+        colunas = self._colunas(colunas)
+        if not colunas:
+            print("Não há colunas numéricas para plotar.")
+            return None
+        fig, axes = self.figura(len(colunas))
+        for ax, col in zip(axes, colunas):
+            if self._usa_perfil() and col in self.perfil.numeric:
+                stats = estatisticas_boxplot_perfil(self.perfil, col)
+            else:
+                stats = estatisticas_boxplot(_valores(self._serie(col)), col)
+            if stats is not None:
+                ax.bxp([stats], showfliers=True, flierprops={'markersize': 3})
+            ax.set_title(col, fontsize=10)
+        if titulo:
+            fig.suptitle(titulo, fontsize=14)
+        return fig
+
+    def dispersao(self, x, y, max_pontos=GRAFICO_MAX_PONTOS, titulo=None):
+        """Gráfico de dispersão de `y` por `x`, com amostra de até `max_pontos` linhas."""
+        if self.tabela is not None:
+            dados = self.tabela.sample([x, y], max_pontos).dropna()
+        else:
+            dados = self.df[[x, y]].dropna()
+        if len(dados) > max_pontos:
+            dados = dados.sample(max_pontos, random_state=0)
+        fig, (ax,) = self.figura(1, largura=6, altura=4)
+        ax.scatter(dados[x].to_numpy(), dados[y].to_numpy(), s=2, alpha=0.3, rasterized=True)
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        ax.set_title(titulo or f"{y} x {x}", fontsize=12)
+        return fig
+
+    def salva(self, fig):
+        """Bytes da figura no formato e DPI configurados."""
+        buf = io.BytesIO()
+        fig.savefig(buf, format=self.formato, dpi=self.dpi, bbox_inches='tight')
+        return buf.getvalue()
+
+    def imagem(self):
+        """Bytes da primeira figura criada pelo código (ou None)."""
+        return self.salva(self.figuras[0]) if self.figuras else None
@@ -0,0 +1,600 @@
+import ast
+import copy
+import os
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+from sandboxing.graficos import GRAFICO_MAX_PONTOS
+from rag_components.columnar_store import DataFrameStore
+
+# Tempo estimado (s) que o código gerado pode levar sobre todas as linhas antes de ser amostrado ou rejeitado
+CODIGO_ORCAMENTO_S = float(os.environ.get('EDA_CODE_BUDGET_S', 20))
+# Acima do orçamento: 'amostrar' (executa em uma amostra aleatória que caiba no orçamento) ou 'rejeitar'
+CODIGO_EXCESSO = os.environ.get('EDA_CODE_OVER_BUDGET', 'amostrar')
+# Amostras menores que isso não representam o dataset: acima do orçamento, o código é rejeitado
+CODIGO_MIN_LINHAS_AMOSTRA = 10_000
+# Padrões com custo estimado abaixo disso (s) não aparecem no relatório
+CODIGO_ALERTA_MIN_S = 0.1
+
+# Custo (s) por linha de cada padrão (ordem de grandeza medida com pandas 2.x em um core)
+CUSTO_ITERROWS = 40e-6
+CUSTO_ITERTUPLES = 4e-6
+CUSTO_ITERACAO = 0.15e-6  # iteração Python sobre uma coluna (ou um passo do corpo de um laço)
+CUSTO_ACESSO_ESCALAR = 7e-6  # df.loc[i, col], df.at[...], df.iloc[i] dentro de um laço
+CUSTO_APPLY_LINHAS = 10e-6
+CUSTO_APPLY_ELEMENTO = 0.3e-6
+CUSTO_PONTO_GRAFICO = 5e-6
+# Por célula (linha x coluna)
+CUSTO_VETORIZADO = 5e-9
+CUSTO_COPIA = 8e-9
+CUSTO_MATERIALIZACAO = 50e-9  # relação DuckDB convertida inteira para Pandas (modo fora da memória)
+# Laço sobre algo que não são as linhas (colunas, categorias, grupos): iterações presumidas
+ITERACOES_LACO_PADRAO = 10
+
+CUSTO_LACO = {'iterrows': CUSTO_ITERROWS, 'itertuples': CUSTO_ITERTUPLES, 'indice': CUSTO_ITERACAO, 'serie': CUSTO_ITERACAO}
+DESCRICAO_LACO = {
+    'iterrows': "laço com iterrows() sobre as linhas",
+    'itertuples': "laço com itertuples() sobre as linhas",
+    'indice': "laço sobre os índices das linhas",
+    'serie': "laço Python sobre os valores de uma coluna",
+}
+# Gráficos que desenham um ponto por linha (amostrados acima de GRAFICO_MAX_PONTOS)
+GRAFICOS_PONTOS = {'scatter', 'plot', 'line', 'scatterplot', 'lineplot', 'pairplot', 'jointplot', 'regplot', 'relplot',
+                   'lmplot', 'stripplot', 'swarmplot'}
+MATERIALIZACOES = {'df', 'fetchall', 'fetchdf', 'fetchnumpy', 'to_df', 'arrow', 'pl'}
+# Nomes do sandbox que não apontam para o df
+MODULOS_SANDBOX = {'pd', 'np', 'plt', 'math'}
+METODOS_TEXTO = {'upper', 'lower', 'strip', 'lstrip', 'rstrip', 'title', 'capitalize'}
+OPERADORES_ARITMETICOS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+OPERADORES_COMPARACAO = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+def _nomes(node):
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _nome_chamada(call):
+    func = call.func
+    return func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else None
+
+
+def _keyword(call, nome):
+    return next((kw.value for kw in call.keywords if kw.arg == nome), None)
+
+
+def _derivados(arvore):
+    """Nomes que (podem) guardar dados do `df`: atribuídos a partir de expressões que o referenciam."""
+    derivados = {'df'}
+    atribuicoes = [n for n in ast.walk(arvore) if isinstance(n, (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.NamedExpr))]
+    mudou = True
+    while mudou:
+        mudou = False
+        for node in atribuicoes:
+            if node.value is None or not (_nomes(node.value) & derivados):
+                continue
+            alvos = node.targets if isinstance(node, ast.Assign) else [node.target]
+            novos = set().union(*(_nomes(alvo) for alvo in alvos)) - derivados
+            if novos:
+                derivados |= novos
+                mudou = True
+    return derivados
+
+
+def _simples(node, derivados):
+    """Expressão barata de repetir: um nome do df ou uma seleção de colunas por constantes (ex.: df[['a', 'b']])."""
+    if isinstance(node, ast.Name):
+        return node.id in derivados
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id in derivados:
+        chave = node.slice
+        return isinstance(chave, ast.Constant) or (isinstance(chave, ast.List) and all(isinstance(e, ast.Constant) for e in chave.elts))
+    return False
+
+
+def _coluna(node, derivados):
+    """Seleção de uma única coluna do df (Series): df['a']."""
+    return (isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id in derivados
+            and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str))
+
+
+def _iteracao_linhas(node, derivados):
+    """Tipo do laço se `node` (o iterável) percorre as linhas do df: 'iterrows', 'itertuples', 'indice', 'serie' ou None."""
+    if isinstance(node, ast.Call):
+        nome = _nome_chamada(node)
+        if isinstance(node.func, ast.Attribute) and _nomes(node.func.value) & derivados:
+            if nome in ('iterrows', 'itertuples'):
+                return nome
+            if nome in ('tolist', 'to_list', 'to_numpy') or (nome in ('items', 'iteritems') and _coluna(node.func.value, derivados)):
+                return 'serie'
+        if nome == 'range' and any(_nomes(arg) & derivados for arg in node.args):
+            return 'indice'
+        if nome in ('zip', 'enumerate'):
+            return next(filter(None, (_iteracao_linhas(arg, derivados) for arg in node.args)), None)
+        return None
+    if isinstance(node, ast.Attribute) and _nomes(node.value) & derivados:
+        return 'indice' if node.attr == 'index' else 'serie' if node.attr in ('values', 'array') else None
+    if _coluna(node, derivados):
+        return 'serie'
+    return None
+
+
+class _NaoVetorizavel(Exception):
+    pass
+
+
+class _Vetorizador:
+    """
+    Traduz a expressão de uma lambda (ou do corpo de um laço) aplicada a cada linha/elemento para a expressão
+    equivalente sobre as colunas: `r['a'] * 2` -> `df['a'] * 2`, `x > 0 and x < 5` -> `(s > 0) & (s < 5)`.
+    Modos: 'linha' (linha de apply(axis=1)/iterrows), 'tupla' (itertuples) e 'elemento' (Series.apply/map).
+    """
+
+    def __init__(self, parametro, fonte, modo, colunas=None, proibidos=()):
+        self.parametro = parametro
+        self.fonte = fonte
+        self.modo = modo
+        self.colunas = set(colunas) if colunas is not None else None
+        self.proibidos = set(proibidos)
+        self.usou = False
+
+    def _fonte(self):
+        self.usou = True
+        return copy.deepcopy(self.fonte)
+
+    def _coluna(self, nome):
+        if not isinstance(nome, str) or (self.colunas is not None and nome not in self.colunas):
+            raise _NaoVetorizavel(nome)
+        return ast.Subscript(self._fonte(), ast.Constant(nome), ast.Load())
+
+    def _parametro(self, node):
+        return isinstance(node, ast.Name) and node.id == self.parametro
+
+    def booleana(self, node):
+        return (isinstance(node, (ast.Compare, ast.BoolOp)) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not))
+                or (isinstance(node, ast.Constant) and isinstance(node.value, bool)))
+
+    def vetoriza(self, node):
+        if isinstance(node, ast.Constant):
+            return copy.deepcopy(node)
+        if isinstance(node, ast.Name):
+            if node.id == self.parametro:
+                if self.modo != 'elemento':
+                    raise _NaoVetorizavel("linha inteira")
+                return self._fonte()
+            if node.id in self.proibidos:
+                raise _NaoVetorizavel(node.id)
+            return copy.deepcopy(node)  # escalar do código (ex.: um limite calculado antes)
+        if isinstance(node, ast.Subscript) and self._parametro(node.value) and self.modo == 'linha':
+            if not isinstance(node.slice, ast.Constant):
+                raise _NaoVetorizavel("índice variável")
+            return self._coluna(node.slice.value)
+        if isinstance(node, ast.Attribute) and self._parametro(node.value) and self.modo in ('linha', 'tupla'):
+            return self._coluna(node.attr)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, OPERADORES_ARITMETICOS):
+            return ast.BinOp(self.vetoriza(node.left), node.op, self.vetoriza(node.right))
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, (ast.USub, ast.UAdd)):
+                return ast.UnaryOp(node.op, self.vetoriza(node.operand))
+            if isinstance(node.op, ast.Not) and self.booleana(node.operand):
+                return ast.UnaryOp(ast.Invert(), self.vetoriza(node.operand))
+        if isinstance(node, ast.Compare) and all(isinstance(op, OPERADORES_COMPARACAO) for op in node.ops):
+            operandos = [node.left] + node.comparators
+            comparacoes = [ast.Compare(self.vetoriza(a), [op], [self.vetoriza(b)])
+                           for a, op, b in zip(operandos, node.ops, operandos[1:])]
+            resultado = comparacoes[0]
+            for comparacao in comparacoes[1:]:
+                resultado = ast.BinOp(resultado, ast.BitAnd(), comparacao)
+            return resultado
+        if isinstance(node, ast.BoolOp) and all(self.booleana(valor) for valor in node.values):
+            operador = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+            resultado = self.vetoriza(node.values[0])
+            for valor in node.values[1:]:
+                resultado = ast.BinOp(resultado, operador, self.vetoriza(valor))
+            return resultado
+        if isinstance(node, ast.IfExp):
+            # pd.Series(np.where(cond, a, b), index=fonte.index): mesmo índice (e nome, por elemento) do apply
+            where = ast.Call(ast.Attribute(ast.Name('np', ast.Load()), 'where', ast.Load()),
+                             [self.vetoriza(node.test), self.vetoriza(node.body), self.vetoriza(node.orelse)], [])
+            keywords = [ast.keyword('index', ast.Attribute(self._fonte(), 'index', ast.Load()))]
+            if self.modo == 'elemento':
+                keywords.append(ast.keyword('name', ast.Attribute(self._fonte(), 'name', ast.Load())))
+            return ast.Call(ast.Attribute(ast.Name('pd', ast.Load()), 'Series', ast.Load()), [where], keywords)
+        if isinstance(node, ast.Call) and not node.keywords:
+            nome = _nome_chamada(node)
+            # round(x, n) fica de fora: o NumPy arredonda casas decimais de outra forma que o Python (ex.: 1.005)
+            if isinstance(node.func, ast.Name) and nome in ('abs', 'round') and len(node.args) == 1:
+                return ast.Call(ast.Name(nome, ast.Load()), [self.vetoriza(node.args[0])], [])
+            if self.modo == 'elemento' and nome == 'len' and len(node.args) == 1 and self._parametro(node.args[0]):
+                return ast.Call(ast.Attribute(ast.Attribute(self._fonte(), 'str', ast.Load()), 'len', ast.Load()), [], [])
+            if (self.modo == 'elemento' and nome in METODOS_TEXTO and not node.args
+                    and isinstance(node.func, ast.Attribute) and self._parametro(node.func.value)):
+                return ast.Call(ast.Attribute(ast.Attribute(self._fonte(), 'str', ast.Load()), nome, ast.Load()), [], [])
+        raise _NaoVetorizavel(type(node).__name__)
+
+
+class _Reescritor(ast.NodeTransformer):
+    """Reescreve padrões lentos conhecidos em equivalentes vetorizados; `reescritas` descreve cada mudança."""
+
+    def __init__(self, arvore, linhas, colunas=None, fora_da_memoria=False):
+        self.arvore = arvore
+        self.linhas = linhas
+        self.colunas = colunas
+        self.fora_da_memoria = fora_da_memoria
+        self.derivados = _derivados(arvore)
+        self.reescritas = []
+
+    def _registra(self, node, descricao):
+        self.reescritas.append(f"linha {node.lineno}: {descricao}")
+
+    # --- apply/map linha a linha ou elemento a elemento ---
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        nome = _nome_chamada(node)
+        if nome in ('apply', 'map') and isinstance(node.func, ast.Attribute):
+            novo = self._apply(node, nome)
+            if novo is not None:
+                return ast.copy_location(novo, node)
+        if nome in GRAFICOS_PONTOS and not self.fora_da_memoria and self.linhas > GRAFICO_MAX_PONTOS:
+            return self._amostra_grafico(node, nome)
+        return node
+
+    def _apply(self, node, nome):
+        receptor = node.func.value
+        if len(node.args) != 1 or not isinstance(node.args[0], ast.Lambda) or len(node.args[0].args.args) != 1:
+            return None
+        funcao = node.args[0]
+        axis = _keyword(node, 'axis')
+        por_linha = isinstance(axis, ast.Constant) and axis.value in (1, 'columns')
+        outros = [kw for kw in node.keywords if kw.arg != 'axis']
+        if outros or (axis is not None and not por_linha):
+            return None
+        if por_linha and nome == 'apply' and _simples(receptor, self.derivados):
+            modo, descricao = 'linha', "apply(axis=1) linha a linha substituído por operações sobre as colunas"
+        elif not por_linha and _coluna(receptor, self.derivados):
+            modo, descricao = 'elemento', f"{nome}() elemento a elemento substituído por uma operação vetorizada"
+        else:
+            return None
+        vetorizador = _Vetorizador(funcao.args.args[0].arg, receptor, modo, self.colunas)
+        try:
+            expressao = vetorizador.vetoriza(funcao.body)
+        except _NaoVetorizavel:
+            return None
+        if not vetorizador.usou:
+            return None
+        if modo == 'linha' and not (isinstance(expressao, ast.Call) and _nome_chamada(expressao) == 'Series'):
+            # O resultado do apply(axis=1) não tem nome; o de uma operação sobre uma coluna herdaria o dela
+            expressao = ast.Call(ast.Attribute(expressao, 'rename', ast.Load()), [ast.Constant(None)], [])
+        self._registra(node, descricao)
+        return expressao
+
+    # --- Gráficos com um ponto por linha ---
+
+    def _amostra_grafico(self, node, nome):
+        kind = _keyword(node, 'kind')
+        if nome == 'plot' and kind is not None and not (isinstance(kind, ast.Constant) and kind.value in ('line', 'scatter')):
+            return node
+        internas = [n for n in ast.walk(node) if isinstance(n, ast.Call) and n is not node]
+        # Agregações dentro do gráfico (groupby, value_counts...) mudariam de valor em uma amostra
+        if internas or 'df' not in _nomes(node):
+            return node
+        amostra = ast.parse(f"df.sample(n={GRAFICO_MAX_PONTOS}, random_state=0).sort_index()", mode='eval').body
+
+        class _TrocaDf(ast.NodeTransformer):
+            def visit_Name(self, n):
+                return copy.deepcopy(amostra) if n.id == 'df' and isinstance(n.ctx, ast.Load) else n
+
+        novo = _TrocaDf().visit(node)
+        self._registra(node, f"gráfico {nome}() desenhado sobre uma amostra de {GRAFICO_MAX_PONTOS} linhas (e não sobre todas as {self.linhas})")
+        return novo
+
+    # --- Laços de acumulação com iterrows/itertuples ---
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        novo = self._laco_acumulacao(node)
+        return node if novo is None else novo
+
+    def _laco_acumulacao(self, node):
+        tipo = _iteracao_linhas(node.iter, self.derivados)
+        if tipo not in ('iterrows', 'itertuples') or node.orelse:
+            return None
+        receptor = node.iter.func.value
+        if not _simples(receptor, self.derivados) or node.iter.args or any(kw.arg != 'index' for kw in node.iter.keywords):
+            return None
+        if tipo == 'iterrows':
+            if not (isinstance(node.target, ast.Tuple) and len(node.target.elts) == 2 and all(isinstance(e, ast.Name) for e in node.target.elts)):
+                return None
+            indice, linha = node.target.elts[0].id, node.target.elts[1].id
+        else:
+            if not isinstance(node.target, ast.Name):
+                return None
+            indice, linha = None, node.target.id
+
+        corpo, condicao = node.body, None
+        if len(corpo) == 1 and isinstance(corpo[0], ast.If) and not corpo[0].orelse:
+            condicao, corpo = corpo[0].test, corpo[0].body
+        acumuladores = []
+        for stmt in corpo:
+            if isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name) and isinstance(stmt.op, (ast.Add, ast.Sub)):
+                acumuladores.append(stmt.target.id)
+            elif (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call) and _nome_chamada(stmt.value) == 'append'
+                  and isinstance(stmt.value.func, ast.Attribute) and isinstance(stmt.value.func.value, ast.Name)
+                  and len(stmt.value.args) == 1 and not stmt.value.keywords):
+                acumuladores.append(stmt.value.func.value.id)
+            else:
+                return None
+
+        # As variáveis do laço não podem ser usadas depois dele (deixariam de existir)
+        variaveis = {linha, indice} - {None}
+        fora = sum(1 for n in ast.walk(self.arvore) if isinstance(n, ast.Name) and n.id in variaveis)
+        dentro = sum(1 for n in ast.walk(node) if isinstance(n, ast.Name) and n.id in variaveis)
+        if fora != dentro:
+            return None
+
+        modo = 'linha' if tipo == 'iterrows' else 'tupla'
+        proibidos = set(acumuladores) | ({indice} if indice else set())
+        try:
+            mascara = None
+            if condicao is not None:
+                vetorizador = _Vetorizador(linha, receptor, modo, self.colunas, proibidos)
+                mascara = vetorizador.vetoriza(condicao)
+                if not vetorizador.usou:
+                    return None
+            novos = []
+            for stmt in corpo:
+                valor = stmt.value if isinstance(stmt, ast.AugAssign) else stmt.value.args[0]
+                vetorizador = _Vetorizador(linha, receptor, modo, self.colunas, proibidos)
+                expressao = vetorizador.vetoriza(valor)
+                selecao = ast.Subscript(expressao, copy.deepcopy(mascara), ast.Load()) if mascara is not None else expressao
+                if isinstance(stmt, ast.AugAssign):
+                    if vetorizador.usou:
+                        # skipna=False: um NaN propaga para o total, como na soma linha a linha
+                        total = ast.Call(ast.Attribute(selecao, 'sum', ast.Load()), [], [ast.keyword('skipna', ast.Constant(False))])
+                    else:
+                        vezes = (ast.Call(ast.Name('int', ast.Load()), [ast.Call(ast.Attribute(copy.deepcopy(mascara), 'sum', ast.Load()), [], [])], [])
+                                 if mascara is not None else ast.Call(ast.Name('len', ast.Load()), [copy.deepcopy(receptor)], []))
+                        total = vezes if isinstance(expressao, ast.Constant) and expressao.value == 1 else ast.BinOp(expressao, ast.Mult(), vezes)
+                    novos.append(ast.AugAssign(copy.deepcopy(stmt.target), stmt.op, total))
+                else:
+                    if not vetorizador.usou:
+                        return None
+                    lista = ast.Call(ast.Attribute(selecao, 'tolist', ast.Load()), [], [])
+                    novos.append(ast.Expr(ast.Call(ast.Attribute(copy.deepcopy(stmt.value.func.value), 'extend', ast.Load()), [lista], [])))
+        except _NaoVetorizavel:
+            return None
+        for novo in novos:
+            ast.copy_location(novo, node)
+        self._registra(node, f"laço com {tipo}() substituído por {len(novos)} operação(ões) vetorizada(s)")
+        return novos
+
+
+class _EstimadorCusto(ast.NodeVisitor):
+    """Soma o custo estimado (s) de cada operação sobre as linhas, multiplicado pelas iterações dos laços que a contêm."""
+
+    def __init__(self, arvore, linhas, n_colunas, fora_da_memoria=False):
+        self.linhas = linhas
+        self.n_colunas = n_colunas
+        self.fora_da_memoria = fora_da_memoria
+        self.derivados = _derivados(arvore)
+        self.multiplicador = 1.0
+        self.em_laco_linhas = False
+        self.custo = 0.0
+        self.alertas = {}  # (linha, padrão) -> custo
+
+    def _soma(self, custo, node=None, padrao=None):
+        custo *= self.multiplicador
+        self.custo += custo
+        if padrao is not None:
+            chave = (getattr(node, 'lineno', 0), padrao)
+            self.alertas[chave] = self.alertas.get(chave, 0.0) + custo
+
+    def _do_df(self, node):
+        return bool(_nomes(node) & self.derivados)
+
+    def _laco(self, node, iteravel, corpo):
+        tipo = _iteracao_linhas(iteravel, self.derivados)
+        self.visit(iteravel)
+        anterior, em_laco = self.multiplicador, self.em_laco_linhas
+        if tipo is not None:
+            self._soma(self.linhas * CUSTO_LACO[tipo], node, DESCRICAO_LACO[tipo])
+            self.multiplicador *= self.linhas
+            self.em_laco_linhas = True
+        else:
+            self.multiplicador *= ITERACOES_LACO_PADRAO
+        for item in corpo:
+            if isinstance(item, ast.stmt):
+                self._soma(CUSTO_ITERACAO)
+            self.visit(item)
+        self.multiplicador, self.em_laco_linhas = anterior, em_laco
+
+    def visit_For(self, node):
+        self._laco(node, node.iter, node.body)
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    def visit_While(self, node):
+        self._laco(node, node.test, node.body)
+
+    def _compreensao(self, node, elementos):
+        anterior, em_laco = self.multiplicador, self.em_laco_linhas
+        for gerador in node.generators:
+            tipo = _iteracao_linhas(gerador.iter, self.derivados)
+            self.visit(gerador.iter)
+            if tipo is not None:
+                self._soma(self.linhas * CUSTO_LACO[tipo], node, DESCRICAO_LACO[tipo])
+                self.multiplicador *= self.linhas
+                self.em_laco_linhas = True
+            else:
+                self.multiplicador *= ITERACOES_LACO_PADRAO
+            for condicao in gerador.ifs:
+                self.visit(condicao)
+        for elemento in elementos:
+            self.visit(elemento)
+        self.multiplicador, self.em_laco_linhas = anterior, em_laco
+
+    def visit_ListComp(self, node):
+        self._compreensao(node, [node.elt])
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        self._compreensao(node, [node.key, node.value])
+
+    def visit_Subscript(self, node):
+        if (self.em_laco_linhas and isinstance(node.value, ast.Attribute) and node.value.attr in ('loc', 'at', 'iloc', 'iat')
+                and self._do_df(node.value.value)):
+            self._soma(CUSTO_ACESSO_ESCALAR, node, f"acesso escalar .{node.value.attr}[] dentro de um laço sobre as linhas")
+        self.generic_visit(node)
+
+    def _vetorizado(self, node):
+        if self._do_df(node) and not self.em_laco_linhas:
+            self._soma(self.linhas * CUSTO_VETORIZADO)
+        self.generic_visit(node)
+
+    visit_BinOp = visit_Compare = visit_UnaryOp = visit_BoolOp = _vetorizado
+
+    def visit_Call(self, node):
+        nome = _nome_chamada(node)
+        receptor = node.func.value if isinstance(node.func, ast.Attribute) else None
+        if receptor is not None and self._do_df(receptor) and nome in ('apply', 'map', 'applymap'):
+            axis = _keyword(node, 'axis')
+            funcao = node.args[0] if node.args else None
+            if isinstance(axis, ast.Constant) and axis.value in (1, 'columns'):
+                self._soma(self.linhas * CUSTO_APPLY_LINHAS, node, "apply(axis=1) linha a linha")
+            elif nome == 'applymap' or (nome == 'map' and isinstance(receptor, ast.Name)):
+                self._soma(self.linhas * self.n_colunas * CUSTO_APPLY_ELEMENTO, node, f"{nome}() elemento a elemento no DataFrame")
+            elif (isinstance(funcao, (ast.Lambda, ast.Name)) and not isinstance(receptor, ast.Name)
+                  and not (isinstance(funcao, ast.Name) and funcao.id in MODULOS_SANDBOX)):
+                self._soma(self.linhas * CUSTO_APPLY_ELEMENTO, node, f"{nome}() elemento a elemento em uma coluna")
+            else:
+                self._soma(self.linhas * CUSTO_VETORIZADO)
+        elif (nome == 'copy' and receptor is not None and self._do_df(receptor)) or \
+                (nome in ('concat', 'merge', 'join') and self._do_df(node)):
+            self._soma(self.linhas * self.n_colunas * CUSTO_COPIA, node, "cópia do DataFrame inteiro")
+        elif nome in GRAFICOS_PONTOS and self._do_df(node) and not any(
+                _nome_chamada(n) in ('sample', 'head', 'tail', 'nlargest', 'nsmallest') for n in ast.walk(node) if isinstance(n, ast.Call)):
+            self._soma(self.linhas * CUSTO_PONTO_GRAFICO, node, f"gráfico {nome}() com um ponto por linha")
+        elif self.fora_da_memoria and nome in MATERIALIZACOES and isinstance(receptor, ast.Name) and receptor.id == 'df':
+            self._soma(self.linhas * self.n_colunas * CUSTO_MATERIALIZACAO, node, "tabela inteira convertida para Pandas em memória")
+        elif receptor is not None and self._do_df(receptor) and not self.em_laco_linhas:
+            colunas = self.n_colunas if isinstance(receptor, ast.Name) else 1
+            self._soma(self.linhas * colunas * CUSTO_VETORIZADO)
+        self.generic_visit(node)
+
+
+def estima_custo(arvore, linhas, n_colunas=1, fora_da_memoria=False):
+    """Custo estimado (s) do código sobre `linhas` linhas e os padrões lentos encontrados [(linha, padrão, custo)]."""
+    estimador = _EstimadorCusto(arvore, linhas, max(n_colunas, 1), fora_da_memoria)
+    estimador.visit(arvore)
+    alertas = sorted(((linha, padrao, custo) for (linha, padrao), custo in estimador.alertas.items() if custo >= CODIGO_ALERTA_MIN_S),
+                     key=lambda alerta: -alerta[2])
+    return estimador.custo, alertas
+
+
+def otimiza_codigo(codigo, linhas, colunas=None, fora_da_memoria=False, orcamento_s=None, excesso=None):
+    """
+    Análise do código gerado antes da execução: reescreve padrões lentos conhecidos (apply/map com lambdas,
+    laços de acumulação com iterrows/itertuples, gráficos de pontos sobre todas as linhas), estima o custo
+    sobre `linhas` linhas e decide a ação: 'executar', 'amostrar' (amostra que caiba no orçamento) ou 'rejeitar'.
+    Retorna (código a executar, relatório).
+    """
+    orcamento_s = CODIGO_ORCAMENTO_S if orcamento_s is None else orcamento_s
+    excesso = CODIGO_EXCESSO if excesso is None else excesso
+    relatorio = {'linhas': linhas, 'orcamento_s': orcamento_s, 'custo_original_s': 0.0, 'custo_estimado_s': 0.0,
+                 'reescritas': [], 'alertas': [], 'acao': 'executar',
+                 'linhas_amostra': None, 'codigo': codigo}
+    try:
+        arvore = ast.parse(codigo)
+    except SyntaxError:
+        return codigo, relatorio  # o erro de sintaxe é reportado pela execução
+    n_colunas = len(colunas) if colunas is not None else 1
+    relatorio['custo_original_s'], _ = estima_custo(arvore, linhas, n_colunas, fora_da_memoria)
+
+    reescritor = _Reescritor(arvore, linhas, colunas, fora_da_memoria)
+    nova = ast.fix_missing_locations(reescritor.visit(copy.deepcopy(arvore)))
+    if reescritor.reescritas:
+        try:
+            codigo_novo = ast.unparse(nova)
+            compile(codigo_novo, "<codigo_gerado>", "exec")
+            arvore, codigo = ast.parse(codigo_novo), codigo_novo
+            relatorio['reescritas'] = reescritor.reescritas
+        except (SyntaxError, ValueError):
+            pass
+
+    custo, relatorio['alertas'] = estima_custo(arvore, linhas, n_colunas, fora_da_memoria)
+    if not fora_da_memoria:
+        custo += linhas * n_colunas * CUSTO_COPIA  # cópia defensiva do df feita pelo sandbox
+    relatorio['custo_estimado_s'] = custo
+    relatorio['codigo'] = codigo
+
+    if custo > orcamento_s:
+        linhas_amostra = int(linhas * orcamento_s / custo)
+        if excesso == 'amostrar' and linhas_amostra >= CODIGO_MIN_LINHAS_AMOSTRA:
+            relatorio['acao'], relatorio['linhas_amostra'] = 'amostrar', linhas_amostra
+        else:
+            relatorio['acao'] = 'rejeitar'
+    return codigo, relatorio
+
+
+def _padroes_lentos(relatorio):
+    """Os padrões lentos que continuaram no código (não reescritos), com a linha e o custo estimado."""
+    return "; ".join(f"linha {linha}: {padrao} (~{custo:.1f} s)" for linha, padrao, custo in relatorio['alertas'][:3])
+
+
+def mensagem_rejeicao(relatorio):
+    padroes = _padroes_lentos(relatorio)
+    return (f"Código gerado rejeitado antes da execução: custo estimado de ~{relatorio['custo_estimado_s']:.0f} s sobre "
+            f"{relatorio['linhas']} linhas, acima do orçamento de {relatorio['orcamento_s']:g} s"
+            + (f". Padrões lentos: {padroes}." if padroes else ".")
+            + " Reformule a pergunta ou peça uma análise agregada.")
+
+
+def avisos_relatorio(relatorio):
+    """Avisos (tipo, mensagem) do relatório para exibir junto ao resultado."""
+    if relatorio is None:
+        return []
+    avisos = []
+    padroes = _padroes_lentos(relatorio)
+    if relatorio['acao'] == 'amostrar':
+        avisos.append(('warning', f"O código gerado levaria ~{relatorio['custo_estimado_s']:.0f} s sobre as {relatorio['linhas']} linhas "
+                                  f"(orçamento de {relatorio['orcamento_s']:g} s): foi executado sobre uma amostra aleatória de "
+                                  f"**{relatorio['linhas_amostra']}** linhas, e contagens e somas se referem à amostra."
+                                  + (f" Padrões lentos não reescritos: {padroes}." if padroes else "")))
+    elif padroes and relatorio['acao'] == 'executar':
+        avisos.append(('info', f"Padrões lentos não reescritos no código gerado: {padroes}."))
+    if relatorio['reescritas']:
+        avisos.append(('info', f"{len(relatorio['reescritas'])} padrão(ões) lento(s) do código gerado reescrito(s) em forma vetorizada "
+                               f"(custo estimado de ~{relatorio['custo_original_s']:.1f} s para ~{relatorio['custo_estimado_s']:.1f} s)."))
+    return avisos
+
+
+def executa_codigo_otimizado(codigo, df, perfil=None, tabela=None):
+    """
+    Executa o código gerado depois da análise de desempenho (`otimiza_codigo`): com as reescritas aplicadas
+    e sobre uma amostra (ou rejeitado) se o custo estimado exceder o orçamento. Retorna (resultado_texto, resultado_df, erro_execucao, img_bytes, relatorio).
+    """
+    if codigo.startswith("Erro:") or df is None:
+        return (*executa_codigo_seguro(codigo, df, perfil=perfil, tabela=tabela), None)
+
+    linhas = tabela.rows if tabela is not None else len(df)
+    codigo_exec, relatorio = otimiza_codigo(codigo, linhas, [str(c) for c in df.columns], fora_da_memoria=tabela is not None)
+    if relatorio['acao'] == 'rejeitar':
+        erro = mensagem_rejeicao(relatorio)
+        return erro, None, erro, None, relatorio
+
+    copia_df = True
+    if relatorio['acao'] == 'amostrar':
+        n = relatorio['linhas_amostra']
+        if tabela is not None:
+            df = tabela.sample(list(df.columns), n)
+            tabela = DataFrameStore(df)
+        else:
+            # Ordem original das linhas e índice 0..n-1 (códigos com df.loc[i] continuam válidos)
+            df = df.sample(n=n, random_state=0).sort_index().reset_index(drop=True)
+        copia_df = False  # a amostra já é uma cópia
+
+    resultado = executa_codigo_seguro(codigo_exec, df, perfil=perfil, tabela=tabela, copia_df=copia_df)
+    custo_original = relatorio['custo_original_s'] * len(df) / max(linhas, 1) if tabela is None else relatorio['custo_original_s']
+    if resultado[2] and codigo_exec != codigo and custo_original <= relatorio['orcamento_s']:
+        # A versão reescrita falhou: o código original (dentro do orçamento) é executado como foi gerado
+        resultado = executa_codigo_seguro(codigo, df, perfil=perfil, tabela=tabela)
+        relatorio.update({'reescritas': [], 'codigo': codigo, 'custo_estimado_s': relatorio['custo_original_s']})
+    return (*resultado, relatorio)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os testes importam os pacotes do app a partir da raiz do repositório (como o main.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
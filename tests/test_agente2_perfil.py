@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.agente2 import _codigo_perfil
+from helpers.normalize_text import normalize_text
+from rag_components.dataset_profile import DatasetProfile
+
+
+@pytest.fixture(scope="module")
+def perfil():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'AMOUNT': rng.exponential(80, 1000), 'CLASS': rng.integers(0, 2, 1000), 'V1': rng.normal(size=1000)})
+    return DatasetProfile.from_dataframe(df)
+
+
+def codigo(pergunta, perfil):
+    return _codigo_perfil(normalize_text(pergunta).upper(), perfil)
+
+
+@pytest.mark.parametrize("pergunta, esperado", [
+    ("Qual a média de AMOUNT?", "perfil.mean(['AMOUNT'])"),
+    ("Me dê as estatísticas descritivas", "perfil.describe(None)"),
+    ("Quantos valores ausentes em cada coluna?", "perfil.null_counts()"),
+    ("Correlação de V1 e AMOUNT", "perfil.correlation(['AMOUNT', 'V1'])"),
+    ("qual a mediana do amount?", "perfil.describe(['AMOUNT'])"),
+])
+def test_perguntas_sobre_o_dataset_inteiro_usam_o_perfil(perfil, pergunta, esperado):
+    assert esperado in codigo(pergunta, perfil)
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Qual a média de AMOUNT para CLASS = 1?",
+    "Qual a média do Amount nas transações fraudulentas?",
+    "Calcule a média móvel de AMOUNT",
+    "Qual a média acumulada de AMOUNT?",
+    "Qual a correlação entre V1 e AMOUNT nas fraudes?",
+    "Média de AMOUNT por CLASS",
+    "Média de AMOUNT quando V1 > 0",
+    "Média de AMOUNT em 2023",
+    "Desvio padrão de AMOUNT entre 10 e 100",
+    "Média de AMOUNT acima de 500",
+])
+def test_perguntas_com_filtro_ou_condicao_vao_para_o_llm(perfil, pergunta):
+    assert codigo(pergunta, perfil) is None
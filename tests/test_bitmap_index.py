@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rag_components.bitmap_index import BitmapIndex
+from rag_components.columnar_store import ColumnarStore
+
+pytest.importorskip("pyarrow")
+
+
+def _dataset(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Amount': rng.exponential(80, size=rows).round(2),
+        'Tipo': rng.choice(['A', 'B', 'C'], size=rows),
+    })
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    df = _dataset(5000)
+    bitmaps = BitmapIndex()
+    tabela = ColumnarStore.create(str(tmp_path / 'tabela'), part_rows=1500)
+    for start in range(0, len(df), 1000):
+        chunk = df.iloc[start:start + 1000]
+        bitmaps.add_chunk(chunk, start, {'Amount': 'Numeric', 'Tipo': 'Categorical'})
+        tabela.append(chunk)
+    tabela.flush()
+    return df, bitmaps, tabela
+
+
+def test_filtro_numerico_exato_nas_partes_parquet(dataset):
+    df, bitmaps, tabela = dataset
+    filtros = [('Amount', '>', 100.0), ('Tipo', '==', 'B')]
+    esperado = np.flatnonzero(((df['Amount'] > 100) & (df['Tipo'] == 'B')).to_numpy())
+
+    # Só os bitmaps devolvem a faixa inteira que contém o limite; as partes Parquet confirmam a condição
+    assert len(bitmaps.match(filtros)) > len(esperado)
+    np.testing.assert_array_equal(bitmaps.match(filtros, tabela), esperado)
+    np.testing.assert_array_equal(bitmaps.match(filtros, df), esperado)
+
+
+def test_filtro_sem_candidatos(dataset):
+    _, bitmaps, tabela = dataset
+    assert len(bitmaps.match([('Amount', '<', -1.0)], tabela)) == 0
+
+
+def test_take_com_colunas_preserva_a_ordem(dataset):
+    df, _, tabela = dataset
+    posicoes = [4999, 0, 1501, 1501, 2999]
+    pd.testing.assert_frame_equal(tabela.take(posicoes, columns=['Amount']),
+                                  df[['Amount']].iloc[posicoes].reset_index(drop=True))
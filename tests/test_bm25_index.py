@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+
+from rag_components.bm25_index import BM25Index
+
+
+def documentos(n, inicio=0):
+    return [f"id {i} classe {i % 7} valor {i * 3.5} categoria c{i % 13}" for i in range(inicio, inicio + n)]
+
+
+def test_indice_incremental_encontra_o_mesmo_que_o_construido_de_uma_vez():
+    incremental, unico = BM25Index(), BM25Index()
+    for inicio in range(0, 3000, 25):
+        incremental.add_documents(documentos(25, inicio))
+    unico.add_documents(documentos(3000))
+    for consulta in ["id 1234", "classe 3 categoria c5", "valor 70"]:
+        ids, scores = incremental.search(consulta, top_k=10)
+        ids_unico, scores_unico = unico.search(consulta, top_k=10)
+        np.testing.assert_array_equal(ids, ids_unico)
+        np.testing.assert_allclose(scores, scores_unico, rtol=1e-6)
+
+
+def test_segmentos_crescem_em_niveis():
+    index = BM25Index()
+    refundidos = 0
+    for lote in range(1000):
+        antes = [len(s[0]) for s in index.segments]
+        index.add_documents(documentos(10, lote * 10))
+        depois = [len(s[0]) for s in index.segments]
+        # Postings regravados nesta chamada: os segmentos que sumiram (fundidos ao novo segmento final)
+        mantidos = len(depois) - 1
+        refundidos += sum(antes[mantidos:])
+        assert len(index.segments) <= 2 * math.log2(lote + 2) + 1
+    total = sum(len(s[0]) for s in index.segments)
+    # Compactação de todos os segmentos a cada lote seria ~500x o total; em níveis, O(log n) vezes
+    assert refundidos <= 2 * math.log2(1000) * total
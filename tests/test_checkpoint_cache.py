@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import rag_components.checkpoint_cache as checkpoint_cache
+from rag_components.checkpoint_cache import CheckpointCache
+
+
+def grava(cache, key, name, conteudo):
+    def writer(path):
+        with open(path, "wb") as f:
+            f.write(conteudo)
+    cache.write_file(key, name, writer)
+
+
+def test_commit_so_recalcula_o_hash_dos_arquivos_alterados(tmp_path, monkeypatch):
+    cache = CheckpointCache(str(tmp_path))
+    calculados = []
+    original = checkpoint_cache._sha256_file
+    monkeypatch.setattr(checkpoint_cache, '_sha256_file', lambda path: calculados.append(os.path.basename(path)) or original(path))
+
+    grava(cache, 'k', 'indice.bin', b"a" * 1000)
+    grava(cache, 'k', 'progresso.pkl', b"1")
+    cache.commit('k')
+    assert sorted(calculados) == ['indice.bin', 'progresso.pkl']
+
+    calculados.clear()
+    grava(cache, 'k', 'progresso.pkl', b"2")
+    cache.commit('k')
+    assert calculados == ['progresso.pkl']
+
+    # Os hashes reaproveitados continuam válidos na leitura com verificação
+    assert set(cache.open_entry('k')) == {'indice.bin', 'progresso.pkl'}
+
+
+def test_entrada_fixada_nao_e_descartada_pelo_lru(tmp_path):
+    cache = CheckpointCache(str(tmp_path), max_bytes=1500)
+    grava(cache, 'em_uso', 'parte.parquet', b"a" * 1000)
+    cache.commit('em_uso')
+    cache.pin('em_uso', 'sessao-1')
+
+    grava(cache, 'nova', 'parte.parquet', b"b" * 1000)
+    cache.commit('nova')
+    assert cache.has_entry('em_uso') and os.path.exists(os.path.join(str(tmp_path), 'em_uso', 'parte.parquet'))
+
+    # Liberada pela sessão, volta a ser candidata ao descarte
+    cache.release('sessao-1')
+    grava(cache, 'outra', 'parte.parquet', b"c" * 1000)
+    cache.commit('outra')
+    assert not cache.has_entry('em_uso') and cache.has_entry('outra')
+
+
+def test_fixacao_expira_sem_renovacao(tmp_path):
+    cache = CheckpointCache(str(tmp_path), max_bytes=1500, pin_ttl=-1)
+    grava(cache, 'abandonada', 'parte.parquet', b"a" * 1000)
+    cache.commit('abandonada')
+    cache.pin('abandonada', 'sessao-1')
+
+    grava(cache, 'nova', 'parte.parquet', b"b" * 1000)
+    cache.commit('nova')
+    assert not cache.has_entry('abandonada')
+
+
+def test_verificacao_de_uma_entrada_nao_bloqueia_stats_nem_outras_entradas(tmp_path, monkeypatch):
+    cache = CheckpointCache(str(tmp_path))
+    grava(cache, 'grande', 'df.pkl', b"a" * 1000)
+    cache.commit('grande')
+    grava(cache, 'pequena', 'df.pkl', b"b")
+    cache.commit('pequena')
+
+    hashing, liberado = threading.Event(), threading.Event()
+    original = checkpoint_cache._sha256_file
+
+    def sha256_lento(path):
+        if os.path.basename(os.path.dirname(path)) == 'grande':
+            hashing.set()
+            liberado.wait(5)
+        return original(path)
+
+    monkeypatch.setattr(checkpoint_cache, '_sha256_file', sha256_lento)
+    resultado = {}
+    leitura = threading.Thread(target=lambda: resultado.update(arquivos=cache.open_entry('grande')))
+    leitura.start()
+    assert hashing.wait(5)
+
+    # Enquanto 'grande' é verificada, as outras sessões leem o resumo e abrem outras entradas
+    inicio = time.perf_counter()
+    assert cache.stats()['entradas'] == 2
+    assert set(cache.open_entry('pequena')) == {'df.pkl'}
+    assert time.perf_counter() - inicio < 1
+    liberado.set()
+    leitura.join(5)
+    assert set(resultado['arquivos']) == {'df.pkl'}
+    assert cache.stats()['hits'] == 2
+
+
+def test_entrada_corrompida_e_descartada_e_atualiza_o_resumo(tmp_path):
+    cache = CheckpointCache(str(tmp_path))
+    grava(cache, 'k', 'df.pkl', b"a" * 100)
+    cache.commit('k')
+    with open(os.path.join(str(tmp_path), 'k', 'df.pkl'), "r+b") as f:
+        f.write(b"b")
+
+    assert cache.open_entry('k') is None
+    assert not cache.has_entry('k')
+    assert cache.stats() == {'entradas': 0, 'bytes': 0, 'fixadas': 0, 'cota_bytes': cache.max_bytes, 'hits': 0, 'misses': 1}
@@ -0,0 +1,47 @@
+import faiss
+import numpy as np
+import pytest
+
+from rag_components.create_faiss_index_for_chunk import PQ_MIN_TRAINING, create_vector_index
+
+
+def _embeddings(n, d, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, d)).astype('float32')
+
+
+def _busca_proprios_vetores(index, embeddings):
+    index.add(embeddings)
+    _, ids = index.search(embeddings[:20], 1)
+    return ids[:, 0]
+
+
+@pytest.mark.parametrize("n, d", [
+    (PQ_MIN_TRAINING - 1, 384),  # poucos vetores para treinar os centróides de 8 bits
+    (PQ_MIN_TRAINING * 2, 100),  # dimensão não divisível pelos 48 subquantizadores
+])
+def test_pq_sem_condicoes_de_treino_cai_para_sq8(n, d):
+    embeddings = _embeddings(n, d)
+    index = create_vector_index(embeddings, 'pq')
+
+    assert isinstance(index, faiss.IndexScalarQuantizer)
+    assert index.sq.qtype == faiss.ScalarQuantizer.QT_8bit
+    assert index.is_trained and index.d == d
+    assert (_busca_proprios_vetores(index, embeddings) == np.arange(20)).all()
+
+
+def test_pq_com_vetores_suficientes_usa_48_subquantizadores(monkeypatch):
+    # O treino real do PQ48x8 (48 k-means) é lento para um teste: só a fábrica escolhida é verificada
+    specs = []
+    monkeypatch.setattr(faiss, 'index_factory', lambda d, spec, metric: specs.append(spec) or faiss.IndexFlatL2(d))
+    create_vector_index(_embeddings(PQ_MIN_TRAINING, 384), 'pq')
+    create_vector_index(_embeddings(PQ_MIN_TRAINING, 96), 'pq')
+
+    assert specs == ["PQ48x8", "PQ48x8"]
+
+
+def test_compressao_desconhecida_usa_indice_flat():
+    embeddings = _embeddings(10, 384)
+    index = create_vector_index(embeddings, 'inexistente')
+
+    assert isinstance(index, faiss.IndexFlatL2)
+    assert (_busca_proprios_vetores(index, embeddings[:10]) == np.arange(10)).all()
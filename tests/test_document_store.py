@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rag_components.columnar_store import ColumnarStore
+from rag_components.document_store import RowDocumentStore, TextDocumentStore
+
+
+def _dataset(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Time': np.arange(rows, dtype='int64'),
+        'V1': rng.normal(size=rows),
+        'Amount': np.where(rng.random(rows) < 0.1, np.nan, rng.exponential(80, size=rows).round(2)),
+        'Categoria': rng.choice(['varejo', 'serviços', 'online'], size=rows),
+        'Fraude': rng.random(rows) < 0.05,
+    })
+
+
+def _documentos_antigos(df, chunk_rows):
+    """Lista de textos como era montada na ingestão, chunk a chunk, antes do store por posição."""
+    documents = []
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        documents.extend(chunk.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist())
+    return documents
+
+
+def _store(df, chunk_rows):
+    store = RowDocumentStore()
+    for start in range(0, len(df), chunk_rows):
+        store.add_rows(start, len(df.iloc[start:start + chunk_rows]))
+    return store
+
+
+def test_documentos_por_linha_iguais_a_lista_antiga():
+    df = _dataset(1000)
+    antigos = _documentos_antigos(df, 300)
+    store = _store(df, 300)
+
+    assert len(store) == len(antigos)
+    assert store.get(range(len(store)), df) == antigos
+    # Ids fora de ordem (como os top-k da busca) e ids inválidos (-1 do FAISS) ignorados
+    ids = [999, 0, 301, 42, -1, 1000, 299]
+    assert store.get(ids, df) == [antigos[i] for i in ids if 0 <= i < len(antigos)]
+
+
+def test_faixas_nao_contiguas_mapeiam_para_as_linhas_certas():
+    df = _dataset(50)
+    store = RowDocumentStore()
+    store.add_rows(0, 10)
+    store.add_rows(10, 5)   # continua a faixa anterior
+    store.add_rows(30, 10)  # linhas 15..29 não indexadas
+
+    assert len(store) == 25 and len(store._id_starts) == 2
+    assert store.row_positions([0, 14, 15, 24]) == [0, 14, 30, 39]
+    antigos = _documentos_antigos(df, 50)
+    assert store.get([14, 15], df) == [antigos[14], antigos[30]]
+
+
+def test_documentos_lidos_das_partes_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = _dataset(1000).drop(columns=['Amount', 'Fraude'])
+    tabela = ColumnarStore.create(str(tmp_path / 'tabela'), part_rows=400)
+    for start in range(0, len(df), 300):
+        tabela.append(df.iloc[start:start + 300])
+    tabela.flush()
+    antigos = _documentos_antigos(df, 300)
+    store = _store(df, 300)
+
+    ids = [999, 0, 401, 42, 800]
+    assert store.get(ids, tabela) == [antigos[i] for i in ids]
+
+
+def test_store_sem_fonte_das_linhas_falha():
+    store = _store(_dataset(10), 10)
+    with pytest.raises(ValueError):
+        store.get([0])
+
+
+def test_store_de_texto_equivale_a_lista():
+    docs = ["Resumo do bloco 0: média 1,5", "Coluna 'Categoria' — 3 valores", "", "ação ✓"]
+    store = TextDocumentStore(docs[:2])
+    store.extend(docs[2:])
+
+    assert len(store) == len(docs) and list(store) == docs
+    assert store[-1] == docs[-1]
+    assert store.get([3, 0, 7, -1]) == [docs[3], docs[0]]
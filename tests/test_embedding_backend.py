@@ -0,0 +1,38 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from rag_components.load_embedding_model import EMBEDDING_ONNX_MIN_COSINE, EMBEDDING_ONNX_QCONFIG
+
+# O pacote rag_components reexporta a função load_embedding_model com o mesmo nome do módulo
+load_embedding_model = importlib.import_module("rag_components.load_embedding_model")
+
+
+@pytest.fixture(scope="module")
+def modelo_int8():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum")
+    try:
+        return load_embedding_model._load_onnx_int8(EMBEDDING_ONNX_QCONFIG)
+    except OSError as e:  # modelo fora do cache local e sem acesso ao Hub
+        pytest.skip(f"modelo indisponível: {e}")
+
+
+def test_int8_dentro_da_tolerancia_do_float32(modelo_int8):
+    assert load_embedding_model.similaridade_com_float32(modelo_int8).min() >= EMBEDDING_ONNX_MIN_COSINE
+
+
+@pytest.mark.parametrize("cossenos, aceito", [([0.999, 0.995], True), ([0.999, 0.90], False)])
+def test_validacao_recusa_modelo_fora_da_tolerancia(tmp_path, monkeypatch, cossenos, aceito):
+    monkeypatch.setattr(load_embedding_model, 'EMBEDDING_ONNX_DIR', str(tmp_path))
+    chamadas = []
+    monkeypatch.setattr(load_embedding_model, 'similaridade_com_float32', lambda model: chamadas.append(1) or np.array(cossenos))
+    modelo = object()
+    for _ in range(2):  # a segunda validação usa o resultado gravado
+        if aceito:
+            assert load_embedding_model._valida_onnx_int8(modelo, 'avx2') is modelo
+        else:
+            with pytest.raises(RuntimeError):
+                load_embedding_model._valida_onnx_int8(modelo, 'avx2')
+    assert len(chamadas) == 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rag_components.stratified_sample import StratifiedSample
+from sandboxing.execucao_aproximada import executa_codigo_aproximado
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+
+LINHAS = 200_000
+
+
+@pytest.fixture(scope="module")
+def populacao():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'Amount': rng.exponential(80, size=LINHAS).round(2),
+        'Categoria': rng.choice(['varejo', 'servicos', 'online'], size=LINHAS, p=[0.5, 0.3, 0.2]),
+        'Class': (rng.random(LINHAS) < 0.05).astype('int64'),
+    })
+    amostra = StratifiedSample(capacity=20_000)
+    for start in range(0, LINHAS, 10_000):
+        amostra.update(df.iloc[start:start + 10_000])
+    return df, amostra.sample()
+
+
+def _aproximado_e_exato(codigo, populacao, amostra=None):
+    df, estratificada = populacao
+    _, estimado, erro, _, info = executa_codigo_aproximado(codigo, estratificada if amostra is None else amostra, LINHAS)
+    assert not erro, erro
+    exato = executa_codigo_seguro(codigo, df)[1]
+    return estimado, exato, info['margens']
+
+
+def test_contagem_soma_e_media_ficam_dentro_da_margem(populacao):
+    # Margens de 95% por célula: em amostras repetidas, ao menos ~95% dos valores exatos ficam dentro delas
+    df, _ = populacao
+    codigo = "resultado_df = df.groupby('Categoria')['Amount'].agg(['count', 'sum', 'mean'])"
+    dentro = {'count': [], 'sum': [], 'mean': []}
+    for seed in range(20):
+        amostra = df.sample(20_000, random_state=seed).reset_index(drop=True)
+        estimado, exato, margens = _aproximado_e_exato(codigo, populacao, amostra)
+        for coluna, acertos in dentro.items():
+            acertos.extend((estimado[coluna] - exato[coluna]).abs() <= margens[coluna])
+            # Margens informativas: bem menores que o próprio valor
+            assert (margens[coluna] < 0.1 * exato[coluna]).all()
+        # Contagens e somas são extrapoladas para a população; a média não
+        assert estimado['count'].sum() == pytest.approx(LINHAS, rel=0.01)
+        assert estimado['count'].dtype.kind == 'i'
+        assert estimado['mean'].tolist() == pytest.approx(exato['mean'].tolist(), rel=0.05)
+
+    for coluna, acertos in dentro.items():
+        assert np.mean(acertos) >= 0.9, f"{coluna}: {np.mean(acertos):.0%} dos valores exatos dentro da margem"
+
+
+def test_totais_globais_e_taxa_ficam_dentro_da_margem(populacao):
+    codigo = ("resultado_df = pd.DataFrame({'fraudes': [df['Class'].sum()], 'linhas': [len(df)],"
+              " 'taxa': [df['Class'].mean()], 'total': [df['Amount'].sum()]})")
+    estimado, exato, margens = _aproximado_e_exato(codigo, populacao)
+
+    erro = (estimado - exato).abs()
+    assert (erro <= margens).all().all(), f"erro {erro.to_dict('records')} > margem {margens.to_dict('records')}"
+    assert estimado.loc[0, 'linhas'] == pytest.approx(LINHAS, rel=0.01)
+    assert estimado.loc[0, 'taxa'] == pytest.approx(exato.loc[0, 'taxa'], rel=0.2)
+
+
+def test_extremos_nao_tem_margem(populacao):
+    codigo = "resultado_df = df.groupby('Categoria')['Amount'].agg(['min', 'max', 'mean'])"
+    estimado, exato, margens = _aproximado_e_exato(codigo, populacao)
+
+    assert margens[['min', 'max']].isna().all().all()
+    assert margens['mean'].notna().all()
+    # Extremos na amostra não são extrapolados
+    assert (estimado['max'] <= exato['max']).all()
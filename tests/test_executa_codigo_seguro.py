@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'AMOUNT': rng.exponential(80, 500), 'V1': rng.normal(size=500)})
+
+
+@pytest.mark.parametrize("codigo", [
+    "df['AMOUNT'].plot.hist()",
+    "pd.plotting.scatter_matrix(df)",
+    # Nenhum padrão da regex: a figura ainda deve ser capturada (e fechada) sob o lock
+    "getattr(df, 'hist')()",
+])
+def test_figuras_sao_capturadas_e_fechadas(df, codigo):
+    _, _, erro, img_bytes = executa_codigo_seguro(codigo, df)
+    assert erro is None and img_bytes
+    assert plt.get_fignums() == []
+
+
+def test_erro_nao_deixa_figuras_abertas(df):
+    _, _, erro, _ = executa_codigo_seguro("getattr(df, 'hist')()\nraise ValueError('falha')", df)
+    assert erro and plt.get_fignums() == []
+
+
+def test_execucoes_paralelas_nao_trocam_figuras(df):
+    # Códigos com gráfico (pela dica da regex) criam, capturam e fecham a figura sem soltar o lock; os demais só
+    # olham as figuras sob o lock depois do exec, e não encontram as de outra execução
+    codigos = ["df['AMOUNT'].plot.hist()", "resultado_df = df.describe()"] * 8
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(lambda codigo: executa_codigo_seguro(codigo, df), codigos))
+    for codigo, (_, resultado_df, erro, img_bytes) in zip(codigos, resultados):
+        assert erro is None
+        assert (img_bytes is not None) == ('hist' in codigo)
+    assert plt.get_fignums() == []
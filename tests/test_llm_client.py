@@ -0,0 +1,39 @@
+import pytest
+
+from agents.gemini_stub import inicia_servidor_mock
+from agents.llm_client import LLMClient
+
+
+@pytest.fixture
+def servidor():
+    servidor = inicia_servidor_mock(delay=0, falhas_iniciais=0)
+    yield servidor
+    servidor.shutdown()
+
+
+def cliente(servidor):
+    return LLMClient(endpoint=f"http://127.0.0.1:{servidor.server_port}", requisicoes_por_minuto=6000, rajada=100)
+
+
+def test_cliente_por_api_key_usa_o_endpoint_configurado(servidor):
+    # O cliente de cada API key é atribuído ao modelo (google-generativeai fixado no requirements.txt):
+    # se a biblioteca mudar o atributo, a requisição não chega ao servidor mock
+    llm = cliente(servidor)
+    texto = llm.gera_texto("chave-a", "Qual a média de AMOUNT?")
+    assert texto and servidor.requisicoes == 1
+    assert llm.modelo("chave-a") is not llm.modelo("chave-b")
+    assert llm.metricas()['tokens_entrada'] > 0
+
+
+def test_streaming_entrega_trechos_acumulados(servidor):
+    recebidos = []
+    texto = cliente(servidor).gera_texto("chave", "Gere um histograma de AMOUNT", on_token=recebidos.append)
+    assert recebidos and recebidos[-1] == texto
+    assert all(texto.startswith(parcial) for parcial in recebidos)
+
+
+def test_quota_excedida_e_repetida(servidor):
+    servidor.falhas_iniciais = 1
+    llm = cliente(servidor)
+    assert llm.gera_texto("chave", "Quais os tipos das colunas?")
+    assert servidor.requisicoes == 2 and llm.metricas()['retentativas'] == 1
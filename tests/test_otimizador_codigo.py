@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+from sandboxing.otimizador_codigo import avisos_relatorio, executa_codigo_otimizado, otimiza_codigo
+
+# Códigos que alteram o df no lugar: o df do chamador (compartilhado entre sessões) não pode mudar
+ALTERAM_DF = [
+    "np.add.at(df['a'].values, [0], 100)",
+    "np.multiply(df['a'].values, 2, df['a'].values)",
+    "valores = df['a'].values\nvalores[0] = 99",
+    "df.drop(columns=['b'], inplace=True)",
+    "df['a'] = 0",
+    "df.loc[0, 'a'] = -1",
+]
+
+
+@pytest.mark.parametrize("codigo", ALTERAM_DF)
+def test_codigo_que_altera_o_df_nao_afeta_o_chamador(codigo):
+    df = pd.DataFrame({'a': np.arange(5, dtype='float64'), 'b': np.ones(5)})
+    original = df.copy()
+    executa_codigo_otimizado(codigo, df)
+
+    # Com copy-on-write (datasets compartilhados) a escrita em .values falha; sem ele, altera só a cópia
+    pd.testing.assert_frame_equal(df, original)
+
+
+# --- Reescritas: o código vetorizado dá o mesmo resultado que o original ---
+
+REESCRITOS = {
+    'apply_classifica': """
+df['Faixa'] = df.apply(lambda row: 'alto' if row['Amount'] > 100 else 'baixo', axis=1)
+resultado_df = df['Faixa'].value_counts().to_frame()
+""",
+    'apply_condicao_composta': """
+df['Suspeita'] = df.apply(lambda r: r['Amount'] > 200 and (r['V1'] < -1 or r['V2'] > 1), axis=1)
+resultado_df = df.groupby('Class')['Suspeita'].mean().to_frame()
+""",
+    'apply_aritmetica': """
+razao = df.apply(lambda linha: abs(linha['V1'] - linha['V2']) / (linha['Amount'] + 1), axis=1)
+resultado_df = razao.describe().to_frame('razao')
+""",
+    'apply_intervalo': """
+resultado_df = df[df.apply(lambda r: 0 < r['V1'] < 1, axis=1)].groupby('Categoria')['Amount'].sum().to_frame()
+""",
+    'series_apply': """
+valores = df['Amount'].apply(lambda x: x * 1.1 if x > 10 else 0)
+resultado_df = valores.describe().to_frame()
+""",
+    'series_map_texto': """
+categorias = df['Categoria'].map(lambda c: c.upper())
+resultado_df = categorias.value_counts().to_frame()
+""",
+    'iterrows_soma_condicional': """
+total_fraude = 0
+qtd_fraude = 0
+for index, row in df.iterrows():
+    if row['Class'] == 1:
+        total_fraude += row['Amount']
+        qtd_fraude += 1
+resultado_df = pd.DataFrame({'total': [total_fraude], 'quantidade': [qtd_fraude]})
+""",
+    'iterrows_contagem': """
+linhas = 0
+for _, r in df.iterrows():
+    linhas += 1
+print(f"Total de linhas: {linhas}")
+""",
+    'itertuples_lista': """
+valores_altos = []
+for t in df.itertuples():
+    if t.Amount > 500:
+        valores_altos.append(t.Amount)
+resultado_df = pd.DataFrame({'media': [np.mean(valores_altos)], 'qtd': [len(valores_altos)]})
+""",
+}
+
+# Padrões que o otimizador não reescreve: precisam aparecer no relatório (e nos avisos ao usuário)
+NAO_REESCRITOS = {
+    'loc_em_laco': ("""
+positivos = 0
+for i in range(len(df)):
+    if df.loc[i, 'V1'] > 0:
+        positivos += 1
+print(f"Linhas com V1 positivo: {positivos}")
+""", "acesso escalar .loc[]"),
+    'funcao_nomeada': ("""
+def classifica(linha):
+    if linha['Amount'] > 100:
+        return 'alto'
+    return 'baixo'
+resultado_df = df.apply(classifica, axis=1).value_counts().to_frame()
+""", "apply(axis=1) linha a linha"),
+}
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = np.random.default_rng(0)
+    rows = 3000
+    return pd.DataFrame({
+        'Time': np.arange(rows, dtype='float64'),
+        'V1': rng.normal(size=rows),
+        'V2': rng.normal(size=rows),
+        'Amount': rng.exponential(80, size=rows).round(2),
+        'Categoria': rng.choice(['varejo', 'servicos', 'online', 'viagem'], size=rows),
+        'Class': (rng.random(rows) < 0.05).astype('int64'),
+    })
+
+
+@pytest.mark.parametrize("nome", sorted(REESCRITOS))
+def test_reescrita_da_o_mesmo_resultado_que_o_original(nome, dataset):
+    codigo = REESCRITOS[nome].strip()
+    original_df = dataset.copy()
+    texto, resultado_df, erro, _ = executa_codigo_seguro(codigo, original_df)
+    otimizado = executa_codigo_otimizado(codigo, dataset.copy())
+    relatorio = otimizado[4]
+
+    assert relatorio['reescritas'], f"{nome} não foi reescrito"
+    assert not erro and not otimizado[2]
+    if resultado_df is None:
+        assert otimizado[0] == texto
+    else:
+        # Somas vetorizadas mudam a ordem das parcelas: tolerância numérica
+        pd.testing.assert_frame_equal(resultado_df, otimizado[1], check_dtype=False, check_names=False, rtol=1e-7)
+
+
+@pytest.mark.parametrize("nome", sorted(NAO_REESCRITOS))
+def test_padroes_nao_reescritos_sao_reportados(nome, dataset):
+    codigo, padrao = NAO_REESCRITOS[nome]
+    colunas = list(dataset.columns)
+    _, relatorio = otimiza_codigo(codigo.strip(), 10_000_000, colunas)
+
+    assert not relatorio['reescritas']
+    assert any(padrao in alerta for _, alerta, _ in relatorio['alertas'])
+    assert relatorio['acao'] == 'amostrar'
+    aviso = next(mensagem for tipo, mensagem in avisos_relatorio(relatorio) if tipo == 'warning')
+    assert padrao in aviso
+
+    # Dentro do orçamento, o código roda como foi gerado
+    resultado = executa_codigo_otimizado(codigo.strip(), dataset)
+    assert not resultado[2] and resultado[4]['acao'] == 'executar' and resultado[4]['codigo'] == codigo.strip()
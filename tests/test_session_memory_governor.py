@@ -0,0 +1,57 @@
+import pickle
+import threading
+import time
+from types import SimpleNamespace
+
+import modules.session_memory_governor as governor_module
+from modules.session_memory_governor import SessionMemoryGovernor
+from modules.shared_dataset_registry import SharedDatasetRegistry
+
+
+def _governador(tmp_path):
+    return SessionMemoryGovernor(SharedDatasetRegistry(), budget_bytes=0, min_idle=0, spill_dir=str(tmp_path))
+
+
+def _sessao_descarregada(arquivo):
+    return {'arquivo': arquivo, 'member_hash': None, 'fora_da_memoria': False,
+            'dataset_key': ('zh', 'dados.csv', 'linhas', 'flat', False), 'bytes': 0}
+
+
+def test_restauracao_nao_sobrescreve_valores_mais_recentes(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / "sessao.pkl")
+    with open(arquivo, "wb") as f:
+        pickle.dump({'zip_bytes': b"zip", 'checklist_resultados': ['antigo']}, f)
+    state = {'sessao_descarregada': _sessao_descarregada(arquivo), 'zip_bytes': None, 'checklist_resultados': ['novo']}
+    monkeypatch.setattr(governor_module, 'st', SimpleNamespace(session_state=state))
+
+    assert _governador(tmp_path)._restore('s1')
+    assert state['zip_bytes'] == b"zip"
+    assert state['checklist_resultados'] == ['novo']
+    assert state['sessao_descarregada'] is None
+
+
+def test_arquivo_da_sessao_ausente_volta_a_tela_de_envio(tmp_path, monkeypatch):
+    state = {'sessao_descarregada': _sessao_descarregada(str(tmp_path / "expirado.pkl")), 'zip_bytes': None,
+             'available_files': [{'name': 'dados.csv'}], 'file_options_map': {'dados.csv': '...'},
+             'selected_file_name': 'dados.csv', 'processed_percentage': 100}
+    monkeypatch.setattr(governor_module, 'st', SimpleNamespace(session_state=state))
+
+    assert _governador(tmp_path)._restore('s1')
+    assert state['available_files'] == [] and state['selected_file_name'] is None
+    assert state['processed_percentage'] == 0
+    assert len(state['avisos_restauracao']) == 1
+
+
+def test_sessao_em_execucao_nao_e_descarregada(tmp_path, monkeypatch):
+    governador = _governador(tmp_path)
+    state = {'zip_bytes': b"zip", 'df': None}
+    record = {'state': state, 'runtime_id': 'r1', 'lock': threading.Lock(), 'last_access': time.time() - 3600,
+              'objects': {id(state['zip_bytes']): 3}, 'evicted': False}
+
+    monkeypatch.setattr(governor_module, '_runtime_session_running', lambda runtime_id: True)
+    assert not governador._evict('s1', record, over_budget=True)
+    assert state['zip_bytes'] == b"zip"
+
+    monkeypatch.setattr(governor_module, '_runtime_session_running', lambda runtime_id: False)
+    assert governador._evict('s1', record, over_budget=True)
+    assert state['zip_bytes'] is None and state['sessao_descarregada']['arquivo']
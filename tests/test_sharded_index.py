@@ -0,0 +1,93 @@
+import os
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from rag_components.sharded_index import ShardedIndex
+
+D = 32
+
+
+@pytest.fixture
+def vetores():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(1050, D)).astype('float32'), rng.normal(size=(8, D)).astype('float32')
+
+
+def _indices(base):
+    flat = faiss.IndexFlatL2(D)
+    flat.add(base)
+    sharded = ShardedIndex(faiss.IndexFlatL2(D), shard_rows=200)
+    for start in range(0, len(base), 130):  # lotes que não coincidem com os limites dos shards
+        sharded.add(base[start:start + 130])
+    return flat, sharded
+
+
+def _assert_mesma_busca(sharded, flat, consultas, k, allowed_ids=None):
+    if allowed_ids is None:
+        D_flat, I_flat = flat.search(consultas, k)
+    else:
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_ids))
+        D_flat, I_flat = flat.search(consultas, k, params=params)
+    D_shard, I_shard = sharded.search(consultas, k, allowed_ids=allowed_ids)
+    np.testing.assert_array_equal(I_shard, I_flat)
+    np.testing.assert_allclose(D_shard[I_shard >= 0], D_flat[I_flat >= 0], rtol=1e-5)
+
+
+def test_busca_igual_ao_indice_flat(vetores):
+    base, consultas = vetores
+    flat, sharded = _indices(base)
+
+    assert len(sharded.shards) == 6 and sharded.ntotal == flat.ntotal
+    _assert_mesma_busca(sharded, flat, consultas, 10)
+    np.testing.assert_array_equal(sharded.reconstruct_batch([0, 199, 200, 1049]), base[[0, 199, 200, 1049]])
+
+
+def test_busca_filtrada_igual_ao_indice_flat(vetores):
+    base, consultas = vetores
+    flat, sharded = _indices(base)
+    # Ids de poucos shards, e menos ids permitidos que k
+    _assert_mesma_busca(sharded, flat, consultas, 10, np.array([3, 150, 201, 202, 990], dtype='int64'))
+    _assert_mesma_busca(sharded, flat, consultas, 10, np.arange(0, 1050, 7, dtype='int64'))
+
+
+def test_busca_apos_gravar_e_reabrir_os_shards(vetores, tmp_path):
+    base, consultas = vetores
+    flat, sharded = _indices(base)
+    directory = str(tmp_path / 'indice')
+    sharded.persist(directory)
+
+    reaberto = pickle.loads(pickle.dumps(sharded))
+    assert reaberto.ntotal == 0 and reaberto.load_shards()
+    _assert_mesma_busca(reaberto, flat, consultas, 10)
+
+    # Continua recebendo vetores depois de reaberto
+    extra = np.random.default_rng(1).normal(size=(30, D)).astype('float32')
+    reaberto.add(extra)
+    flat.add(extra)
+    _assert_mesma_busca(reaberto, flat, consultas, 10)
+
+
+def test_persist_regrava_so_o_shard_aberto(vetores, tmp_path):
+    base, _ = vetores
+    _, sharded = _indices(base)
+    directory = str(tmp_path / 'indice')
+    sharded.persist(directory)
+    selados = {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in sorted(os.listdir(directory))[:-1]}
+
+    sharded.add(base[:20])
+    sharded.persist(directory)
+    assert {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in selados} == selados
+    assert len(os.listdir(directory)) == 6
+
+
+def test_shard_ausente_invalida_a_reabertura(vetores, tmp_path):
+    base, _ = vetores
+    _, sharded = _indices(base)
+    directory = str(tmp_path / 'indice')
+    sharded.persist(directory)
+    os.remove(os.path.join(directory, "shard-00002.bin"))
+
+    assert not pickle.loads(pickle.dumps(sharded)).load_shards()
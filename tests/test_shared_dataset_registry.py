@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.shared_dataset_registry import SharedDatasetRegistry
+
+CHAVE = ('zh', 'dados.csv', 'linhas', 'flat', False)
+
+
+@pytest.fixture(autouse=True)
+def restaura_copy_on_write():
+    anterior = pd.get_option('mode.copy_on_write')
+    yield
+    pd.set_option('mode.copy_on_write', anterior)
+
+
+def _estado():
+    df = pd.DataFrame({'Amount': np.arange(5, dtype='float64'), 'Class': np.zeros(5, dtype='int64'),
+                       'Categoria': list('abcde')})
+    return {'df': df, 'documents': ['doc 0', 'doc 1'], 'cleaned_status': {'Amount': 'Numeric'}, 'total_lines': 5}
+
+
+def test_sessoes_com_a_mesma_chave_nao_alteram_o_estado_uma_da_outra():
+    registro = SharedDatasetRegistry()
+    publicado = _estado()
+    original = publicado['df'].copy()
+    registro.publish(CHAVE, 's0', publicado)
+
+    a = registro.acquire(CHAVE, 'sa')
+    b = registro.acquire(CHAVE, 'sb')
+    a['df'].loc[0, 'Amount'] = -1
+    a['df']['Class'] = 1
+    a['df'].drop(columns=['Categoria'], inplace=True)
+    a['documents'].append('doc da sessão a')
+    a['cleaned_status']['Class'] = 'Categorical'
+
+    pd.testing.assert_frame_equal(b['df'], original)
+    assert b['documents'] == ['doc 0', 'doc 1']
+    assert b['cleaned_status'] == {'Amount': 'Numeric'}
+    # Nem a sessão que publicou nem as próximas enxergam as alterações
+    pd.testing.assert_frame_equal(publicado['df'], original)
+    pd.testing.assert_frame_equal(registro.acquire(CHAVE, 'sc')['df'], original)
+
+
+def test_sessao_que_publicou_nao_altera_o_estado_compartilhado():
+    registro = SharedDatasetRegistry()
+    publicado = _estado()
+    original = publicado['df'].copy()
+    registro.publish(CHAVE, 's0', publicado)
+
+    publicado['df'].loc[1, 'Amount'] = 99
+    publicado['documents'].append('doc novo')
+
+    outra = registro.acquire(CHAVE, 's1')
+    pd.testing.assert_frame_equal(outra['df'], original)
+    assert outra['documents'] == ['doc 0', 'doc 1']
+
+
+def test_copia_da_sessao_nao_duplica_os_dados():
+    registro = SharedDatasetRegistry()
+    publicado = _estado()
+    registro.publish(CHAVE, 's0', publicado)
+
+    a = registro.acquire(CHAVE, 'sa')
+    assert a['df'] is not publicado['df']
+    assert np.shares_memory(a['df']['Amount'].to_numpy(), publicado['df']['Amount'].to_numpy())
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from rag_components.dataset_profile import DatasetProfile
+from rag_components.summary_documents import (
+    PROFILE_DOC_PREFIX, build_column_profile_documents, build_profile_documents_from_stats,
+)
+
+
+def _dataset(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Amount': np.arange(rows, dtype='float64'),
+        'Categoria': rng.choice(['varejo', 'online'], size=rows, p=[0.75, 0.25]),
+    })
+
+
+def test_documentos_do_perfil_cobrem_todas_as_linhas():
+    df = _dataset(20000)
+    perfil = DatasetProfile.from_dataframe(df, chunk_size=1000)
+
+    docs = build_profile_documents_from_stats(perfil)
+
+    assert len(docs) == 2 and all(doc.startswith(PROFILE_DOC_PREFIX) for doc in docs)
+    assert "20000 linhas" in docs[0]
+    # O máximo vem do arquivo inteiro, não da amostra do primeiro bloco
+    assert "max=2e+04" in docs[0]
+    assert "max=999" in build_column_profile_documents(df.head(1000), total_rows=20000)[0]
+    assert "varejo (7" in docs[1] and "distintos=2" in docs[1]
+
+
+def test_perfil_vazio_nao_gera_documentos():
+    assert build_profile_documents_from_stats(DatasetProfile()) == []